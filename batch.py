@@ -0,0 +1,356 @@
+"""Пакетная генерация артефактов для множества моделей.
+
+Пример запуска:
+    python batch.py ./models 'vendor/**/*.xml' --output ./artifacts --workers 8
+
+Для каждой входной модели в выходной директории создаётся поддиректория с
+именем файла модели (без расширения), в которую записываются config.xml и meta.json.
+Ошибки отдельных файлов не прерывают обработку: они собираются в итоговую сводку.
+С параметром --cache-dir неизменившиеся модели не обрабатываются повторно (см. cache.py).
+"""
+
+from functools import partial
+from typing import TYPE_CHECKING, Dict, Iterable, List, NamedTuple, Optional, Union
+import os
+import sys
+import time
+
+from instrumentation import Instrumentation
+from main import JSONParser, XMLModel, XMLParser
+
+# Пул процессов, кэш, снимки и инкрементальная генерация импортируются при первом
+# использовании: запуск для одного файла и worker.py не оплачивают их загрузку.
+if TYPE_CHECKING:
+    from cache import ArtifactCache
+
+
+class FileResult(NamedTuple):
+    """Результат обработки одного входного файла.
+
+    Attributes
+    ----------
+    input_path : str
+        Путь к исходной модели.
+    output_dir : str
+        Директория с артефактами модели.
+    error : Optional[str]
+        Описание ошибки или None, если артефакты созданы.
+    seconds : float
+        Время обработки файла.
+    cached : bool
+        Артефакты взяты из кэша без генерации.
+    """
+
+    input_path: str
+    output_dir: str
+    error: Optional[str]
+    seconds: float
+    cached: bool = False
+
+
+class BatchSummary(NamedTuple):
+    """Сводка пакетной обработки."""
+
+    results: List[FileResult]
+    seconds: float
+
+    @property
+    def failed(self) -> List[FileResult]:
+        return [result for result in self.results if result.error is not None]
+
+    def report(self) -> str:
+        """Формирует текстовую сводку: количество файлов и список ошибок."""
+
+        failed = self.failed
+        cached = sum(result.cached for result in self.results)
+        lines = [f"Обработано файлов: {len(self.results)}, успешно: {len(self.results) - len(failed)}, "
+                 f"из кэша: {cached}, с ошибками: {len(failed)}, время: {self.seconds:.2f} с."]
+        for result in failed:
+            lines.append(f"  {result.input_path}: {result.error}")
+        return "\n".join(lines)
+
+
+def collect_input_files(patterns: Iterable[str]) -> List[str]:
+    """Раскрывает директории и glob-шаблоны в отсортированный список xml файлов.
+
+    :param patterns: Iterable[str]
+        Пути к файлам, директориям (обходятся рекурсивно) или glob-шаблоны ('**' поддерживается).
+
+    :return: List[str]
+        Абсолютные пути без повторов.
+    """
+
+    import glob
+
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for directory, _, file_names in os.walk(pattern):
+                files.update(os.path.join(directory, name) for name in file_names if name.endswith('.xml'))
+        else:
+            files.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(os.path.abspath(path) for path in files)
+
+
+def model_name(input_path: str) -> str:
+    """Имя модели - имя файла без расширения; артефакты пишутся в <output>/<имя модели>."""
+
+    return os.path.splitext(os.path.basename(input_path))[0]
+
+
+def find_duplicate_names(input_files: Iterable[str]) -> Dict[str, str]:
+    """Находит модели, имя которых совпадает с именем модели раньше в списке.
+
+    Такие модели записали бы артефакты в одну директорию, поэтому не обрабатываются.
+
+    :return: Dict[str, str]
+        Путь повторяющейся модели -> путь первой модели с тем же именем.
+    """
+
+    seen: Dict[str, str] = {}
+    duplicates: Dict[str, str] = {}
+    for path in input_files:
+        first = seen.setdefault(model_name(path), path)
+        if first != path:
+            duplicates[path] = first
+    return duplicates
+
+
+def duplicate_error(first: str) -> str:
+    """Текст ошибки для модели, имя которой совпадает с моделью first."""
+
+    return f"Имя модели совпадает с {first}."
+
+
+def convert_file(input_path: str, output_root: str, streaming: bool = False,
+                 json_format: str = JSONParser.PRETTY, cache: Optional['ArtifactCache'] = None,
+                 report: bool = False, collect_all: bool = False, incremental: bool = False,
+                 instances: Optional[Union[str, int]] = None, snapshot_dir: Optional[str] = None,
+                 packed: bool = False) -> FileResult:
+    """Генерирует config.xml и meta.json для одной модели.
+
+    Функция выполняется в процессе-исполнителе, поэтому исключения не пробрасываются,
+    а возвращаются в виде текста в FileResult.error.
+
+    :param input_path: str
+        Абсолютный путь к исходной модели.
+    :param output_root: str
+        Корневая директория результатов.
+    :param streaming: bool
+        Читать модель потоково (iterparse).
+    :param json_format: str
+        Формат meta.json (см. JSONParser).
+    :param cache: Optional[ArtifactCache]
+        Кэш артефактов. Если задан и содержит запись для модели, генерация пропускается.
+    :param report: bool
+        Записать замеры этапов в report.json рядом с артефактами (см. instrumentation.py).
+    :param collect_all: bool
+        Собирать все нарушения валидации модели вместо остановки на первом.
+    :param incremental: bool
+        Перегенерировать только изменившиеся фрагменты артефактов по снимку
+        предыдущей модели (см. incremental.py).
+    :param instances: Optional[Union[str, int]]
+        Режим экземпляров config.xml (см. XMLParser). None - схема.
+    :param snapshot_dir: Optional[str]
+        Директория бинарных снимков моделей (см. compiled.py). None - без снимков.
+    :param packed: bool
+        Генерировать по упакованной модели (см. compiled.pack_model()): меньше памяти
+        на очень больших моделях за счёт повторного создания объектов классов.
+
+    :return: FileResult
+    """
+
+    started = time.perf_counter()
+    output_dir = os.path.join(output_root, model_name(input_path))
+    file_names = ['config.xml', 'meta.ndjson' if json_format == JSONParser.NDJSON else 'meta.json']
+    try:
+        key = None
+        if cache is not None:
+            # Потоковое чтение не влияет на результат и в ключ не входит
+            key = cache.make_key(input_path, {'json_format': json_format, 'instances': instances})
+            if cache.fetch(key, file_names, output_dir):
+                return FileResult(input_path, output_dir, None, time.perf_counter() - started, cached=True)
+
+        instrumentation = Instrumentation() if report else None
+        if snapshot_dir is None:
+            model = XMLModel.from_file(input_path, streaming=streaming, verbose=False,
+                                       instrumentation=instrumentation, collect_all=collect_all)
+            if packed:
+                from compiled import pack_model
+                model = pack_model(model)
+        else:
+            from compiled import load_model
+            model = load_model(input_path, snapshot_dir, streaming=streaming, instrumentation=instrumentation,
+                               collect_all=collect_all, packed=packed)
+        if incremental:
+            from incremental import IncrementalGenerator
+            # Файлы заменяются переименованием, жёсткие ссылки на записи кэша не изменяются
+            IncrementalGenerator(output_dir, json_format, instrumentation=instrumentation).generate(model)
+        else:
+            os.makedirs(output_dir, exist_ok=True)
+            # Прежние артефакты удаляются, чтобы после ошибки генерации не остались результаты прежней модели
+            for name in file_names:
+                if os.path.lexists(os.path.join(output_dir, name)):
+                    os.remove(os.path.join(output_dir, name))
+            from emitters import ConfigXMLEmitter, MetaJSONEmitter, emit
+            # config.xml и meta.json записываются за один общий обход модели
+            emit(model, [ConfigXMLEmitter(instances=instances), MetaJSONEmitter(json_format)], output_dir,
+                 instrumentation)
+        if instrumentation is not None:
+            instrumentation.write_report(os.path.join(output_dir, 'report.json'))
+
+        if cache is not None:
+            cache.store(key, file_names, output_dir)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return FileResult(input_path, output_dir, error, time.perf_counter() - started)
+
+
+def run_batch(input_files: List[str], output_root: str, workers: Optional[int] = None, chunksize: int = 1,
+              streaming: bool = False, json_format: str = JSONParser.PRETTY,
+              cache: Optional['ArtifactCache'] = None, report: bool = False,
+              collect_all: bool = False, incremental: bool = False,
+              instances: Optional[Union[str, int]] = None, snapshot_dir: Optional[str] = None,
+              packed: bool = False) -> BatchSummary:
+    """Обрабатывает список моделей в пуле процессов.
+
+    :param input_files: List[str]
+        Абсолютные пути к исходным моделям.
+    :param output_root: str
+        Корневая директория результатов.
+    :param workers: Optional[int]
+        Число процессов. None - по числу ядер, 1 - обработка в текущем процессе.
+    :param chunksize: int
+        Сколько файлов передаётся процессу за раз. Для тысяч небольших моделей
+        значения 8-64 снижают накладные расходы на передачу задач.
+    :param streaming: bool
+        Читать модели потоково (iterparse).
+    :param json_format: str
+        Формат meta.json (см. JSONParser).
+    :param cache: Optional[ArtifactCache]
+        Кэш артефактов. Вытеснение выполняется один раз после обработки всех файлов.
+    :param report: bool
+        Записывать замеры этапов каждой сгенерированной модели в report.json.
+    :param collect_all: bool
+        Собирать все нарушения валидации каждой модели вместо остановки на первом.
+    :param incremental: bool
+        Перегенерировать только изменившиеся фрагменты артефактов (см. incremental.py).
+    :param instances: Optional[Union[str, int]]
+        Режим экземпляров config.xml (см. XMLParser). None - схема.
+    :param snapshot_dir: Optional[str]
+        Директория бинарных снимков моделей (см. compiled.py). None - без снимков.
+    :param packed: bool
+        Генерировать по упакованным моделям (см. compiled.pack_model()).
+
+    :return: BatchSummary
+    """
+
+    started = time.perf_counter()
+    # Пути во всех результатах, в том числе для повторяющихся имён, строятся от одного корня
+    output_root = os.path.abspath(output_root)
+    convert = partial(convert_file, output_root=output_root, streaming=streaming,
+                      json_format=json_format, cache=cache, report=report, collect_all=collect_all,
+                      incremental=incremental, instances=instances,
+                      snapshot_dir=None if snapshot_dir is None else os.path.abspath(snapshot_dir), packed=packed)
+
+    duplicate_of = find_duplicate_names(input_files)
+    unique_files = [path for path in input_files if path not in duplicate_of]
+    duplicates = [FileResult(path, os.path.join(output_root, model_name(path)), duplicate_error(first), 0.0)
+                  for path, first in duplicate_of.items()]
+
+    if workers == 1:
+        results = [convert(path) for path in unique_files]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(convert, unique_files, chunksize=chunksize))
+
+    if cache is not None:
+        cache.evict()
+
+    return BatchSummary(results + duplicates, time.perf_counter() - started)
+
+
+def _positive_int(value: str) -> int:
+    """Разбирает целое число не меньше 1 (--workers, --chunksize)."""
+
+    import argparse
+
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ожидается целое число: {value}.")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"Ожидается число не меньше 1: {value}.")
+    return number
+
+
+def _instances_mode(value: str) -> Union[str, int]:
+    """Разбирает значение --instances: min, max или неотрицательное число."""
+
+    import argparse
+
+    try:
+        return XMLParser.instances_mode(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки. Возвращает код завершения (1, если были ошибки)."""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Пакетная генерация config.xml и meta.json из UML-моделей.")
+    parser.add_argument('inputs', nargs='+', help="файлы, директории или glob-шаблоны с моделями")
+    parser.add_argument('-o', '--output', default='./out', help="корневая директория результатов (./out)")
+    parser.add_argument('-j', '--workers', type=_positive_int, default=None, help="число процессов (по числу ядер)")
+    parser.add_argument('--chunksize', type=_positive_int, default=1, help="файлов на одну задачу процесса (1)")
+    parser.add_argument('--streaming', action='store_true', help="потоковое чтение больших моделей")
+    parser.add_argument('--json-format', choices=(JSONParser.PRETTY, JSONParser.COMPACT, JSONParser.NDJSON),
+                        default=JSONParser.PRETTY, help="формат meta.json (pretty)")
+    parser.add_argument('--cache-dir', default=None, help="директория кэша артефактов (без кэша)")
+    parser.add_argument('--cache-size', type=int, default=None,
+                        help="лимит размера кэша в мегабайтах, старые записи вытесняются (без лимита)")
+    parser.add_argument('--cache-link', action='store_true',
+                        help="восстанавливать артефакты из кэша жёсткими ссылками вместо копирования")
+    parser.add_argument('--clear-cache', action='store_true', help="очистить кэш перед запуском")
+    parser.add_argument('--report', action='store_true',
+                        help="записывать замеры этапов в report.json рядом с артефактами")
+    parser.add_argument('--collect-all', action='store_true',
+                        help="сообщать все ошибки валидации модели, а не только первую")
+    parser.add_argument('--incremental', action='store_true',
+                        help="перегенерировать только изменившиеся части артефактов по снимку прежней модели")
+    parser.add_argument('--instances', type=_instances_mode, default=None,
+                        help="развернуть агрегации config.xml в экземпляры: min, max или число на агрегацию")
+    parser.add_argument('--snapshot-dir', default=None,
+                        help="директория бинарных снимков моделей для быстрой повторной загрузки (без снимков)")
+    parser.add_argument('--packed', action='store_true',
+                        help="упаковывать модели в таблицы перед генерацией: меньше памяти на очень больших моделях")
+    args = parser.parse_args(argv)
+    if args.incremental and args.instances is not None:
+        parser.error("--incremental не поддерживается вместе с --instances")
+
+    cache = None
+    if args.cache_dir is not None:
+        from cache import ArtifactCache
+        max_bytes = None if args.cache_size is None else args.cache_size * 1024 * 1024
+        cache = ArtifactCache(args.cache_dir, max_bytes, args.cache_link)
+        if args.clear_cache:
+            cache.clear()
+
+    input_files = collect_input_files(args.inputs)
+    if not input_files:
+        print("Не найдено ни одного входного файла.")
+        return 1
+
+    summary = run_batch(input_files, args.output, args.workers, args.chunksize, args.streaming, args.json_format,
+                        cache, args.report, args.collect_all, args.incremental, args.instances,
+                        args.snapshot_dir, args.packed)
+    print(summary.report())
+    return 1 if summary.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Генератор синтетических UML-моделей в формате входного файла.
+
+Пример запуска:
+    python benchmarks/generate_model.py model.xml --classes 100000 --attributes 5 --fanout 8 --max-depth 12
+
+Классы образуют дерево: корень C0, каждому следующему классу назначается родитель
+в порядке обхода в ширину, у каждого родителя не больше fanout дочерних классов,
+глубина не превышает max_depth. Файл пишется потоково, поэтому размер модели
+ограничен только диском.
+"""
+
+from collections import deque
+from typing import Optional, TextIO
+import argparse
+import random
+
+ATTRIBUTE_TYPES = ('uint32', 'string', 'boolean', 'int64', 'float')
+
+
+def write_model(file: TextIO, classes: int, attributes: int = 3, fanout: int = 4, max_depth: Optional[int] = None,
+                documentation_size: int = 32, seed: int = 0) -> int:
+    """Записывает синтетическую модель в текстовый поток.
+
+    :param file: TextIO
+        Поток, открытый на запись в текстовом режиме.
+    :param classes: int
+        Количество классов.
+    :param attributes: int
+        Количество элементов Attribute в каждом классе.
+    :param fanout: int
+        Максимальное количество дочерних классов у одного класса.
+    :param max_depth: Optional[int]
+        Максимальная глубина дерева (корень - глубина 0). None - без ограничения.
+        При fanout=1 получается цепочка глубиной classes - 1.
+    :param documentation_size: int
+        Длина атрибута documentation каждого класса в символах.
+    :param seed: int
+        Зерно генератора случайных чисел (типы атрибутов и мощности связей).
+
+    :return: int
+        Количество записанных агрегаций.
+
+    :raises ValueError:
+        Если заданное количество классов не помещается в дерево с такими fanout и max_depth.
+    """
+
+    rng = random.Random(seed)
+    documentation = ('lorem ipsum ' * (documentation_size // 12 + 1))[:documentation_size]
+
+    file.write('<?xml version="1.0" ?>\n')
+    file.write('<XMI xmi.version="1.1" xmlns:UML="omg.org/UML1.3" timestamp="2024-05-11 12:34:56">\n')
+
+    for index in range(classes):
+        is_root = 'true' if index == 0 else 'false'
+        file.write(f'    <Class name="C{index}" isRoot="{is_root}" documentation="{documentation}">\n')
+        for attribute_index in range(attributes):
+            file.write(f'        <Attribute name="a{attribute_index}" type="{rng.choice(ATTRIBUTE_TYPES)}" />\n')
+        file.write('    </Class>\n')
+
+    # Назначение родителей в порядке обхода в ширину
+    parents = deque([(0, 0)])  # (индекс класса, глубина)
+    child_counts = {}
+    for index in range(1, classes):
+        if not parents:
+            raise ValueError(f"{classes} классов не помещаются в дерево с fanout={fanout} и max_depth={max_depth}.")
+        parent, depth = parents[0]
+        child_counts[parent] = child_counts.get(parent, 0) + 1
+        if child_counts[parent] == fanout:
+            parents.popleft()
+        if max_depth is None or depth + 1 < max_depth:
+            parents.append((index, depth + 1))
+
+        multiplicity = rng.choice(('1', '0..1', f'0..{rng.randint(2, 100)}', f'1..{rng.randint(2, 100)}'))
+        file.write(f'    <Aggregation source="C{index}" target="C{parent}" '
+                   f'sourceMultiplicity="{multiplicity}" targetMultiplicity="1" />\n')
+
+    file.write('</XMI>\n')
+    return max(classes - 1, 0)
+
+
+def generate_model(path: str, classes: int, attributes: int = 3, fanout: int = 4, max_depth: Optional[int] = None,
+                   documentation_size: int = 32, seed: int = 0) -> str:
+    """Записывает синтетическую модель в файл (см. write_model) и возвращает путь к нему."""
+
+    with open(path, 'w', encoding='utf-8') as file:
+        write_model(file, classes, attributes, fanout, max_depth, documentation_size, seed)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Генерация синтетической UML-модели.")
+    parser.add_argument('path', help="путь к создаваемому файлу")
+    parser.add_argument('--classes', type=int, default=1000, help="количество классов (1000)")
+    parser.add_argument('--attributes', type=int, default=3, help="атрибутов в классе (3)")
+    parser.add_argument('--fanout', type=int, default=4, help="дочерних классов у класса (4)")
+    parser.add_argument('--max-depth', type=int, default=None, help="максимальная глубина дерева")
+    parser.add_argument('--documentation-size', type=int, default=32, help="длина documentation (32)")
+    parser.add_argument('--seed', type=int, default=0, help="зерно генератора (0)")
+    args = parser.parse_args()
+
+    generate_model(args.path, args.classes, args.attributes, args.fanout, args.max_depth,
+                   args.documentation_size, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Замер резидентной памяти процесса во время генерации meta.json.
+
+Пример запуска:
+    python benchmarks/memory.py --classes 100000 --attributes 3
+    python benchmarks/memory.py --input model.xml --output memory.json
+
+Каждый режим загрузки модели замеряется в отдельном процессе:
+    objects         - модель из объектов ClassDef (XMLModel.load());
+    streaming       - то же с потоковым чтением (iterparse);
+    packed          - потоковое чтение и упаковка в таблицы (compiled.pack_model()).
+Для каждого режима выводятся резидентная память после загрузки модели, пиковая
+резидентная память во время генерации meta.json и время генерации. Память читается
+из /proc/self/statm (Linux), поэтому на других системах скрипт не работает.
+"""
+
+from typing import Dict, List
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generate_model import generate_model  # noqa: E402
+
+MODES = ('objects', 'streaming', 'packed')
+
+
+def _rss() -> int:
+    with open('/proc/self/statm') as file:
+        return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class _SamplingWriter:
+    """Отбрасывает результат и периодически замеряет резидентную память процесса."""
+
+    def __init__(self, every: int = 1000):
+        self.__every = every
+        self.__writes = 0
+        self.peak = _rss()
+
+    def write(self, text: str) -> int:
+        self.__writes += 1
+        if self.__writes % self.__every == 0:
+            self.peak = max(self.peak, _rss())
+        return len(text)
+
+
+def measure(path: str, mode: str) -> Dict[str, float]:
+    """Загружает модель в режиме mode и генерирует meta.json. Выполняется в отдельном процессе."""
+
+    from main import JSONParser, XMLModel
+
+    model = XMLModel.load(path, streaming=mode != 'objects')
+    if mode == 'packed':
+        from compiled import pack_model
+        model = pack_model(model)
+    gc.collect()
+    loaded = _rss()
+
+    writer = _SamplingWriter()
+    started = time.perf_counter()
+    JSONParser(model).write(writer)
+    seconds = time.perf_counter() - started
+    return {'loaded': loaded, 'json_peak': max(writer.peak, _rss()), 'json_seconds': seconds}
+
+
+def run_mode(path: str, mode: str) -> Dict[str, float]:
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, path],
+                               cwd=ROOT, check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(completed.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер резидентной памяти во время генерации meta.json.")
+    parser.add_argument('--input', default=None, help="файл модели (по умолчанию генерируется синтетическая)")
+    parser.add_argument('--classes', type=int, default=100000, help="классов в синтетической модели (100000)")
+    parser.add_argument('--attributes', type=int, default=3, help="Attribute на класс (3)")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES), help="режимы загрузки (все)")
+    parser.add_argument('--output', default=None, help="сохранить результаты в JSON файл")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        mode, path = args.child
+        print(json.dumps(measure(path, mode)))
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = args.input
+        if path is None:
+            path = generate_model(os.path.join(work_dir, 'model.xml'), args.classes, attributes=args.attributes)
+        results: Dict[str, Dict[str, float]] = {mode: run_mode(os.path.abspath(path), mode) for mode in args.modes}
+
+    print(f"{'режим':<12} {'после загрузки':>16} {'пик meta.json':>16} {'время meta.json':>16}")
+    for mode, result in results.items():
+        print(f"{mode:<12} {result['loaded'] / 2 ** 20:>13.1f} МБ {result['json_peak'] / 2 ** 20:>13.1f} МБ "
+              f"{result['json_seconds']:>15.2f} с")
+    if 'objects' in results:
+        baseline = results['objects']['json_peak']
+        lines: List[str] = [f"{mode}: {baseline / result['json_peak']:.1f}x" for mode, result in results.items()
+                            if mode != 'objects']
+        print("Снижение пиковой памяти относительно objects: " + ", ".join(lines))
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Замеры производительности валидации и генерации артефактов на синтетических моделях.
+
+Пример запуска:
+    python benchmarks/run_benchmarks.py --classes 1000 10000 100000 --output results.json
+    python benchmarks/run_benchmarks.py --classes 1000 10000 --compare results.json
+
+Для каждого масштаба генерируется модель (см. generate_model.py) и отдельно замеряются этапы:
+    validate            - парсинг и валидация (XMLModel.from_file);
+    validate_streaming  - то же в потоковом режиме (iterparse);
+    config_xml          - генерация config.xml (XMLParser);
+    meta_json           - генерация meta.json (JSONParser);
+    snapshot_load       - загрузка модели из бинарного снимка (compiled.py) и
+                          meta.json по ней, включая ленивое создание объектов;
+    emit_all            - все форматы emitters.py за один общий обход модели.
+Время - минимум из нескольких повторов; пиковая память замеряется отдельным прогоном
+под tracemalloc, чтобы трассировка не искажала время.
+
+Результаты сохраняются в JSON. С параметром --compare новые результаты сравниваются
+с сохранёнными ранее, а замедление сверх порога считается регрессией (код завершения 1).
+"""
+
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate_model import generate_model  # noqa: E402
+from compiled import CompiledModel, snapshot_path, write_snapshot  # noqa: E402
+from emitters import EMITTERS, emit  # noqa: E402
+from main import GENERATOR_VERSION, JSONParser, XMLModel, XMLParser  # noqa: E402
+
+
+def _snapshot_load(path: str, model: XMLModel, out: str) -> None:
+    snapshot = snapshot_path(path, out)
+    if not os.path.exists(snapshot):
+        write_snapshot(model, snapshot)
+    JSONParser(CompiledModel(snapshot).model, output_dir=out).main()
+
+
+STAGES: Dict[str, Callable[[str, XMLModel, str], object]] = {
+    'validate': lambda path, model, out: XMLModel.from_file(path, verbose=False),
+    'validate_streaming': lambda path, model, out: XMLModel.from_file(path, streaming=True, verbose=False),
+    'config_xml': lambda path, model, out: XMLParser(model, output_dir=out).main(),
+    'meta_json': lambda path, model, out: JSONParser(model, output_dir=out).main(),
+    'snapshot_load': _snapshot_load,
+    'emit_all': lambda path, model, out: emit(model, [factory() for factory in EMITTERS.values()], out),
+}
+
+
+def measure(stage: Callable[[str, XMLModel, str], object], path: str, model: XMLModel, out: str,
+            repeat: int, memory: bool) -> Dict[str, Optional[float]]:
+    """Замеряет один этап: минимальное время из repeat прогонов и пиковую память."""
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        stage(path, model, out)
+        timings.append(time.perf_counter() - started)
+
+    peak_bytes = None
+    if memory:
+        tracemalloc.start()
+        try:
+            stage(path, model, out)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_bytes': peak_bytes}
+
+
+def run(classes_list: List[int], attributes: int, fanout: int, max_depth: Optional[int], documentation_size: int,
+        repeat: int, memory: bool) -> Dict[str, object]:
+    """Выполняет замеры для всех масштабов и возвращает результаты в виде словаря."""
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for classes in classes_list:
+            scale = {'classes': classes, 'attributes': attributes, 'fanout': fanout, 'max_depth': max_depth,
+                     'documentation_size': documentation_size}
+            path = generate_model(os.path.join(work_dir, f'model_{classes}.xml'), classes, attributes, fanout,
+                                  max_depth, documentation_size)
+            scale['input_bytes'] = os.path.getsize(path)
+            model = XMLModel.from_file(path, verbose=False)
+
+            for stage_name, stage in STAGES.items():
+                result = measure(stage, path, model, work_dir, repeat, memory)
+                results.append({'scale': scale, 'stage': stage_name, **result})
+                peak = '-' if result['peak_bytes'] is None else f"{result['peak_bytes'] / 2 ** 20:.1f} МБ"
+                print(f"{classes:>9} классов  {stage_name:<20} {result['seconds']:>9.4f} с  {peak:>10}")
+
+    return {
+        'generator_version': GENERATOR_VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, object], baseline: Dict[str, object], threshold: float) -> bool:
+    """Печатает отношение времени и памяти к сохранённым результатам.
+
+    :return: bool
+        True, если найдена регрессия (замедление или рост памяти больше threshold раз).
+    """
+
+    def key(result):
+        scale = result['scale']
+        return scale['classes'], scale['attributes'], scale['fanout'], scale['max_depth'], result['stage']
+
+    baseline_results = {key(result): result for result in baseline['results']}
+    regression = False
+    print(f"\nСравнение с результатами от {baseline.get('timestamp')} (порог x{threshold}):")
+    for result in current['results']:
+        old = baseline_results.get(key(result))
+        if old is None:
+            continue
+        time_ratio = result['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        memory_ratio = None
+        if result['peak_bytes'] and old['peak_bytes']:
+            memory_ratio = result['peak_bytes'] / old['peak_bytes']
+        marks = []
+        if time_ratio > threshold:
+            marks.append('РЕГРЕССИЯ ВРЕМЕНИ')
+        if memory_ratio is not None and memory_ratio > threshold:
+            marks.append('РЕГРЕССИЯ ПАМЯТИ')
+        regression = regression or bool(marks)
+        memory_text = '-' if memory_ratio is None else f"x{memory_ratio:.2f}"
+        print(f"{result['scale']['classes']:>9} классов  {result['stage']:<20} время x{time_ratio:.2f}  "
+              f"память {memory_text}  {' '.join(marks)}")
+    return regression
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замеры валидации и генерации артефактов.")
+    parser.add_argument('--classes', type=int, nargs='+', default=[1000, 10000], help="масштабы (1000 10000)")
+    parser.add_argument('--attributes', type=int, default=3, help="атрибутов в классе (3)")
+    parser.add_argument('--fanout', type=int, default=4, help="дочерних классов у класса (4)")
+    parser.add_argument('--max-depth', type=int, default=None, help="максимальная глубина дерева")
+    parser.add_argument('--documentation-size', type=int, default=32, help="длина documentation (32)")
+    parser.add_argument('--repeat', type=int, default=3, help="повторов на этап (3)")
+    parser.add_argument('--no-memory', action='store_true', help="не замерять пиковую память")
+    parser.add_argument('--output', default=None, help="файл для сохранения результатов (JSON)")
+    parser.add_argument('--compare', default=None, help="файл с прежними результатами для сравнения")
+    parser.add_argument('--threshold', type=float, default=1.2, help="порог регрессии (1.2)")
+    args = parser.parse_args()
+
+    current = run(args.classes, args.attributes, args.fanout, args.max_depth, args.documentation_size,
+                  args.repeat, not args.no_memory)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(current, file, indent=4)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if compare(current, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
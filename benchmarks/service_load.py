@@ -0,0 +1,156 @@
+"""Нагрузочный тест HTTP сервера service.py: пропускная способность и задержки.
+
+Пример запуска:
+    python benchmarks/service_load.py --classes 1000 --concurrency 16 --requests 500 --workers 4
+    python benchmarks/service_load.py --address 127.0.0.1:8080 --input model.xml --path '/config.xml?stream=1'
+
+Без --address сервер запускается отдельным процессом на свободном порту и
+останавливается после замера. Клиенты держат соединения открытыми (keep-alive) и
+отправляют запросы подряд; задержка замеряется от отправки запроса до получения
+последнего байта ответа.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generate_model import generate_model  # noqa: E402
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, int]:
+    """Читает HTTP ответ (Content-Length или chunked). Возвращает статус и размер тела."""
+
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        size = 0
+        while True:
+            length = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            await reader.readexactly(length + 2)
+            size += length
+            if length == 0:
+                return status, size
+    length = int(headers.get('content-length', 0))
+    await reader.readexactly(length)
+    return status, length
+
+
+async def _client(host: str, port: int, request: bytes, count: int, latencies: List[float],
+                  statuses: Dict[int, int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, _ = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, body: bytes, path: str, concurrency: int,
+                   requests: int) -> Dict[str, object]:
+    """Отправляет requests запросов из concurrency соединений и возвращает сводку."""
+
+    request = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    per_client = [requests // concurrency + (index < requests % concurrency) for index in range(concurrency)]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, request, count, latencies, statuses)
+                           for count in per_client if count))
+    seconds = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(value: float) -> float:
+        return latencies[min(len(latencies) - 1, int(value * len(latencies)))]
+
+    return {
+        'requests': len(latencies),
+        'seconds': seconds,
+        'rps': len(latencies) / seconds,
+        'p50': percentile(0.50),
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'max': latencies[-1],
+        'statuses': statuses,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int, workers: Optional[int]) -> subprocess.Popen:
+    command = [sys.executable, os.path.join(ROOT, 'service.py'), '--port', str(port)]
+    if workers is not None:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()  # Строка о запуске сервера
+    return process
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP сервера генерации артефактов.")
+    parser.add_argument('--address', default=None, help="host:port запущенного сервера (запустить свой)")
+    parser.add_argument('--workers', type=int, default=None, help="процессов у запускаемого сервера")
+    parser.add_argument('--input', default=None, help="модель для запросов (по умолчанию синтетическая)")
+    parser.add_argument('--classes', type=int, default=1000, help="классов в синтетической модели (1000)")
+    parser.add_argument('--path', default='/meta.json', help="ресурс с параметрами (/meta.json)")
+    parser.add_argument('--concurrency', type=int, default=8, help="одновременных соединений (8)")
+    parser.add_argument('--requests', type=int, default=200, help="всего запросов (200)")
+    args = parser.parse_args()
+
+    if args.input is None:
+        with tempfile.TemporaryDirectory() as work_dir:
+            with open(generate_model(os.path.join(work_dir, 'model.xml'), args.classes), 'rb') as file:
+                body = file.read()
+    else:
+        with open(args.input, 'rb') as file:
+            body = file.read()
+
+    process = None
+    if args.address is None:
+        host, port = '127.0.0.1', _free_port()
+        process = _start_server(port, args.workers)
+    else:
+        host, port_text = args.address.rsplit(':', 1)
+        port = int(port_text)
+
+    try:
+        summary = asyncio.run(run_load(host, port, body, args.path, args.concurrency, args.requests))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"Запросов: {summary['requests']} за {summary['seconds']:.2f} с, {summary['rps']:.1f} запросов/с")
+    print(f"Задержка: p50 {summary['p50'] * 1000:.1f} мс, p95 {summary['p95'] * 1000:.1f} мс, "
+          f"p99 {summary['p99'] * 1000:.1f} мс, max {summary['max'] * 1000:.1f} мс")
+    print(f"Статусы: {summary['statuses']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Замеры времени импорта модулей и задержки обработки одного файла при коротких запусках.
+
+Пример запуска:
+    python benchmarks/startup.py --files 20 --classes 50
+    python benchmarks/startup.py --output startup.json
+
+Замеряются:
+    import <модуль>  - время `python -c "import <модуль>"` за вычетом пустого запуска
+                       интерпретатора (медиана по --repeat запускам);
+    cli per file     - отдельный запуск `batch.py <файл> -j 1` на каждый файл;
+    worker per file  - запрос к одному запущенному worker.py через stdin.
+Перед замером модули компилируются в __pycache__, как у установленного пакета, чтобы
+в время импорта не входила компиляция исходников.
+"""
+
+from typing import Dict, List
+import argparse
+import compileall
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generate_model import generate_model  # noqa: E402
+
+MODULES = ('main', 'batch', 'compiled', 'query', 'worker')
+
+
+def _run_seconds(command: List[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def measure_imports(repeat: int) -> Dict[str, float]:
+    """Медианное время импорта каждого модуля в новом интерпретаторе за вычетом его старта."""
+
+    baseline = statistics.median(_run_seconds([sys.executable, '-c', 'pass']) for _ in range(repeat))
+    results = {'interpreter': baseline}
+    for module in MODULES:
+        seconds = statistics.median(_run_seconds([sys.executable, '-c', f'import {module}']) for _ in range(repeat))
+        results[f'import {module}'] = seconds - baseline
+    return results
+
+
+def measure_cli(files: List[str], output: str) -> float:
+    """Медианное время обработки файла отдельным запуском batch.py."""
+
+    return statistics.median(
+        _run_seconds([sys.executable, os.path.join(ROOT, 'batch.py'), path, '-j', '1', '-o', output])
+        for path in files)
+
+
+def measure_worker(files: List[str], output: str) -> float:
+    """Медианное время обработки файла запросом к запущенному worker.py (без его старта)."""
+
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'worker.py'), '-o', output],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=ROOT)
+    timings = []
+    try:
+        for path in files:
+            started = time.perf_counter()
+            process.stdin.write(path + '\n')
+            process.stdin.flush()
+            response = json.loads(process.stdout.readline())
+            timings.append(time.perf_counter() - started)
+            if response['error'] is not None:
+                raise RuntimeError(response['error'])
+    finally:
+        process.stdin.close()
+        process.wait()
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замеры времени импорта и задержки на файл.")
+    parser.add_argument('--files', type=int, default=20, help="количество моделей (20)")
+    parser.add_argument('--classes', type=int, default=50, help="классов в каждой модели (50)")
+    parser.add_argument('--repeat', type=int, default=15, help="запусков на замер импорта (15)")
+    parser.add_argument('--output', default=None, help="сохранить результаты в JSON файл")
+    args = parser.parse_args()
+
+    compileall.compile_dir(ROOT, maxlevels=1, quiet=1)
+
+    results = measure_imports(args.repeat)
+    with tempfile.TemporaryDirectory() as work_dir:
+        files = [generate_model(os.path.join(work_dir, f'model_{index}.xml'), args.classes, seed=index)
+                 for index in range(args.files)]
+        results['cli per file'] = measure_cli(files, os.path.join(work_dir, 'cli'))
+        results['worker per file'] = measure_worker(files, os.path.join(work_dir, 'worker'))
+
+    for name, seconds in results.items():
+        print(f"{name:<20} {seconds * 1000:>9.1f} мс")
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({name: seconds for name, seconds in results.items()}, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
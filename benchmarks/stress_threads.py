@@ -0,0 +1,170 @@
+"""Многопоточная проверка: одновременные конвертации дают корректные и целые результаты.
+
+Пример запуска:
+    python benchmarks/stress_threads.py --threads 16 --conversions 400
+    python benchmarks/stress_threads.py --models 8 --classes 500 --threads 32
+
+Для нескольких синтетических моделей (см. generate_model.py) эталонные config.xml и
+meta.json строятся в одном потоке. Затем пул потоков выполняет конвертации, чередуя:
+    - разбор модели по пути, из bytes или из бинарного потока (XMLModel.load) либо
+      использование одной модели, общей для всех потоков;
+    - запись в собственный файл, в файл, общий для всех потоков с этой моделью,
+      в поток в памяти или через emit() (emitters.py).
+Параллельно читатель постоянно перечитывает общие файлы: из-за атомарной замены он
+всегда должен видеть эталон целиком. Любое расхождение считается ошибкой (код завершения 1).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import argparse
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generate_model import generate_model  # noqa: E402
+from emitters import ConfigXMLEmitter, MetaJSONEmitter, emit  # noqa: E402
+from main import JSONParser, XMLModel, XMLParser  # noqa: E402
+
+
+def _render(model: XMLModel) -> Tuple[str, str]:
+    config_xml, meta_json = io.StringIO(), io.StringIO()
+    XMLParser(model).dump(config_xml)
+    JSONParser(model).dump(meta_json)
+    return config_xml.getvalue(), meta_json.getvalue()
+
+
+def _read(path: str) -> str:
+    with open(path, encoding='utf-8') as file:
+        return file.read()
+
+
+def convert(index: int, paths: List[str], shared_models: List[XMLModel], expected: List[Tuple[str, str]],
+            work_dir: str) -> List[str]:
+    """Одна конвертация. Возвращает описания найденных расхождений."""
+
+    model_index = index % len(paths)
+    path = paths[model_index]
+
+    source_mode = index % 4
+    if source_mode == 0:
+        model = XMLModel.load(path)
+    elif source_mode == 1:
+        with open(path, 'rb') as file:
+            model = XMLModel.load(file.read())
+    elif source_mode == 2:
+        with open(path, 'rb') as file:
+            model = XMLModel.load(file)
+    else:
+        model = shared_models[model_index]
+
+    output_mode = (index // 4) % 4
+    if output_mode == 0:
+        output_dir = os.path.join(work_dir, 'own', str(index))
+        os.makedirs(output_dir)
+        XMLParser(model, output_dir=output_dir).main()
+        JSONParser(model, output_dir=output_dir).main()
+    elif output_mode == 1:
+        output_dir = os.path.join(work_dir, 'shared', str(model_index))
+        XMLParser(model).dump(os.path.join(output_dir, 'config.xml'))
+        JSONParser(model).dump(os.path.join(output_dir, 'meta.json'))
+    elif output_mode == 2:
+        output_dir = None
+        actual = _render(model)
+    else:
+        output_dir = os.path.join(work_dir, 'emit', str(index))
+        os.makedirs(output_dir)
+        emit(model, [ConfigXMLEmitter(), MetaJSONEmitter()], output_dir)
+
+    if output_dir is not None:
+        actual = (_read(os.path.join(output_dir, 'config.xml')), _read(os.path.join(output_dir, 'meta.json')))
+    # Общий файл мог быть заменён другим потоком, но только на тот же эталон
+    errors = []
+    for name, text, reference in zip(('config.xml', 'meta.json'), actual, expected[model_index]):
+        if text != reference:
+            errors.append(f"конвертация {index} (модель {model_index}): {name} отличается от эталона")
+    return errors
+
+
+def read_shared(work_dir: str, expected: List[Tuple[str, str]], stop: threading.Event, errors: List[str],
+                reads: List[int]) -> None:
+    """Перечитывает общие файлы до остановки и проверяет, что они всегда целые."""
+
+    while not stop.is_set():
+        for model_index, references in enumerate(expected):
+            for name, reference in zip(('config.xml', 'meta.json'), references):
+                text = _read(os.path.join(work_dir, 'shared', str(model_index), name))
+                reads[0] += 1
+                if text != reference:
+                    errors.append(f"читатель: {name} модели {model_index} прочитан не целиком")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Многопоточная проверка конвертаций.")
+    parser.add_argument('--models', type=int, default=4, help="количество моделей (4)")
+    parser.add_argument('--classes', type=int, default=300, help="классов в модели (300)")
+    parser.add_argument('--threads', type=int, default=16, help="потоков (16)")
+    parser.add_argument('--conversions', type=int, default=320, help="всего конвертаций (320)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = [generate_model(os.path.join(work_dir, f'model_{index}.xml'), args.classes, seed=index)
+                 for index in range(args.models)]
+        shared_models = [XMLModel.load(path) for path in paths]
+        expected = [_render(model) for model in shared_models]
+
+        # Общие файлы заранее содержат эталон, чтобы читатель мог начать сразу
+        for model_index, (config_xml, meta_json) in enumerate(expected):
+            output_dir = os.path.join(work_dir, 'shared', str(model_index))
+            os.makedirs(output_dir)
+            for name, text in (('config.xml', config_xml), ('meta.json', meta_json)):
+                with open(os.path.join(output_dir, name), 'w', encoding='utf-8') as file:
+                    file.write(text)
+
+        errors: List[str] = []
+        reads = [0]
+        stop = threading.Event()
+        reader = threading.Thread(target=read_shared, args=(work_dir, expected, stop, errors, reads))
+        reader.start()
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                futures = [executor.submit(convert, index, paths, shared_models, expected, work_dir)
+                           for index in range(args.conversions)]
+                for future in futures:
+                    try:
+                        errors.extend(future.result())
+                    except Exception as e:
+                        errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            stop.set()
+            reader.join()
+        seconds = time.perf_counter() - started
+
+        leftovers = [name for directory, _, names in os.walk(work_dir) for name in names if name.endswith('.tmp')]
+        if leftovers:
+            errors.append(f"Остались временные файлы: {len(leftovers)}")
+
+    summary: Dict[str, object] = {
+        'conversions': args.conversions,
+        'threads': args.threads,
+        'shared_reads': reads[0],
+        'errors': len(errors),
+        'seconds': seconds,
+    }
+    print(f"Конвертаций: {summary['conversions']}, потоков: {summary['threads']}, "
+          f"чтений общих файлов: {summary['shared_reads']}, ошибок: {summary['errors']}, "
+          f"время: {seconds:.2f} с.")
+    for error in errors[:20]:
+        print(f"  {error}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
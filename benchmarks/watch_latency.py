@@ -0,0 +1,80 @@
+"""Замер задержки режима наблюдения: от сохранения модели до записанных артефактов.
+
+Пример запуска:
+    python benchmarks/watch_latency.py --classes 500 --edits 30
+    python benchmarks/watch_latency.py --classes 5000 --interval 0.05 --debounce 0.1
+
+Синтетическая модель (см. generate_model.py) записывается во временную директорию, за
+которой наблюдает Watcher (watch.py) в отдельном потоке. Каждая правка меняет
+документацию одного класса и перезаписывает файл целиком; задержка - время от начала
+записи файла до получения результата обработки (артефакты к этому моменту записаны).
+"""
+
+from typing import List
+import argparse
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generate_model import generate_model  # noqa: E402
+from watch import WatchResult, Watcher  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Задержка перегенерации в режиме наблюдения.")
+    parser.add_argument('--classes', type=int, default=500, help="классов в модели (500)")
+    parser.add_argument('--edits', type=int, default=30, help="количество правок (30)")
+    parser.add_argument('--interval', type=float, default=0.02, help="период опроса Watcher (0.02)")
+    parser.add_argument('--debounce', type=float, default=0.03, help="debounce Watcher (0.03)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_dir = os.path.join(work_dir, 'input')
+        os.makedirs(input_dir)
+        path = generate_model(os.path.join(input_dir, 'model.xml'), args.classes)
+        with open(path, encoding='utf-8') as file:
+            text = file.read()
+
+        results: 'queue.Queue[WatchResult]' = queue.Queue()
+        watcher = Watcher([input_dir], os.path.join(work_dir, 'out'), args.debounce, on_result=results.put)
+        stop = threading.Event()
+        thread = threading.Thread(target=watcher.run, args=(args.interval, stop))
+        thread.start()
+
+        latencies: List[float] = []
+        errors = 0
+        try:
+            initial = results.get(timeout=60)
+            print(f"Начальная генерация: {initial.seconds * 1000:.1f} мс")
+            for edit in range(args.edits):
+                # Документация класса меняется, размер файла может остаться прежним
+                edited = text.replace('documentation="', f'documentation="edit {edit} ', 1)
+                started = time.perf_counter()
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write(edited)
+                result = results.get(timeout=60)
+                latencies.append(time.perf_counter() - started)
+                errors += result.error is not None
+                # Следующая правка - после того, как mtime гарантированно изменится
+                time.sleep(0.01)
+        finally:
+            stop.set()
+            thread.join()
+
+    latencies.sort()
+    print(f"Правок: {len(latencies)}, ошибок: {errors}")
+    print(f"Задержка: медиана {statistics.median(latencies) * 1000:.1f} мс, "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f} мс, "
+          f"максимум {latencies[-1] * 1000:.1f} мс")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""Дисковый кэш артефактов, адресуемый по содержимому исходной модели.
+
+Ключ записи - sha256 от байтов исходного файла, версии генератора (GENERATOR_VERSION)
+и параметров генерации. Если ключ совпал, парсинг, валидация и генерация пропускаются,
+а готовые файлы копируются (или связываются жёсткими ссылками) в выходную директорию.
+
+Структура кэша:
+    <cache_dir>/<первые 2 символа ключа>/<ключ>/config.xml, meta.json, ...
+
+Время последнего использования записи хранится в mtime её директории; при превышении
+лимита размера удаляются давно не использованные записи (LRU).
+"""
+
+from typing import Iterable, List, Mapping, Optional, Tuple
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from main import GENERATOR_VERSION
+
+
+class ArtifactCache:
+    """Кэш артефактов с ограничением размера и вытеснением LRU.
+
+    Attributes
+    ----------
+    __cache_dir : str
+        Корневая директория кэша.
+    __max_bytes : Optional[int]
+        Лимит суммарного размера записей. None - без ограничения.
+    __link_outputs : bool
+        Восстанавливать артефакты жёсткими ссылками вместо копирования. Быстрее, но
+        выходные файлы становятся общими с кэшем: их нельзя изменять на месте, только
+        удалять или заменять (генераторы заменяют файлы атомарно, см. AtomicFile).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None, link_outputs: bool = False):
+        self.__cache_dir = os.path.abspath(cache_dir)
+        self.__max_bytes = max_bytes
+        self.__link_outputs = link_outputs
+
+    @staticmethod
+    def make_key(input_path: str, options: Mapping[str, object]) -> str:
+        """Вычисляет ключ записи по содержимому файла, версии генератора и параметрам.
+
+        :param input_path: str
+            Путь к исходной модели.
+        :param options: Mapping[str, object]
+            Параметры генерации, влияющие на результат (формат, кодировка и т.п.).
+
+        :return: str
+            Шестнадцатеричный sha256.
+        """
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps({'version': GENERATOR_VERSION, 'options': options}, sort_keys=True).encode())
+        with open(input_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def __entry_dir(self, key: str) -> str:
+        return os.path.join(self.__cache_dir, key[:2], key)
+
+    def fetch(self, key: str, file_names: Iterable[str], output_dir: str) -> bool:
+        """Восстанавливает артефакты записи в выходную директорию.
+
+        :param key: str
+            Ключ записи.
+        :param file_names: Iterable[str]
+            Имена ожидаемых файлов записи.
+        :param output_dir: str
+            Выходная директория.
+
+        :return: bool
+            True, если запись найдена и все файлы восстановлены.
+        """
+
+        entry_dir = self.__entry_dir(key)
+        file_names = list(file_names)
+        if not all(os.path.isfile(os.path.join(entry_dir, name)) for name in file_names):
+            return False
+
+        os.makedirs(output_dir, exist_ok=True)
+        for name in file_names:
+            self.__restore_file(os.path.join(entry_dir, name), os.path.join(output_dir, name))
+
+        # Отмечаем использование записи для LRU
+        os.utime(entry_dir)
+        return True
+
+    def store(self, key: str, file_names: Iterable[str], output_dir: str) -> None:
+        """Сохраняет сгенерированные артефакты в кэш.
+
+        Запись собирается во временной директории и переименовывается целиком, поэтому
+        параллельные процессы не видят частично записанных записей. Если запись с тем же
+        ключом уже создана другим процессом, новая отбрасывается.
+
+        :param key: str
+            Ключ записи.
+        :param file_names: Iterable[str]
+            Имена файлов в выходной директории, которые нужно сохранить.
+        :param output_dir: str
+            Выходная директория со сгенерированными файлами.
+        """
+
+        entry_dir = self.__entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=os.path.dirname(entry_dir))
+        try:
+            # Только копии: выходные файлы могут быть перезаписаны на месте следующей генерацией
+            for name in file_names:
+                shutil.copyfile(os.path.join(output_dir, name), os.path.join(temp_dir, name))
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            if not os.path.isdir(entry_dir):
+                raise
+
+    def invalidate(self, key: str) -> bool:
+        """Удаляет запись по ключу. Возвращает True, если запись существовала."""
+
+        entry_dir = self.__entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return False
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return True
+
+    def clear(self) -> None:
+        """Удаляет все записи кэша."""
+
+        shutil.rmtree(self.__cache_dir, ignore_errors=True)
+
+    def __entries(self) -> List[Tuple[float, int, str]]:
+        """Возвращает записи кэша в виде (время использования, размер, путь)."""
+
+        entries = []
+        if not os.path.isdir(self.__cache_dir):
+            return entries
+        for prefix in os.scandir(self.__cache_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.is_dir() or entry.name.startswith('.tmp-'):
+                    continue
+                size = sum(file.stat().st_size for file in os.scandir(entry.path) if file.is_file())
+                entries.append((entry.stat().st_mtime, size, entry.path))
+        return entries
+
+    def evict(self) -> int:
+        """Удаляет давно не использованные записи, пока размер кэша превышает лимит.
+
+        :return: int
+            Количество удалённых записей.
+        """
+
+        if self.__max_bytes is None:
+            return 0
+
+        entries = sorted(self.__entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.__max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def __restore_file(self, source: str, destination: str) -> None:
+        """Копирует файл записи в выходную директорию или создаёт на него жёсткую ссылку.
+
+        Существующий файл назначения сначала удаляется: он может оказаться жёсткой
+        ссылкой на другую запись, и запись поверх него изменила бы кэш.
+        """
+
+        if os.path.lexists(destination):
+            if self.__link_outputs and os.path.samefile(source, destination):
+                return
+            os.remove(destination)
+        if self.__link_outputs:
+            try:
+                os.link(source, destination)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(source, destination)
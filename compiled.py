@@ -0,0 +1,493 @@
+"""Бинарный снимок проверенной модели для быстрой повторной загрузки.
+
+Пример использования:
+    model = load_model('impulse_test_input.xml')   # XMI разбирается только если снимок устарел
+    XMLParser(model).main()
+    JSONParser(model).main()
+
+Исходный XMI остаётся источником истины: в заголовке снимка хранятся размер, mtime и
+sha256 содержимого исходного файла, и при несовпадении любого из них (а также при смене
+версии генератора или формата) снимок пересобирается после обычного парсинга и валидации.
+Хэш читает исходный файл целиком, но это многократно быстрее парсинга и валидации.
+В общей директории снимков (snapshot_dir) имя снимка включает хэш полного пути
+исходного файла, поэтому модели с одинаковым именем файла не делят один снимок.
+
+Формат файла (все числа little-endian, массивы - uint32):
+    заголовок HEADER;
+    string_offsets      [strings + 1]   смещения строк в блоке строк;
+    class_names         [classes]       номер строки имени класса;
+    property_starts     [classes + 1]   начало xml атрибутов класса в properties;
+    attribute_starts    [classes + 1]   начало элементов Attribute класса в attributes;
+    child_starts        [classes + 1]   начало вложенных классов в children;
+    class_aggregations  [classes]       агрегация, в которой класс является source (NONE - нет);
+    sorted_classes      [classes]       номера классов, упорядоченные по байтам имени;
+    properties          [2 * properties]    пары (ключ, значение);
+    attributes          [2 * attributes]    пары (имя, тип);
+    children            [children]          номера вложенных классов в порядке агрегаций;
+    aggregations        [4 * aggregations]  (source, target, sourceMultiplicity, targetMultiplicity);
+    блок строк в UTF-8.
+
+Файл отображается в память (mmap), массивы читаются через memoryview без копирования.
+Загрузка не зависит от размера модели: объекты ClassDef, AttributeDef и AggregationDef
+создаются при первом обращении к ним, строки декодируются один раз.
+
+pack_model() строит тот же формат в памяти без файла: упакованная модель занимает
+в несколько раз меньше памяти, чем объекты классов, и подходит для генерации
+артефактов по очень большим моделям.
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+
+from instrumentation import Instrumentation
+from main import GENERATOR_VERSION, AggregationDef, AtomicFile, AttributeDef, ClassDef, HierarchyIndex, XMLModel
+
+MAGIC = b'UMLMODEL'
+FORMAT_VERSION = 2
+NONE = 0xFFFFFFFF
+
+# magic, версия формата, версия генератора, размер, mtime_ns и sha256 исходного файла,
+# количество строк, классов, xml атрибутов классов, Attribute, вложенных классов, агрегаций,
+# номер корневого класса, размер блока строк, выравнивание до 8 байт
+HEADER = struct.Struct('<8sIIQq32sIIIIIIIQ4x')
+
+SUFFIX = '.model'
+
+
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def source_digest(path: str) -> bytes:
+    """sha256 содержимого исходного файла (читается блоками, как в cache.py)."""
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+
+def encode_snapshot(model: XMLModel, source_size: int = 0, source_mtime_ns: int = 0,
+                    source_sha256: bytes = b'') -> List[bytes]:
+    """Кодирует модель в формат снимка.
+
+    :param model: XMLModel
+        Проверенная модель.
+    :param source_size: int
+        Размер исходного файла, по которому построена модель.
+    :param source_mtime_ns: int
+        Время изменения исходного файла.
+    :param source_sha256: bytes
+        sha256 содержимого исходного файла (см. source_digest()).
+
+    :return: List[bytes]
+        Части снимка (заголовок, массивы, блок строк), которые нужно записать подряд.
+    """
+
+    strings: Dict[str, int] = {}
+
+    def string_id(value: str) -> int:
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    class_indexes = {class_def.name: index for index, class_def in enumerate(model.classes)}
+    aggregation_indexes = {id(aggregation): index for index, aggregation in enumerate(model.aggregations)}
+
+    class_names, class_aggregations = array('I'), array('I')
+    property_starts, attribute_starts, child_starts = array('I', [0]), array('I', [0]), array('I', [0])
+    properties, attributes, children, aggregations = array('I'), array('I'), array('I'), array('I')
+
+    for class_def in model.classes:
+        class_names.append(string_id(class_def.name))
+        for key, value in class_def.properties:
+            properties.append(string_id(key))
+            properties.append(string_id(value))
+        for attribute in class_def.attributes:
+            attributes.append(string_id(attribute.name))
+            attributes.append(string_id(attribute.type))
+        children.extend(class_indexes[child.name] for child in class_def.children)
+        property_starts.append(len(properties) // 2)
+        attribute_starts.append(len(attributes) // 2)
+        child_starts.append(len(children))
+        aggregation = class_def.aggregation
+        class_aggregations.append(NONE if aggregation is None else aggregation_indexes[id(aggregation)])
+
+    for aggregation in model.aggregations:
+        aggregations.extend((
+            class_indexes[aggregation.source], class_indexes[aggregation.target],
+            string_id(aggregation.source_multiplicity),
+            NONE if aggregation.target_multiplicity is None else string_id(aggregation.target_multiplicity)))
+
+    encoded = [value.encode('utf-8', 'surrogatepass') for value in strings]
+    string_offsets = array('I', [0])
+    size = 0
+    for value in encoded:
+        size += len(value)
+        string_offsets.append(size)
+    if size >= NONE:
+        raise ValueError("Строки модели не помещаются в снимок (больше 4 ГБ).")
+
+    names = [encoded[index] for index in class_names]
+    sorted_classes = array('I', sorted(range(len(names)), key=names.__getitem__))
+
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, GENERATOR_VERSION, source_size, source_mtime_ns, source_sha256,
+                         len(strings), len(model.classes), len(properties) // 2, len(attributes) // 2,
+                         len(children), len(model.aggregations), class_indexes[model.root.name], size)
+
+    sections = [_to_bytes(section) for section in (
+        string_offsets, class_names, property_starts, attribute_starts, child_starts, class_aggregations,
+        sorted_classes, properties, attributes, children, aggregations)]
+    return [header, *sections, b''.join(encoded)]
+
+
+def write_snapshot(model: XMLModel, path: str, source_size: int = 0, source_mtime_ns: int = 0,
+                   source_sha256: bytes = b'') -> None:
+    """Записывает снимок модели в файл (атомарно, через временный файл и переименование).
+
+    :param model: XMLModel
+        Проверенная модель.
+    :param path: str
+        Путь к файлу снимка.
+    :param source_size: int
+        Размер исходного файла, по которому построена модель.
+    :param source_mtime_ns: int
+        Время изменения исходного файла.
+    :param source_sha256: bytes
+        sha256 содержимого исходного файла (см. source_digest()).
+    """
+
+    parts = encode_snapshot(model, source_size, source_mtime_ns, source_sha256)
+    with AtomicFile(path, 'wb') as file:
+        for part in parts:
+            file.write(part)
+
+
+def pack_model(model: XMLModel) -> XMLModel:
+    """Упаковывает модель в память в формате снимка, без файла.
+
+    Имена классов, ключи и значения xml атрибутов, имена и типы Attribute хранятся
+    один раз в таблице строк, а классы, атрибуты и агрегации - номерами в массивах.
+    Объекты ClassDef упакованной модели создаются при каждом обращении и не
+    сохраняются (см. CompiledModel, cache_classes), поэтому генерация по упакованной модели
+    удерживает в памяти только таблицы и строки, а не объекты всех классов. Строки
+    декодируются и интернируются один раз на модель.
+
+    Исходную модель после упаковки можно освободить.
+
+    :param model: XMLModel
+        Проверенная модель.
+
+    :return: XMLModel
+        Модель с тем же содержимым поверх упакованных таблиц.
+    """
+
+    return CompiledModel(b''.join(encode_snapshot(model)), cache_classes=False).model
+
+
+class CompiledModel:
+    """Снимок модели, отображённый в память, или снимок в памяти (см. pack_model()).
+
+    Parameters
+    ----------
+    source : Union[str, bytes]
+        Путь к файлу снимка или содержимое снимка.
+    cache_classes : bool
+        Сохранять ли созданные объекты ClassDef. Без сохранения каждый класс создаётся
+        заново при обращении, а в памяти остаются только таблицы, строки и агрегации.
+
+    Attributes
+    ----------
+    source_size : int
+        Размер исходного файла на момент построения снимка.
+    source_mtime_ns : int
+        Время изменения исходного файла на момент построения снимка.
+    source_sha256 : bytes
+        sha256 содержимого исходного файла (32 нулевых байта, если не задан).
+    model : XMLModel
+        Модель, объекты которой создаются при первом обращении.
+    """
+
+    def __init__(self, source: Union[str, bytes], cache_classes: bool = True):
+        if isinstance(source, bytes):
+            path = '<memory>'
+            self.__buffer = source
+        else:
+            path = source
+            with open(path, 'rb') as file:
+                self.__buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__cache_classes = cache_classes
+
+        try:
+            (magic, format_version, generator_version, self.source_size, self.source_mtime_ns, self.source_sha256,
+             n_strings,
+             n_classes, n_properties, n_attributes, n_children, n_aggregations, root,
+             strings_size) = HEADER.unpack_from(self.__buffer)
+        except struct.error:
+            raise ValueError(f"Файл '{path}' не является снимком модели.")
+        if magic != MAGIC or format_version != FORMAT_VERSION or generator_version != GENERATOR_VERSION:
+            raise ValueError(f"Снимок '{path}' создан другой версией и должен быть пересобран.")
+
+        view = memoryview(self.__buffer)
+        offset = HEADER.size
+
+        def section(length: int) -> Sequence[int]:
+            nonlocal offset
+            values = view[offset:offset + 4 * length].cast('I')
+            offset += 4 * length
+            if sys.byteorder == 'big':
+                values = array('I', values)
+                values.byteswap()
+            return values
+
+        self.__string_offsets = section(n_strings + 1)
+        self.__class_names = section(n_classes)
+        self.__property_starts = section(n_classes + 1)
+        self.__attribute_starts = section(n_classes + 1)
+        self.__child_starts = section(n_classes + 1)
+        self.__class_aggregations = section(n_classes)
+        self.__sorted_classes = section(n_classes)
+        self.__properties = section(2 * n_properties)
+        self.__attributes = section(2 * n_attributes)
+        self.__children = section(n_children)
+        self.__aggregations = section(4 * n_aggregations)
+        self.__strings_offset = offset
+        if offset + strings_size != len(self.__buffer):
+            raise ValueError(f"Снимок '{path}' повреждён.")
+
+        self.__strings: List[Optional[str]] = [None] * n_strings
+        self.__class_defs: List[Optional[ClassDef]] = [None] * n_classes
+        self.__aggregation_defs: List[Optional[AggregationDef]] = [None] * n_aggregations
+
+        classes_by_name = _ClassIndex(self)
+        aggregations = _LazySequence(self.aggregation_def, n_aggregations)
+        self.model = XMLModel(
+            classes=_LazySequence(self.class_def, n_classes),
+            classes_by_name=classes_by_name,
+            aggregations=aggregations,
+            root=self.class_def(root),
+            hierarchy=HierarchyIndex(classes_by_name, aggregations, self.class_name(root)),
+        )
+
+    def string(self, index: int) -> str:
+        """Строка из таблицы строк (декодируется при первом обращении)."""
+
+        value = self.__strings[index]
+        if value is None:
+            start = self.__strings_offset + self.__string_offsets[index]
+            end = self.__strings_offset + self.__string_offsets[index + 1]
+            value = self.__strings[index] = sys.intern(self.__buffer[start:end].decode('utf-8', 'surrogatepass'))
+        return value
+
+    def class_name(self, index: int) -> str:
+        """Имя index-го класса без создания ClassDef."""
+
+        return self.string(self.__class_names[index])
+
+    def class_def(self, index: int) -> ClassDef:
+        """Класс модели с номером index (в порядке документа)."""
+
+        class_def = self.__class_defs[index]
+        if class_def is not None:
+            return class_def
+
+        string = self.string
+        start, end = self.__property_starts[index], self.__property_starts[index + 1]
+        values = list(map(string, self.__properties[2 * start:2 * end]))
+        properties = tuple(zip(values[0::2], values[1::2]))
+        start, end = self.__attribute_starts[index], self.__attribute_starts[index + 1]
+        values = list(map(string, self.__attributes[2 * start:2 * end]))
+
+        class_def = _CompiledClassDef.__new__(_CompiledClassDef)
+        class_def.name = string(self.__class_names[index])
+        class_def.properties = properties
+        class_def.is_root = dict(properties).get('isRoot') == 'true'
+        class_def.attributes = tuple(map(AttributeDef, values[0::2], values[1::2]))
+        aggregation = self.__class_aggregations[index]
+        class_def.aggregation = None if aggregation == NONE else self.aggregation_def(aggregation)
+        class_def._compiled = self
+        class_def._index = index
+        if self.__cache_classes:
+            self.__class_defs[index] = class_def
+        return class_def
+
+    def children(self, index: int) -> Tuple[ClassDef, ...]:
+        """Вложенные классы класса index в порядке агрегаций."""
+
+        return tuple(map(self.class_def, self.__children[self.__child_starts[index]:self.__child_starts[index + 1]]))
+
+    def aggregation_def(self, index: int) -> AggregationDef:
+        """Агрегация модели с номером index (в порядке документа)."""
+
+        aggregation_def = self.__aggregation_defs[index]
+        if aggregation_def is None:
+            source, target, source_multiplicity, target_multiplicity = self.__aggregations[4 * index:4 * index + 4]
+            aggregation_def = self.__aggregation_defs[index] = AggregationDef(
+                self.string(self.__class_names[source]), self.string(self.__class_names[target]),
+                self.string(source_multiplicity), None if target_multiplicity == NONE else self.string(target_multiplicity))
+        return aggregation_def
+
+    def find_class(self, name: str) -> Optional[int]:
+        """Номер класса по имени: двоичный поиск по упорядоченному списку, без построения индекса."""
+
+        key = name.encode('utf-8', 'surrogatepass')
+        offsets, names, sorted_classes = self.__string_offsets, self.__class_names, self.__sorted_classes
+        base = self.__strings_offset
+        low, high = 0, len(sorted_classes)
+        while low < high:
+            middle = (low + high) // 2
+            string_index = names[sorted_classes[middle]]
+            candidate = self.__buffer[base + offsets[string_index]:base + offsets[string_index + 1]]
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return sorted_classes[middle]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.__class_defs)
+
+
+class _CompiledClassDef(ClassDef):
+    """ClassDef снимка: вложенные классы создаются только при обращении к ним."""
+
+    __slots__ = ('_compiled', '_index', '_children')
+
+    @property
+    def children(self) -> Tuple[ClassDef, ...]:
+        try:
+            return self._children
+        except AttributeError:
+            self._children = self._compiled.children(self._index)
+            return self._children
+
+
+class _LazySequence(Sequence):
+    """Последовательность объектов снимка, создаваемых при обращении."""
+
+    def __init__(self, factory, length: int):
+        self.__factory = factory
+        self.__length = length
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self.__factory(position) for position in range(*index.indices(self.__length)))
+        if index < 0:
+            index += self.__length
+        if not 0 <= index < self.__length:
+            raise IndexError(index)
+        return self.__factory(index)
+
+    def __iter__(self) -> Iterator:
+        factory = self.__factory
+        for index in range(self.__length):
+            yield factory(index)
+
+
+class _ClassIndex(Mapping):
+    """Индекс классов по имени поверх снимка."""
+
+    def __init__(self, compiled: CompiledModel):
+        self.__compiled = compiled
+
+    def __getitem__(self, name: str) -> ClassDef:
+        index = self.__compiled.find_class(name)
+        if index is None:
+            raise KeyError(name)
+        return self.__compiled.class_def(index)
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and self.__compiled.find_class(name) is not None
+
+    def __len__(self) -> int:
+        return len(self.__compiled)
+
+    def __iter__(self) -> Iterator[str]:
+        return map(self.__compiled.class_name, range(len(self.__compiled)))
+
+
+def snapshot_path(input_path: str, snapshot_dir: Optional[str] = None) -> str:
+    """Путь к снимку исходного файла: рядом с ним или в snapshot_dir.
+
+    В snapshot_dir имя снимка - <имя файла>.<хэш абсолютного пути>.model: снимки
+    файлов с одинаковым именем из разных директорий не совпадают.
+    """
+
+    if snapshot_dir is None:
+        return input_path + SUFFIX
+    path_hash = hashlib.sha256(os.path.abspath(input_path).encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(snapshot_dir, f"{os.path.basename(input_path)}.{path_hash}{SUFFIX}")
+
+
+def load_model(input_file_name: str, snapshot_dir: Optional[str] = None, streaming: bool = False,
+               verbose: bool = False, instrumentation: Optional[Instrumentation] = None,
+               collect_all: bool = False, packed: bool = False) -> XMLModel:
+    """Загружает модель из снимка, а если снимка нет или он устарел - из XMI с пересборкой снимка.
+
+    :param input_file_name: str
+        Исходный файл. Относительный путь отсчитывается от директории 'input'
+        (как в XMLModel.from_file()), абсолютный используется как есть.
+    :param snapshot_dir: Optional[str]
+        Директория снимков (см. snapshot_path()). По умолчанию снимок лежит рядом
+        с исходным файлом (<имя файла>.model).
+    :param streaming: bool
+        Потоковое чтение XMI при пересборке (см. XMLValidator.validate_and_check_tags()).
+    :param verbose: bool
+        Выводить ли сообщения валидатора при пересборке.
+    :param instrumentation: Optional[Instrumentation]
+        Замеры этапов: 'snapshot.load' или парсинг и валидация и 'snapshot.write'.
+    :param collect_all: bool
+        Собирать все нарушения валидации при пересборке (см. XMLValidator).
+    :param packed: bool
+        Не сохранять объекты классов снимка (см. pack_model()). После пересборки
+        модель тоже загружается из снимка, а разобранная модель освобождается.
+
+    :return: XMLModel
+    """
+
+    full_path = os.path.join('./input', input_file_name)
+    stat = os.stat(full_path)
+    path = snapshot_path(full_path, snapshot_dir)
+    started = time.perf_counter()
+    digest = source_digest(full_path)
+
+    if os.path.isfile(path):
+        try:
+            compiled = CompiledModel(path, cache_classes=not packed)
+        except (OSError, ValueError):
+            compiled = None
+        # Размер и mtime могут совпасть у разных файлов (например, распакованных из одного
+        # архива), поэтому снимок соответствует исходному файлу, только если совпадает и хэш
+        if compiled is not None and (compiled.source_size, compiled.source_mtime_ns, compiled.source_sha256) == (
+                stat.st_size, stat.st_mtime_ns, digest):
+            if instrumentation is not None:
+                instrumentation.record('snapshot.load', time.perf_counter() - started, len(compiled))
+            return compiled.model
+
+    model = XMLModel.from_file(input_file_name, streaming=streaming, verbose=verbose, instrumentation=instrumentation,
+                                collect_all=collect_all)
+    started = time.perf_counter()
+    if snapshot_dir is not None:
+        os.makedirs(snapshot_dir, exist_ok=True)
+    write_snapshot(model, path, stat.st_size, stat.st_mtime_ns, digest)
+    if instrumentation is not None:
+        instrumentation.record('snapshot.write', time.perf_counter() - started, len(model.classes))
+    if packed:
+        return CompiledModel(path, cache_classes=False).model
+    return model
@@ -0,0 +1,418 @@
+"""Подключаемые генераторы артефактов поверх общего обхода модели.
+
+Пример использования:
+    model = XMLModel.from_file('impulse_test_input.xml')
+    emit(model, [ConfigXMLEmitter(), MetaJSONEmitter(), SQLEmitter(), SchemaEmitter()], output_dir='./out')
+
+Пример запуска:
+    python emitters.py input/impulse_test_input.xml --format schema.sql --format schema.json -o ./out
+
+emit() обходит модель один раз для всех генераторов и вызывает у каждого короткие
+обработчики событий:
+    visit(record)           - классы в порядке документа; ClassRecord с агрегациями класса
+                              вычисляется один раз и передаётся всем генераторам;
+    enter(class_def, depth) - вход в класс при обходе иерархии от корневого класса
+    leave(class_def, depth)   в порядке config.xml (только для генераторов с tree = True).
+Каждый вид обхода выполняется, только если он нужен хотя бы одному генератору.
+emit() записывает артефакты в файлы выходной директории, emit_to() - в открытые потоки.
+
+Встроенные генераторы (EMITTERS):
+    config.xml   - иерархия классов (или экземпляры), совпадает с XMLParser;
+    meta.json    - мета-информация классов, совпадает с JSONParser;
+    schema.sql   - SQL DDL: таблица на класс, внешние ключи по агрегациям;
+    schema.json  - компактная схема для сервисов: атрибуты и вложенные классы с мощностью.
+Новые форматы добавляются подклассом Emitter и регистрацией в EMITTERS.
+"""
+
+from contextlib import ExitStack
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, TextIO, Tuple, Union
+import json
+import os
+import sys
+
+from instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from main import AggregationDef, AtomicFile, ClassDef, JSONParser, XMLModel, XMLParser, multiplicity_bounds
+
+
+class ClassRecord(NamedTuple):
+    """Класс модели вместе с его агрегациями, общий для всех генераторов.
+
+    Attributes
+    ----------
+    class_def : ClassDef
+        Класс модели.
+    index : int
+        Номер класса в документе.
+    children : Tuple[AggregationDef, ...]
+        Агрегации, в которых класс является target (вложенные классы), в порядке документа.
+    parents : Tuple[AggregationDef, ...]
+        Агрегации, в которых класс является source (включающие классы), в порядке документа.
+    """
+
+    class_def: ClassDef
+    index: int
+    children: Tuple[AggregationDef, ...]
+    parents: Tuple[AggregationDef, ...]
+
+
+class Emitter:
+    """Базовый генератор артефакта. Обработчики по умолчанию ничего не делают.
+
+    Экземпляр хранит состояние одной генерации, поэтому одновременные вызовы emit()
+    из разных потоков должны получать разные экземпляры (например, из EMITTERS).
+
+    Attributes
+    ----------
+    file_name : str
+        Имя файла артефакта в выходной директории.
+    tree : bool
+        Получать события обхода иерархии enter()/leave() вместо visit().
+    errors : str
+        Обработка символов, не представимых в кодировке файла (см. open()).
+    """
+
+    file_name = ''
+    tree = False
+    errors = 'strict'
+
+    def begin(self, model: XMLModel, write: Callable[[str], object]) -> None:
+        """Вызывается перед обходом. write записывает текст в файл артефакта."""
+
+    def visit(self, record: ClassRecord) -> None:
+        """Вызывается для каждого класса в порядке документа."""
+
+    def enter(self, class_def: ClassDef, depth: int) -> None:
+        """Вызывается при входе в класс при обходе иерархии."""
+
+    def leave(self, class_def: ClassDef, depth: int) -> None:
+        """Вызывается после обхода вложенных классов."""
+
+    def end(self) -> None:
+        """Вызывается после обхода."""
+
+
+class ConfigXMLEmitter(Emitter):
+    """config.xml в формате XMLParser.
+
+    Строки классов формирует XMLParser (open_class(), close_class()), поэтому результат
+    совпадает с XMLParser.write() байт в байт. В режиме экземпляров агрегации
+    разворачиваются по мощности, и общий обход иерархии не подходит: строки
+    XMLParser.iter_instances() пишутся в begin().
+    """
+
+    file_name = 'config.xml'
+    errors = 'xmlcharrefreplace'
+
+    def __init__(self, indent: str = "    ", instances: Optional[Union[str, int]] = None):
+        self.__indent = indent
+        self.__instances = instances
+        self.tree = instances is None
+        self.__parser: Optional[XMLParser] = None
+        self.__write: Optional[Callable[[str], object]] = None
+
+    def begin(self, model: XMLModel, write: Callable[[str], object]) -> None:
+        self.__parser = parser = XMLParser(model, self.__indent, instances=self.__instances)
+        self.__write = write
+        write(parser.declaration())
+        if self.__instances is not None:
+            for line in parser.iter_instances():
+                write(line)
+
+    def enter(self, class_def: ClassDef, depth: int) -> None:
+        self.__write(self.__parser.open_class(class_def, depth))
+
+    def leave(self, class_def: ClassDef, depth: int) -> None:
+        closing = self.__parser.close_class(class_def, depth)
+        if closing:
+            self.__write(closing)
+
+
+class MetaJSONEmitter(Emitter):
+    """meta.json (meta.ndjson для NDJSON) в формате JSONParser.
+
+    Записи классов и обрамление формирует JSONParser (encode_class(), delimiters(),
+    encode_end()), поэтому результат совпадает с JSONParser.write() байт в байт.
+    """
+
+    def __init__(self, output_format: str = JSONParser.PRETTY):
+        self.__output_format = output_format
+        self.file_name = 'meta.ndjson' if output_format == JSONParser.NDJSON else 'meta.json'
+        self.__parser: Optional[JSONParser] = None
+        self.__write: Optional[Callable[[str], object]] = None
+        self.__delimiters = ('', '', '')
+        self.__written = 0
+
+    def begin(self, model: XMLModel, write: Callable[[str], object]) -> None:
+        self.__parser = JSONParser(model, self.__output_format)
+        self.__write = write
+        self.__delimiters = self.__parser.delimiters()
+        self.__written = 0
+
+    def visit(self, record: ClassRecord) -> None:
+        opening, separator, _ = self.__delimiters
+        self.__write((separator if self.__written else opening) + self.__parser.encode_class(record.class_def))
+        self.__written += 1
+
+    def end(self) -> None:
+        ending = self.__parser.encode_end(self.__written)
+        if ending:
+            self.__write(ending)
+
+
+class SQLEmitter(Emitter):
+    """SQL DDL: по таблице на класс, агрегации - внешние ключи на включающий класс.
+
+    Каждая таблица получает суррогатный первичный ключ "_id" и по столбцу
+    "_<включающий класс>_id" на каждый включающий класс. Если имя служебного столбца
+    совпадает с атрибутом класса (или с другим служебным столбцом), к нему добавляется
+    "_", пока имя не станет уникальным; внешние ключи ссылаются на переименованный
+    первичный ключ включающего класса. Столбец обязателен, если у класса
+    один включающий класс и нижняя граница мощности каждой агрегации в него больше нуля. Внешние ключи добавляются
+    после создания всех таблиц (ALTER TABLE), поэтому порядок таблиц совпадает с
+    порядком классов в документе. Атрибуты становятся столбцами с типом по SQL_TYPES,
+    неизвестные типы - TEXT.
+    """
+
+    file_name = 'schema.sql'
+
+    SQL_TYPES = {
+        'boolean': 'BOOLEAN', 'bool': 'BOOLEAN',
+        'int8': 'SMALLINT', 'uint8': 'SMALLINT', 'int16': 'SMALLINT', 'short': 'SMALLINT',
+        'uint16': 'INTEGER', 'int32': 'INTEGER', 'int': 'INTEGER',
+        'uint32': 'BIGINT', 'int64': 'BIGINT', 'long': 'BIGINT', 'uint64': 'NUMERIC(20)',
+        'float': 'REAL', 'double': 'DOUBLE PRECISION',
+        'string': 'TEXT',
+    }
+
+    def __init__(self):
+        self.__write: Optional[Callable[[str], object]] = None
+        self.__foreign_keys: List[str] = []
+        self.__model: Optional[XMLModel] = None
+        self.__primary_keys: Dict[str, str] = {}
+
+    @staticmethod
+    def quote(identifier: str) -> str:
+        """Идентификатор SQL в двойных кавычках."""
+
+        return '"' + identifier.replace('"', '""') + '"'
+
+    @staticmethod
+    def unique_column(name: str, taken: Set[str]) -> str:
+        """Имя служебного столбца, не совпадающее с занятыми: к name добавляется "_"."""
+
+        while name in taken:
+            name += '_'
+        return name
+
+    def begin(self, model: XMLModel, write: Callable[[str], object]) -> None:
+        self.__write = write
+        self.__foreign_keys = []
+        self.__model = model
+        self.__primary_keys = {}
+
+    def __primary_key(self, class_name: str) -> str:
+        """Имя первичного ключа таблицы класса (вычисляется один раз на класс)."""
+
+        primary_key = self.__primary_keys.get(class_name)
+        if primary_key is None:
+            attributes = self.__model.classes_by_name[class_name].attributes
+            primary_key = self.__primary_keys[class_name] = self.unique_column(
+                '_id', {attribute.name for attribute in attributes})
+        return primary_key
+
+    def visit(self, record: ClassRecord) -> None:
+        quote = self.quote
+        class_def = record.class_def
+        table = quote(class_def.name)
+
+        documentation = dict(class_def.properties).get('documentation')
+        if documentation:
+            self.__write(f"-- {' '.join(documentation.split())}\n")
+
+        primary_key = self.__primary_key(class_def.name)
+        taken = {attribute.name for attribute in class_def.attributes}
+        taken.add(primary_key)
+        columns = [f"    {quote(primary_key)} BIGINT PRIMARY KEY"]
+        targets = dict.fromkeys(aggregation.target for aggregation in record.parents)
+        # Несколько агрегаций в один включающий класс дают один столбец; он обязателен,
+        # только если нижняя граница каждой из них больше нуля
+        required = len(targets) == 1 and min(
+            multiplicity_bounds(aggregation.source_multiplicity)[0] for aggregation in record.parents) > 0
+        for target in targets:
+            column_name = self.unique_column(f"_{target}_id", taken)
+            taken.add(column_name)
+            column = quote(column_name)
+            columns.append(f"    {column} BIGINT{' NOT NULL' if required else ''}")
+            self.__foreign_keys.append(f"ALTER TABLE {table} ADD FOREIGN KEY ({column}) "
+                                       f"REFERENCES {quote(target)} ({quote(self.__primary_key(target))});\n")
+        for attribute in class_def.attributes:
+            columns.append(f"    {quote(attribute.name)} {self.SQL_TYPES.get(attribute.type.lower(), 'TEXT')}")
+
+        self.__write(f"CREATE TABLE {table} (\n" + ",\n".join(columns) + "\n);\n\n")
+
+    def end(self) -> None:
+        for statement in self.__foreign_keys:
+            self.__write(statement)
+
+
+class SchemaEmitter(Emitter):
+    """Компактная схема модели для сервисов: JSON в одну строку.
+
+    Формат: {"root": <корневой класс>, "classes": [{"name": ..., "attributes": [[имя, тип], ...],
+    "children": [[класс, sourceMultiplicity], ...]}, ...]}, классы в порядке документа.
+    """
+
+    file_name = 'schema.json'
+
+    def __init__(self):
+        self.__write: Optional[Callable[[str], object]] = None
+
+    def begin(self, model: XMLModel, write: Callable[[str], object]) -> None:
+        self.__write = write
+        write('{"root":' + json.dumps(model.root.name) + ',"classes":[')
+
+    def visit(self, record: ClassRecord) -> None:
+        class_def = record.class_def
+        entry = {
+            'name': class_def.name,
+            'attributes': [[attribute.name, attribute.type] for attribute in class_def.attributes],
+            'children': [[aggregation.source, aggregation.source_multiplicity] for aggregation in record.children],
+        }
+        self.__write((',' if record.index else '') + json.dumps(entry, separators=(',', ':')))
+
+    def end(self) -> None:
+        self.__write(']}\n')
+
+
+# Генераторы по имени формата: фабрика генератора с параметрами по умолчанию
+EMITTERS: Dict[str, Callable[[], Emitter]] = {
+    'config.xml': ConfigXMLEmitter,
+    'meta.json': MetaJSONEmitter,
+    'schema.sql': SQLEmitter,
+    'schema.json': SchemaEmitter,
+}
+
+
+def walk(model: XMLModel, emitters: Sequence[Emitter], instrumentation: Optional[Instrumentation] = None) -> None:
+    """Передаёт генераторам события обхода модели (без begin() и end()).
+
+    Классы в порядке документа обходятся один раз для всех генераторов без tree,
+    иерархия - один раз для всех генераторов с tree. Обход иерархии итеративный,
+    глубина не ограничена лимитом рекурсии.
+    """
+
+    instrumentation = NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+    visitors = [emitter.visit for emitter in emitters if not emitter.tree]
+    tree_emitters = [emitter for emitter in emitters if emitter.tree]
+
+    if visitors:
+        with instrumentation.stage('emit.classes') as stage:
+            children: Dict[str, List[AggregationDef]] = {}
+            parents: Dict[str, List[AggregationDef]] = {}
+            for aggregation in model.aggregations:
+                children.setdefault(aggregation.target, []).append(aggregation)
+                parents.setdefault(aggregation.source, []).append(aggregation)
+            for index, class_def in enumerate(model.classes):
+                record = ClassRecord(class_def, index, tuple(children.get(class_def.name, ())),
+                                     tuple(parents.get(class_def.name, ())))
+                for visit in visitors:
+                    visit(record)
+            stage.elements = len(model.classes)
+
+    if tree_emitters:
+        with instrumentation.stage('emit.tree') as stage:
+            enters = [emitter.enter for emitter in tree_emitters]
+            leaves = [emitter.leave for emitter in tree_emitters]
+            visited = 0
+            # Элементы стека: (глубина, класс, выход из класса)
+            stack: List[Tuple[int, ClassDef, bool]] = [(0, model.root, False)]
+            while stack:
+                depth, class_def, leaving = stack.pop()
+                if leaving:
+                    for leave in leaves:
+                        leave(class_def, depth)
+                    continue
+                visited += 1
+                for enter in enters:
+                    enter(class_def, depth)
+                stack.append((depth, class_def, True))
+                for child in reversed(class_def.children):
+                    stack.append((depth + 1, child, False))
+            stage.elements = visited
+
+
+def emit(model: XMLModel, emitters: Iterable[Emitter], output_dir: str = './out',
+         instrumentation: Optional[Instrumentation] = None) -> List[str]:
+    """Записывает артефакты всех генераторов за один общий обход модели.
+
+    :param model: XMLModel
+        Модель исходного файла.
+    :param emitters: Iterable[Emitter]
+        Генераторы артефактов. Имена файлов не должны совпадать.
+    :param output_dir: str
+        Директория артефактов. По умолчанию './out'.
+    :param instrumentation: Optional[Instrumentation]
+        Замеры этапов 'emit.begin', 'emit.classes', 'emit.tree' и 'emit.end'.
+
+    :return: List[str]
+        Пути к записанным файлам. Файлы заменяются атомарно и только если все
+        генераторы завершились без ошибок (см. AtomicFile).
+    """
+
+    emitters = list(emitters)
+    paths = [os.path.join(output_dir, emitter.file_name) for emitter in emitters]
+    if len(set(paths)) != len(paths):
+        raise ValueError("Имена файлов генераторов совпадают.")
+
+    with ExitStack() as stack:
+        files = [stack.enter_context(AtomicFile(path, 'w', encoding='utf-8', errors=emitter.errors))
+                 for emitter, path in zip(emitters, paths)]
+        emit_to(model, emitters, files, instrumentation)
+    return paths
+
+
+def emit_to(model: XMLModel, emitters: Sequence[Emitter], files: Sequence[TextIO],
+            instrumentation: Optional[Instrumentation] = None) -> None:
+    """Записывает артефакты генераторов в открытые текстовые потоки за один общий обход модели.
+
+    :param emitters: Sequence[Emitter]
+        Генераторы артефактов.
+    :param files: Sequence[TextIO]
+        Потоки, открытые на запись, по одному на генератор (в том же порядке).
+        Обработку непредставимых символов (Emitter.errors) задаёт вызывающий код.
+    :param instrumentation: Optional[Instrumentation]
+        Замеры этапов (см. emit()).
+    """
+
+    instrumentation = NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+    with instrumentation.stage('emit.begin'):
+        for emitter, file in zip(emitters, files):
+            emitter.begin(model, file.write)
+    walk(model, emitters, instrumentation)
+    with instrumentation.stage('emit.end'):
+        for emitter in emitters:
+            emitter.end()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки."""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Генерация артефактов UML-модели за один обход.")
+    parser.add_argument('input', help="файл модели")
+    parser.add_argument('-o', '--output', default='./out', help="директория артефактов (./out)")
+    parser.add_argument('-f', '--format', dest='formats', action='append', choices=sorted(EMITTERS),
+                        help="формат артефакта, можно указать несколько раз (все форматы)")
+    parser.add_argument('--streaming', action='store_true', help="потоковое чтение большой модели")
+    args = parser.parse_args(argv)
+
+    model = XMLModel.from_file(os.path.abspath(args.input), streaming=args.streaming, verbose=False)
+    os.makedirs(args.output, exist_ok=True)
+    for path in emit(model, [EMITTERS[name]() for name in args.formats or EMITTERS], args.output):
+        print(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
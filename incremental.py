@@ -0,0 +1,486 @@
+"""Инкрементальная перегенерация config.xml и meta.json по изменениям модели.
+
+Пример использования:
+    generator = IncrementalGenerator(output_dir='./out')
+    result = generator.generate(XMLModel.from_file('impulse_test_input.xml'))
+    print(result.diff)
+
+Рядом с артефактами сохраняется снимок модели (model_snapshot.json): отпечатки
+каждого класса (xml атрибуты, Attribute, агрегация, вложенные классы) и позиции
+записей классов в meta.json и поддеревьев классов в config.xml. При следующем запуске
+новая модель сравнивается со снимком, и заново кодируются только записи изменённых
+классов и поддеревья config.xml, в которых есть изменения. Неизменившиеся фрагменты
+копируются из прежних файлов блоками байт, без сериализации.
+
+Разбор входного файла, сравнение отпечатков и копирование байт остаются линейными
+по размеру модели, но это дешёвые операции; стоимость сериализации определяется
+размером изменения. Если снимок отсутствует, создан с другими параметрами или
+артефакты изменены после него, выполняется полная генерация.
+"""
+
+from contextlib import nullcontext
+from typing import BinaryIO, Dict, List, Mapping, NamedTuple, Optional, Set, Tuple
+import hashlib
+import json
+import os
+
+from instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from main import GENERATOR_VERSION, AtomicFile, ClassDef, JSONParser, XMLModel, XMLParser
+
+SNAPSHOT_FILE_NAME = 'model_snapshot.json'
+
+# Части отпечатка класса в порядке хранения в снимке
+PARTS = ('properties', 'attributes', 'aggregation', 'children')
+
+
+def class_fingerprint(class_def: ClassDef, blake2b=hashlib.blake2b) -> Tuple[str, str, str, str]:
+    """Вычисляет отпечаток класса по частям (см. PARTS).
+
+    Каждая часть - короткий хэш blake2b (встроенный hash() зависит от PYTHONHASHSEED
+    и между запусками не сохраняется). Строки частей соединяются управляющим
+    символом, недопустимым в XML 1.0, поэтому разные наборы значений не склеиваются.
+    """
+
+    def digest(text: str) -> str:
+        return blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=8).hexdigest()
+
+    aggregation = class_def.aggregation
+    return (
+        digest('\x1f'.join([item for pair in class_def.properties for item in pair])),
+        digest('\x1f'.join([item for attribute in class_def.attributes for item in (attribute.name, attribute.type)])),
+        '' if aggregation is None else digest(
+            f"{aggregation.source_multiplicity}\x1f{aggregation.target_multiplicity or ''}"),
+        digest('\x1f'.join([child.name for child in class_def.children])),
+    )
+
+
+class ModelDiff(NamedTuple):
+    """Различия двух моделей на уровне классов.
+
+    Attributes
+    ----------
+    added : Tuple[str, ...]
+        Новые классы.
+    removed : Tuple[str, ...]
+        Удалённые классы.
+    changed : Mapping[str, Tuple[str, ...]]
+        Изменённые классы и изменившиеся части (см. PARTS): 'attributes' - элементы
+        Attribute, 'aggregation' - мощности агрегации класса, 'children' - набор или
+        порядок вложенных классов (изменения агрегаций с target = класс).
+    reordered : bool
+        Изменился порядок классов, присутствующих в обеих моделях. Порядок записей
+        meta.json совпадает с порядком классов в документе.
+    """
+
+    added: Tuple[str, ...]
+    removed: Tuple[str, ...]
+    changed: Mapping[str, Tuple[str, ...]]
+    reordered: bool = False
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed or self.reordered)
+
+    def __str__(self) -> str:
+        return (f"добавлено классов: {len(self.added)}, удалено: {len(self.removed)}, "
+                f"изменено: {len(self.changed)}" + (", порядок классов изменён" if self.reordered else ""))
+
+
+class ModelSnapshot:
+    """Снимок модели и позиций её фрагментов в сгенерированных файлах.
+
+    Attributes
+    ----------
+    fingerprints : Dict[str, Tuple[str, str, str, str]]
+        Отпечатки классов по имени.
+    order : Tuple[str, ...]
+        Имена классов в порядке документа.
+    options : Dict[str, object]
+        Параметры генерации, с которыми созданы артефакты.
+    outputs : Dict[str, Tuple[int, int]]
+        Размер и mtime_ns артефактов на момент сохранения снимка.
+    meta_spans : Dict[str, Tuple[int, int]]
+        Смещение и длина записи класса в meta.json (в байтах, без разделителей).
+    xml_spans : Dict[Tuple[str, int], Tuple[int, int]]
+        Смещение и длина поддерева класса на заданной глубине в config.xml.
+        Поддерево зависит только от класса, его потомков и глубины, поэтому
+        одного вхождения на пару (имя, глубина) достаточно.
+    """
+
+    def __init__(self, fingerprints: Dict[str, Tuple[str, str, str, str]], options: Dict[str, object]):
+        self.fingerprints = fingerprints
+        self.order = tuple(fingerprints)
+        self.options = options
+        self.outputs: Dict[str, Tuple[int, int]] = {}
+        self.meta_spans: Dict[str, Tuple[int, int]] = {}
+        self.xml_spans: Dict[Tuple[str, int], Tuple[int, int]] = {}
+
+    @classmethod
+    def from_model(cls, model: XMLModel, options: Dict[str, object]) -> 'ModelSnapshot':
+        return cls({class_def.name: class_fingerprint(class_def) for class_def in model.classes}, options)
+
+    def diff(self, new: 'ModelSnapshot') -> ModelDiff:
+        """Сравнивает снимок с более новым.
+
+        :param new: ModelSnapshot
+            Снимок новой модели.
+
+        :return: ModelDiff
+        """
+
+        old_fingerprints = self.fingerprints
+        added, changed = [], {}
+        for name, fingerprint in new.fingerprints.items():
+            old = old_fingerprints.get(name)
+            if old is None:
+                added.append(name)
+            elif old != fingerprint:
+                changed[name] = tuple(part for part, a, b in zip(PARTS, old, fingerprint) if a != b)
+        removed = tuple(name for name in old_fingerprints if name not in new.fingerprints)
+        # Добавленные и удалённые классы не считаются перестановкой остальных
+        reordered = ([name for name in self.order if name in new.fingerprints] !=
+                     [name for name in new.order if name in old_fingerprints])
+        return ModelDiff(tuple(added), removed, changed, reordered)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['ModelSnapshot']:
+        """Читает снимок из файла. Возвращает None, если файла нет или он другой версии."""
+
+        try:
+            with open(path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        # Снимки без порядка классов созданы до его сохранения: выполняется полная генерация
+        if data.get('version') != GENERATOR_VERSION or 'order' not in data:
+            return None
+
+        fingerprints = data['fingerprints']
+        snapshot = cls({name: tuple(fingerprints[name]) for name in data['order']}, data['options'])
+        snapshot.outputs = {name: tuple(stat) for name, stat in data['outputs'].items()}
+        snapshot.meta_spans = {name: tuple(span) for name, span in data['meta_spans'].items()}
+        snapshot.xml_spans = {(name, depth): (start, length) for name, depth, start, length in data['xml_spans']}
+        return snapshot
+
+    def save(self, path: str) -> None:
+        """Атомарно записывает снимок в файл (временный файл и переименование)."""
+
+        data = {
+            'version': GENERATOR_VERSION,
+            'options': self.options,
+            'outputs': self.outputs,
+            'order': self.order,
+            'fingerprints': self.fingerprints,
+            'meta_spans': self.meta_spans,
+            'xml_spans': [[name, depth, start, length] for (name, depth), (start, length) in self.xml_spans.items()],
+        }
+        with AtomicFile(path, 'wb') as file:
+            file.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+class SpliceWriter:
+    """Текстовый поток поверх бинарного файла, в который можно вставлять байты прежнего файла.
+
+    write() кодирует текст (символы, не представимые в кодировке, заменяются ссылками
+    на символы, как в XMLParser); copy() добавляет фрагмент прежнего файла. Смежные
+    фрагменты объединяются и копируются одним чтением. tell() возвращает смещение в байтах.
+    """
+
+    __COPY_BLOCK = 1 << 20
+
+    def __init__(self, file: BinaryIO, encoding: str, source: Optional[BinaryIO] = None):
+        self.__file = file
+        self.__encoding = encoding
+        self.__source = source
+        self.__position = 0
+        self.__pending_start = 0
+        self.__pending_end = 0  # Конец отложенного фрагмента прежнего файла
+        self.copied = 0
+
+    @property
+    def pending_end(self) -> Optional[int]:
+        """Конец отложенного копируемого фрагмента или None, если его нет."""
+
+        return self.__pending_end if self.__pending_end > self.__pending_start else None
+
+    def tell(self) -> int:
+        return self.__position
+
+    def write(self, text: str) -> int:
+        self.flush()
+        data = text.encode(self.__encoding, 'xmlcharrefreplace')
+        self.__file.write(data)
+        self.__position += len(data)
+        return len(text)
+
+    def copy(self, start: int, length: int) -> None:
+        """Добавляет length байт прежнего файла, начиная со смещения start."""
+
+        if start != self.__pending_end or self.pending_end is None:
+            self.flush()
+            self.__pending_start = start
+        self.__pending_end = start + length
+        self.__position += length
+
+    def flush(self) -> None:
+        """Копирует отложенный фрагмент прежнего файла."""
+
+        remaining = self.__pending_end - self.__pending_start
+        if remaining <= 0:
+            return
+        self.__source.seek(self.__pending_start)
+        self.copied += remaining
+        while remaining:
+            block = self.__source.read(min(remaining, self.__COPY_BLOCK))
+            if not block:
+                raise ValueError("Прежний файл короче, чем указано в снимке модели.")
+            self.__file.write(block)
+            remaining -= len(block)
+        self.__pending_start = self.__pending_end = 0
+
+
+class IncrementalResult(NamedTuple):
+    """Результат инкрементальной генерации.
+
+    Attributes
+    ----------
+    full : bool
+        Выполнена полная генерация (снимка нет или он неприменим).
+    diff : Optional[ModelDiff]
+        Изменения относительно снимка (None при полной генерации).
+    xml_elements_written : int
+        Количество элементов (классов и атрибутов), заново записанных в config.xml.
+    json_records_encoded : int
+        Количество заново закодированных записей meta.json.
+    bytes_copied : int
+        Объём фрагментов, скопированных из прежних файлов.
+    """
+
+    full: bool
+    diff: Optional[ModelDiff]
+    xml_elements_written: int
+    json_records_encoded: int
+    bytes_copied: int
+
+
+class IncrementalGenerator:
+    """Генератор config.xml и meta.json, перегенерирующий только изменившиеся фрагменты.
+
+    Результат всегда совпадает байт в байт с XMLParser(model).main() и
+    JSONParser(model).main() с теми же параметрами. Файлы заменяются атомарно.
+
+    Attributes
+    ----------
+    __output_dir : str
+        Директория артефактов и снимка модели.
+    __output_format : str
+        Формат meta.json (см. JSONParser).
+    __indent : str
+        Отступ config.xml (см. XMLParser).
+    __encoding : Optional[str]
+        Кодировка config.xml (см. XMLParser).
+    __instrumentation : Instrumentation
+        Замеры этапов 'incremental.diff', 'incremental.config_xml',
+        'incremental.meta_json' и 'incremental.snapshot'.
+    __snapshot : Optional[ModelSnapshot]
+        Снимок, сохранённый последним вызовом generate(). Повторные вызовы на том же
+        экземпляре (например, в watch.py) сравнивают модель с ним, не читая снимок
+        из файла; соответствие артефактам проверяется так же, как для файла.
+    """
+
+    def __init__(self, output_dir: str = './out', output_format: str = JSONParser.PRETTY, indent: str = "    ",
+                 encoding: Optional[str] = None, instrumentation: Optional[Instrumentation] = None):
+        self.__output_dir = output_dir
+        self.__output_format = output_format
+        self.__indent = indent
+        self.__encoding = encoding
+        self.__instrumentation = NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+        self.__snapshot: Optional[ModelSnapshot] = None
+
+    @property
+    def file_names(self) -> List[str]:
+        """Имена артефактов: config.xml и meta.json (meta.ndjson для NDJSON)."""
+
+        return ['config.xml', 'meta.ndjson' if self.__output_format == JSONParser.NDJSON else 'meta.json']
+
+    def __options(self) -> Dict[str, object]:
+        return {'format': self.__output_format, 'indent': self.__indent, 'encoding': self.__encoding}
+
+    def __load_previous(self) -> Optional[ModelSnapshot]:
+        """Читает снимок и проверяет, что он соответствует текущим артефактам и параметрам."""
+
+        snapshot = self.__snapshot or ModelSnapshot.load(os.path.join(self.__output_dir, SNAPSHOT_FILE_NAME))
+        if snapshot is None or snapshot.options != self.__options():
+            return None
+        for name in self.file_names:
+            try:
+                stat = os.stat(os.path.join(self.__output_dir, name))
+            except OSError:
+                return None
+            if snapshot.outputs.get(name) != (stat.st_size, stat.st_mtime_ns):
+                return None
+        return snapshot
+
+    def generate(self, model: XMLModel) -> IncrementalResult:
+        """Приводит артефакты в выходной директории в соответствие с моделью.
+
+        :param model: XMLModel
+            Новая модель.
+
+        :return: IncrementalResult
+        """
+
+        instrumentation = self.__instrumentation
+        os.makedirs(self.__output_dir, exist_ok=True)
+
+        with instrumentation.stage('incremental.diff') as stage:
+            snapshot = ModelSnapshot.from_model(model, self.__options())
+            previous = self.__load_previous()
+            diff = None if previous is None else previous.diff(snapshot)
+            stage.elements = len(model.classes)
+
+        if diff is not None and diff.is_empty:
+            self.__snapshot = previous
+            return IncrementalResult(False, diff, 0, 0, 0)
+        # До сохранения нового снимка артефакты могут не соответствовать ни одному из снимков
+        self.__snapshot = None
+
+        if diff is None:
+            xml_dirty: Set[str] = set(snapshot.fingerprints)
+            json_dirty: Set[str] = xml_dirty
+        else:
+            json_dirty = set(diff.added) | set(diff.changed)
+            xml_dirty = set(diff.added) | {name for name, parts in diff.changed.items()
+                                           if 'attributes' in parts or 'children' in parts}
+
+        config_path, meta_path = (os.path.join(self.__output_dir, name) for name in self.file_names)
+
+        with instrumentation.stage('incremental.config_xml') as stage:
+            xml_elements_written, xml_copied = self.__write_config(model, previous, snapshot, xml_dirty, config_path)
+            stage.elements = xml_elements_written
+
+        with instrumentation.stage('incremental.meta_json') as stage:
+            json_records_encoded, json_copied = self.__write_meta(model, previous, snapshot, json_dirty, meta_path)
+            stage.elements = json_records_encoded
+
+        with instrumentation.stage('incremental.snapshot'):
+            for name in self.file_names:
+                stat = os.stat(os.path.join(self.__output_dir, name))
+                snapshot.outputs[name] = (stat.st_size, stat.st_mtime_ns)
+            snapshot.save(os.path.join(self.__output_dir, SNAPSHOT_FILE_NAME))
+        self.__snapshot = snapshot
+
+        return IncrementalResult(diff is None, diff, xml_elements_written, json_records_encoded,
+                                 xml_copied + json_copied)
+
+    @staticmethod
+    def __with_ancestors(model: XMLModel, names: Set[str]) -> Set[str]:
+        """Дополняет множество классов всеми их предками в иерархии модели."""
+
+        parents: Dict[str, List[str]] = {}
+        for aggregation in model.aggregations:
+            parents.setdefault(aggregation.source, []).append(aggregation.target)
+
+        result = set(names)
+        stack = list(names)
+        while stack:
+            for parent in parents.get(stack.pop(), ()):
+                if parent not in result:
+                    result.add(parent)
+                    stack.append(parent)
+        return result
+
+    def __write_config(self, model: XMLModel, previous: Optional[ModelSnapshot], snapshot: ModelSnapshot,
+                       dirty: Set[str], path: str) -> Tuple[int, int]:
+        """Записывает config.xml, копируя поддеревья без изменений из прежнего файла.
+
+        :return: Tuple[int, int]
+            Количество записанных элементов и скопированных байт.
+        """
+
+        old_spans = {} if previous is None else previous.xml_spans
+        # Поддерево класса меняется, если изменился класс или любой из его потомков
+        touched = dirty if previous is None else self.__with_ancestors(model, dirty)
+        spans: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        reused: List[Tuple[ClassDef, int, int, int]] = []  # (класс, глубина, прежнее и новое смещение)
+
+        with AtomicFile(path, 'wb') as file, _open_source(path, previous) as source:
+            writer = SpliceWriter(file, self.__encoding or 'utf-8', source)
+
+            def reuse(class_def: ClassDef, depth: int) -> bool:
+                span = old_spans.get((class_def.name, depth))
+                if span is None or class_def.name in touched:
+                    return False
+                reused.append((class_def, depth, span[0], writer.tell()))
+                writer.copy(*span)
+                return True
+
+            parser = XMLParser(model, self.__indent, self.__encoding)
+            written = parser.write(writer, reuse if previous is not None else None, spans)
+            writer.flush()
+
+        # Позиции внутри скопированных поддеревьев сдвигаются вместе с ними
+        for class_def, depth, old_start, new_start in reused:
+            old_end = old_start + old_spans[(class_def.name, depth)][1]
+            stack = [(class_def, depth)]
+            while stack:
+                item, item_depth = stack.pop()
+                key = (item.name, item_depth)
+                span = old_spans.get(key)
+                if key in spans or span is None or not old_start <= span[0] < old_end:
+                    continue
+                spans[key] = (span[0] - old_start + new_start, span[1])
+                stack.extend((child, item_depth + 1) for child in item.children)
+
+        snapshot.xml_spans = spans
+        return written, writer.copied
+
+    def __write_meta(self, model: XMLModel, previous: Optional[ModelSnapshot], snapshot: ModelSnapshot,
+                     dirty: Set[str], path: str) -> Tuple[int, int]:
+        """Записывает meta.json, копируя записи неизменившихся классов из прежнего файла.
+
+        :return: Tuple[int, int]
+            Количество закодированных записей и скопированных байт.
+        """
+
+        parser = JSONParser(model, self.__output_format)
+        old_spans = {} if previous is None else previous.meta_spans
+        spans: Dict[str, Tuple[int, int]] = {}
+        encoded = 0
+
+        with AtomicFile(path, 'wb') as file, _open_source(path, previous) as source:
+            writer = SpliceWriter(file, 'utf-8', source)
+            classes = model.classes
+            if not classes and self.__output_format != JSONParser.NDJSON:
+                writer.write('[]')
+
+            opening, separator, closing = parser.delimiters()
+            separator_length = len(separator.encode('utf-8'))
+            for index, class_def in enumerate(classes):
+                span = None if class_def.name in dirty else old_spans.get(class_def.name)
+                if span is None:
+                    writer.write(separator if index else opening)
+                    start = writer.tell()
+                    writer.write(parser.encode_class(class_def))
+                    encoded += 1
+                elif index and writer.pending_end == span[0] - separator_length:
+                    # Разделитель между соседними записями тоже берётся из прежнего файла
+                    start = writer.tell() + separator_length
+                    writer.copy(span[0] - separator_length, span[1] + separator_length)
+                else:
+                    writer.write(separator if index else opening)
+                    start = writer.tell()
+                    writer.copy(*span)
+                spans[class_def.name] = (start, writer.tell() - start)
+            if classes and closing:
+                writer.write(closing)
+            writer.flush()
+
+        snapshot.meta_spans = spans
+        return encoded, writer.copied
+
+
+def _open_source(path: str, previous: Optional[ModelSnapshot]):
+    """Открывает прежний файл для копирования фрагментов (если есть снимок)."""
+
+    return nullcontext() if previous is None else open(path, 'rb')
@@ -0,0 +1,202 @@
+"""Необязательные замеры этапов обработки модели.
+
+Пример использования:
+    instrumentation = Instrumentation(trace_memory=True, hooks=[print])
+    model = XMLModel.from_file('impulse_test_input.xml', instrumentation=instrumentation)
+    XMLParser(model, instrumentation=instrumentation).main()
+    JSONParser(model, instrumentation=instrumentation).main()
+    instrumentation.write_report('./out/report.json')
+
+Каждый этап (парсинг, отдельные проверки валидатора, сериализация и запись файлов)
+оформляется как `with instrumentation.stage('name') as stage:`. По выходу из блока
+записывается StageRecord: время, количество обработанных элементов и, если включено,
+пиковая память по tracemalloc. Записи передаются хукам по мере завершения этапов.
+
+Без явно переданного объекта используется NULL_INSTRUMENTATION, этапы которого
+ничего не замеряют и не записывают.
+"""
+
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+import time
+
+# tracemalloc и json нужны только при замере памяти и записи отчёта и импортируются там
+
+
+class StageRecord(NamedTuple):
+    """Результат замера одного этапа.
+
+    Attributes
+    ----------
+    name : str
+        Имя этапа, например 'parse' или 'validate.cycles'.
+    seconds : float
+        Время выполнения этапа.
+    elements : Optional[int]
+        Количество обработанных элементов (классов, агрегаций, строк), если этап его сообщает.
+    peak_bytes : Optional[int]
+        Пиковый прирост памяти за время этапа относительно его начала
+        (только при trace_memory=True и только для этапов, замеренных через stage()).
+    """
+
+    name: str
+    seconds: float
+    elements: Optional[int]
+    peak_bytes: Optional[int]
+
+
+class Stage:
+    """Контекстный менеджер одного этапа. Через атрибут elements этап сообщает объём работы."""
+
+    __slots__ = ('name', 'elements', '__instrumentation', '__started', '__memory_at_start')
+
+    def __init__(self, name: str, instrumentation: Optional['Instrumentation']):
+        self.name = name
+        self.elements: Optional[int] = None
+        self.__instrumentation = instrumentation
+        self.__started = 0.0
+        self.__memory_at_start = 0
+
+    def __enter__(self) -> 'Stage':
+        if self.__instrumentation is not None:
+            if self.__instrumentation.trace_memory:
+                import tracemalloc
+                tracemalloc.reset_peak()
+                self.__memory_at_start = tracemalloc.get_traced_memory()[0]
+            self.__started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self.__instrumentation is not None:
+            seconds = time.perf_counter() - self.__started
+            peak_bytes = None
+            if self.__instrumentation.trace_memory:
+                import tracemalloc
+                peak_bytes = tracemalloc.get_traced_memory()[1] - self.__memory_at_start
+            self.__instrumentation.record(self.name, seconds, self.elements, peak_bytes)
+
+
+class Instrumentation:
+    """Сборщик замеров этапов с хуками и JSON отчётом.
+
+    Attributes
+    ----------
+    trace_memory : bool
+        Замерять ли пиковую память этапов через tracemalloc. Трассировка заметно
+        замедляет обработку, поэтому по умолчанию выключена.
+    records : List[StageRecord]
+        Замеры в порядке завершения этапов.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory: bool = False, hooks: Iterable[Callable[[StageRecord], None]] = ()):
+        self.trace_memory = trace_memory
+        self.records: List[StageRecord] = []
+        self.__hooks: List[Callable[[StageRecord], None]] = list(hooks)
+        if trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def add_hook(self, hook: Callable[[StageRecord], None]) -> None:
+        """Добавляет функцию, которая вызывается с каждым новым StageRecord."""
+
+        self.__hooks.append(hook)
+
+    def stage(self, name: str) -> Stage:
+        """Возвращает контекстный менеджер замера этапа name.
+
+        Этапы не должны быть вложенными: замер пиковой памяти сбрасывается в начале
+        каждого этапа.
+        """
+
+        return Stage(name, self)
+
+    def record(self, name: str, seconds: float, elements: Optional[int] = None,
+               peak_bytes: Optional[int] = None) -> StageRecord:
+        """Добавляет замер этапа (в том числе измеренного вне stage()) и передаёт его хукам."""
+
+        record = StageRecord(name, seconds, elements, peak_bytes)
+        self.records.append(record)
+        for hook in self.__hooks:
+            hook(record)
+        return record
+
+    def report(self) -> Dict[str, object]:
+        """Формирует отчёт: список этапов и суммарное время."""
+
+        return {
+            'total_seconds': sum(record.seconds for record in self.records),
+            'stages': [record._asdict() for record in self.records],
+        }
+
+    def write_report(self, path: str) -> None:
+        """Записывает отчёт report() в JSON файл."""
+
+        import json
+
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.report(), file, indent=4)
+
+
+class _NullStage:
+    """Этап, который ничего не замеряет. Присваивание elements игнорируется, поэтому
+    один объект может использоваться одновременно из любого числа потоков."""
+
+    __slots__ = ()
+
+    name = ''
+
+    @property
+    def elements(self) -> None:
+        return None
+
+    @elements.setter
+    def elements(self, value: Optional[int]) -> None:
+        pass
+
+    def __enter__(self) -> '_NullStage':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        return None
+
+
+class _NullInstrumentation:
+    """Инструментирование по умолчанию: этапы не замеряются."""
+
+    enabled = False
+    trace_memory = False
+
+    __STAGE = _NullStage()
+
+    def stage(self, name: str) -> _NullStage:
+        return self.__STAGE
+
+    def record(self, name: str, seconds: float, elements: Optional[int] = None,
+               peak_bytes: Optional[int] = None) -> None:
+        return None
+
+
+NULL_INSTRUMENTATION = _NullInstrumentation()
+
+
+class TimedWriter:
+    """Обёртка над текстовым потоком, которая суммирует время вызовов write().
+
+    Позволяет отделить время записи в файл от времени сериализации в потоковых генераторах.
+    """
+
+    __slots__ = ('seconds', 'calls', '__file')
+
+    def __init__(self, file):
+        self.seconds = 0.0
+        self.calls = 0
+        self.__file = file
+
+    def write(self, text: str) -> int:
+        started = time.perf_counter()
+        written = self.__file.write(text)
+        self.seconds += time.perf_counter() - started
+        self.calls += 1
+        return written
@@ -1,19 +1,179 @@
-import xml.etree.ElementTree as ET
-from xml.etree.ElementTree import Element
-from xml.dom import minidom
-
-from typing import Dict, List
-import json
+from types import MappingProxyType
+from contextlib import nullcontext
+from typing import (IO, TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple,
+                    Optional, Sequence, TextIO, Tuple, Union)
+import io
 import os
+import sys
+
+# xml.etree.ElementTree, xml.parsers.expat и json импортируются в методах, которые их
+# используют: импорт модуля для коротких запусков (query.py, worker.py) не должен
+# оплачивать загрузку парсера XML и кодировщика JSON, которые могут не понадобиться.
+if TYPE_CHECKING:
+    from xml.etree.ElementTree import Element
+
+from instrumentation import NULL_INSTRUMENTATION, Instrumentation, TimedWriter
+
+# Версия генераторов. Увеличивается при любом изменении содержимого config.xml или
+# meta.json, чтобы кэш артефактов (cache.py) не выдавал результаты прежней версии.
+GENERATOR_VERSION = 1
+
+
+class Violation(NamedTuple):
+    """Нарушение одного правила валидации.
+
+    Attributes
+    ----------
+    rule : str
+        Имя правила, например 'class.unique_name' (см. XMLValidator.RULES).
+    message : str
+        Описание нарушения.
+    element : Optional[str]
+        Тег элемента с нарушением ('Class', 'Attribute', 'Aggregation') или None для
+        нарушений уровня документа.
+    position : Tuple[int, ...]
+        Порядковый номер элемента в документе: (номер Class,), (номер Aggregation,)
+        или (номер Class, номер Attribute в классе).
+    line : Optional[int]
+        Номер строки элемента в исходном файле, если он известен.
+    """
+
+    rule: str
+    message: str
+    element: Optional[str]
+    position: Tuple[int, ...]
+    line: Optional[int]
+
+    def __str__(self) -> str:
+        return self.message if self.line is None else f"строка {self.line}: {self.message}"
+
+
+class ValidationError(ValueError):
+    """Документ не прошёл валидацию.
+
+    Наследует ValueError, поэтому существующая обработка ошибок валидации не меняется.
+
+    Attributes
+    ----------
+    violations : List[Violation]
+        Все найденные нарушения. В режиме fail-fast - ровно одно.
+    """
+
+    def __init__(self, violations: List[Violation]):
+        self.violations = violations
+        if len(violations) == 1:
+            super().__init__(str(violations[0]))
+        else:
+            super().__init__("\n".join([f"Найдено нарушений: {len(violations)}."]
+                                       + [f"  {violation}" for violation in violations]))
+
+    def __reduce__(self):
+        # Исключение передаётся из процессов пула (batch.py, service.py) вместе с нарушениями
+        return self.__class__, (self.violations,)
 
 
 class XMLValidator:
     """Класс XMLValidator используется для проверки исходного файла.
 
     Метод validate_and_check_tags() отвечает за проверку файла.
+
+    Проверки оформлены как именованные правила (RULES) и выполняются за один проход
+    по элементам. В режиме fail-fast (по умолчанию) валидация останавливается на первом
+    нарушении, в режиме collect_all собираются все нарушения документа. Дополнительные
+    правила добавляются через register_rule(), необязательные встроенные и
+    пользовательские правила отключаются через disable_rule().
+
+    Attributes
+    ----------
+    __instrumentation : Instrumentation
+        Замеры этапов парсинга и отдельных проверок (см. instrumentation.py).
+        По умолчанию замеры выключены.
+    __collect_all : bool
+        Собирать все нарушения вместо остановки на первом.
+    __disabled_rules : set
+        Имена отключённых правил.
+    __custom_rules : Dict[str, List[Tuple[str, Callable]]]
+        Пользовательские правила по областям проверки.
     """
 
-    def validate_and_check_tags(self, input_file_name):
+    # Встроенные правила. Без обязательных правил модель нельзя построить, их отключить нельзя.
+    # aggregation.self_reference обязательно: агрегация класса в самого себя - цикл, и
+    # иерархию с ней нельзя обойти; отдельное правило даёт более понятное сообщение, чем
+    # aggregation.acyclic.
+    RULES = MappingProxyType({
+        'class.present': True,
+        'class.single_root': True,
+        'class.is_root': False,
+        'class.name': True,
+        'class.unique_name': True,
+        'attribute.name': True,
+        'attribute.type': True,
+        'attribute.unique_name': False,
+        'aggregation.source_multiplicity': True,
+        'aggregation.multiplicity_format': True,
+        'aggregation.source': True,
+        'aggregation.target': True,
+        'aggregation.self_reference': True,
+        'aggregation.known_classes': True,
+        'aggregation.acyclic': True,
+    })
+
+    # Области пользовательских правил: 'class', 'attribute' и 'aggregation' получают элемент
+    # и возвращают сообщение об ошибке или None; 'model' получает XMLModel и возвращает
+    # список сообщений.
+    SCOPES = ('class', 'attribute', 'aggregation', 'model')
+
+    __AGGREGATION_REQUIRED = {
+        'sourceMultiplicity': 'aggregation.source_multiplicity',
+        'source': 'aggregation.source',
+        'target': 'aggregation.target',
+    }
+
+    def __init__(self, instrumentation: Optional[Instrumentation] = None, collect_all: bool = False,
+                 disabled_rules: Iterable[str] = ()):
+        self.__instrumentation = NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+        self.__collect_all = collect_all
+        self.__disabled_rules = set()
+        self.__custom_rules: Dict[str, List[Tuple[str, Callable]]] = {scope: [] for scope in self.SCOPES}
+        for rule in disabled_rules:
+            self.disable_rule(rule)
+
+    def register_rule(self, name: str, scope: str, check: Callable) -> None:
+        """Добавляет пользовательское правило.
+
+        :param name: str
+            Уникальное имя правила. Используется в Violation.rule и в disable_rule().
+        :param scope: str
+            Область проверки (см. SCOPES).
+        :param check: Callable
+            Для 'class', 'attribute' и 'aggregation' - функция от Element, возвращающая
+            сообщение об ошибке или None. Для 'model' - функция от XMLModel, возвращающая
+            список сообщений. Правила модели выполняются после встроенных проверок.
+
+        :raises ValueError:
+            Если имя правила занято или область неизвестна.
+        """
+
+        if scope not in self.SCOPES:
+            raise ValueError(f"Неизвестная область правила: {scope}. Допустимые: {', '.join(self.SCOPES)}.")
+        if name in self.RULES or any(name == rule for rules in self.__custom_rules.values() for rule, _ in rules):
+            raise ValueError(f"Правило {name} уже существует.")
+        self.__custom_rules[scope].append((name, check))
+
+    def disable_rule(self, name: str) -> None:
+        """Отключает необязательное встроенное или пользовательское правило.
+
+        :raises ValueError:
+            Если правило неизвестно или обязательно (см. RULES).
+        """
+
+        if self.RULES.get(name):
+            raise ValueError(f"Правило {name} обязательно и не может быть отключено.")
+        if name not in self.RULES and all(name != rule for rules in self.__custom_rules.values() for rule, _ in rules):
+            raise ValueError(f"Неизвестное правило: {name}.")
+        self.__disabled_rules.add(name)
+
+    def validate_and_check_tags(self, input_file_name, streaming: bool = False, verbose: bool = True) -> 'XMLModel':
         """Проверяет валидность и целостность тегов в XML файле.
 
         Метод выполняет следующие проверки:
@@ -51,416 +211,1410 @@ class XMLValidator:
             собственный метод для обработки этой ситуации.
 
         Если все проверки пройдены без исключений, метод выводит сообщение о том, что все теги корректны.
+        При любой ошибке сообщение выводится, а исключение пробрасывается дальше. Ошибки проверок 3-8
+        выбрасываются как ValidationError (подкласс ValueError) со списком нарушений и номерами строк;
+        в режиме collect_all список содержит все нарушения документа.
 
         Параметры:
         ----------
         input_file_name : str
-            Имя XML файла для валидации.
+            Имя XML файла для валидации. Относительный путь отсчитывается от директории
+            'input', абсолютный используется как есть.
+        streaming : bool
+            Потоковый режим: файл читается через iterparse(), в памяти остаются только
+            элементы Class, Attribute и Aggregation, а остальные элементы очищаются
+            по мере чтения. Пиковое потребление памяти определяется размером модели,
+            а не размером документа. Набор проверок тот же.
+        verbose : bool
+            Выводить ли сообщения об успехе и ошибках. Пакетная обработка отключает
+            вывод и собирает ошибки сама.
+
+        Возвращает:
+        -----------
+        XMLModel
+            Модель разобранного документа. Повторный парсинг файла не требуется.
         """
 
+        import xml.etree.ElementTree as ET
+
         try:
             # Проверка на наличие файла.
             full_path = os.path.join('./input', input_file_name)
             if not os.path.isfile(full_path):
                 raise FileNotFoundError(f"Файл '{full_path}' не найден.")
 
-            tree = ET.parse(full_path)
-            root = tree.getroot()
+            model = self.validate_source(full_path, streaming)
+            if verbose:
+                print("Все теги в XML файле корректно закрыты и проверки пройдены.")
+            return model
 
-            # Проверка на наличие объектов Class.
-            classes = root.findall(".//Class")
-            if not classes:
-                raise ValueError("Отсутствуют элементы Class.")
+        except ET.ParseError as e:
+            if verbose:
+                print(f"Ошибка парсинга: {e}")
+            raise
+        except FileNotFoundError:
+            if verbose:
+                print("Файл не найден.")
+            raise
+        except ValueError as e:
+            if verbose:
+                print(f"Ошибка валидации: {e}")
+            raise  # Останавливает выполнение после вывода ошибки
+        except Exception as e:
+            if verbose:
+                print(f"Произошла ошибка: {e}")
+            raise
+
+    def validate_source(self, source: Union[str, bytes, BinaryIO], streaming: bool = False) -> 'XMLModel':
+        """Разбирает документ и выполняет проверки 3-8 из validate_and_check_tags() без вывода сообщений.
+
+        :param source: Union[str, bytes, BinaryIO]
+            Путь к файлу (используется как есть), содержимое документа или бинарный поток.
+        :param streaming: bool
+            Читать документ потоково (см. validate_and_check_tags()).
+
+        :return: XMLModel
+            Модель документа.
+
+        :raises ET.ParseError:
+            Если документ не является корректным XML.
+        :raises ValidationError:
+            Если документ не прошёл проверку. Номера строк определяются для файла
+            и для содержимого в виде bytes, но не для потока.
+        """
 
-            # Проверка на наличие одного корневого элемента Class с атрибутом isRoot='true'
-            root_classes = root.findall(".//Class[@isRoot='true']")
-            if len(root_classes) != 1:
-                raise ValueError("Должен быть ровно один корневой класс с атрибутом isRoot='true'.")
+        import xml.etree.ElementTree as ET
 
-            names = set()  # Для отслеживания уникальных имен классов
+        parse_source = io.BytesIO(source) if isinstance(source, bytes) else source
+        with self.__instrumentation.stage('parse') as stage:
+            if streaming:
+                classes, aggregations = self.__iterparse_elements(parse_source)
+            else:
+                document_root = ET.parse(parse_source).getroot()
+                classes, aggregations = document_root.findall(".//Class"), document_root.findall(".//Aggregation")
+            stage.elements = len(classes) + len(aggregations)
 
-            # Проверка атрибутов Class
-            for xml_class in classes:
-                if 'isRoot' not in xml_class.attrib:
-                    raise ValueError("Отсутствует атрибут 'isRoot' в элементе Class.")
+        return self.validate_elements(classes, aggregations, source if isinstance(source, (str, bytes)) else None)
+
+    def __iterparse_elements(self, full_path: Union[str, BinaryIO]) -> Tuple[List['Element'], List['Element']]:
+        """Потоково читает файл и собирает из него только элементы Class и Aggregation.
+
+        Элементы Class и Aggregation запоминаются по событию 'start', поэтому порядок
+        совпадает с findall(".//Class") и findall(".//Aggregation"). По событию 'end':
+        - у Class остаются только дочерние Attribute;
+        - у Attribute и Aggregation удаляются дочерние элементы;
+        - все прочие элементы очищаются полностью;
+        - текст и хвосты элементов отбрасываются.
+        Обработанные дочерние элементы корня документа сразу отсоединяются от него,
+        поэтому дерево документа в памяти не накапливается.
+
+        :param full_path: Union[str, BinaryIO]
+            Путь к исходному файлу или бинарный поток.
+
+        :return: Tuple[List[Element], List[Element]]
+            Списки элементов Class и Aggregation в порядке следования в документе.
+        """
+
+        import xml.etree.ElementTree as ET
+
+        classes: List['Element'] = []
+        aggregations: List['Element'] = []
+        document_root = None
+        depth = 0
+
+        for event, element in ET.iterparse(full_path, events=('start', 'end')):
+            if event == 'start':
+                if document_root is None:
+                    document_root = element
+                elif element.tag == 'Class':
+                    classes.append(element)
+                elif element.tag == 'Aggregation':
+                    aggregations.append(element)
+                depth += 1
+                continue
+
+            depth -= 1
+            if element.tag == 'Class':
+                element[:] = [child for child in element if child.tag == 'Attribute']
+            elif element.tag in ('Attribute', 'Aggregation'):
+                del element[:]
+            elif depth > 0:
+                element.clear()
+            element.text = element.tail = None
+
+            # Отсоединяем обработанный дочерний элемент от корня документа
+            if depth == 1:
+                del document_root[:]
+
+        return classes, aggregations
+
+    def validate_document(self, root: 'Element') -> 'XMLModel':
+        """Выполняет проверки 3-8 из validate_and_check_tags() над уже разобранным документом.
+
+        :param root: Element
+            Корневой элемент документа (XMI).
+
+        :return: XMLModel
+            Модель документа.
+
+        :raises ValueError:
+            Если документ не прошёл проверку.
+        """
+
+        return self.validate_elements(root.findall(".//Class"), root.findall(".//Aggregation"))
+
+    def validate_elements(self, classes: List['Element'], aggregations: List['Element'],
+                          source_path: Union[str, bytes, None] = None) -> 'XMLModel':
+        """Выполняет проверки 3-8 из validate_and_check_tags() над собранными элементами.
+
+        Используется и для полностью разобранного документа, и для потокового режима.
+        Все правила проверяются за один проход по классам (вместе с их Attribute) и один
+        проход по агрегациям; затем граф агрегаций проверяется на циклы и выполняются
+        правила уровня модели. Во время проверки уникальности имён строится индекс
+        классов по имени. Он используется для проверки ссылок в Aggregation и
+        сохраняется в модели, чтобы генераторам не приходилось искать классы обходом дерева.
+
+        :param classes: List[Element]
+            Элементы Class в порядке следования в документе.
+        :param aggregations: List[Element]
+            Элементы Aggregation в порядке следования в документе.
+        :param source_path: Union[str, bytes, None]
+            Путь к исходному файлу или его содержимое. Если задан, нарушения дополняются
+            номерами строк (документ перечитывается только при наличии нарушений).
+
+        :return: XMLModel
+            Модель документа.
+
+        :raises ValidationError:
+            Если документ не прошёл проверку. В режиме collect_all содержит все нарушения.
+        """
+
+        import xml.etree.ElementTree as ET
+
+        instrumentation = self.__instrumentation
+        disabled_rules = self.__disabled_rules
+        collect_all = self.__collect_all
+        violations: List[Violation] = []
+
+        def report(rule: str, message: str, element: Optional[str] = None, position: Tuple[int, ...] = ()) -> bool:
+            """Регистрирует нарушение. Возвращает False, если правило отключено."""
+
+            if rule in disabled_rules:
+                return False
+            violation = Violation(rule, message, element, position, None)
+            if not collect_all:
+                raise ValidationError(self.__locate_lines(source_path, [violation]))
+            violations.append(violation)
+            return True
+
+        class_rules = self.__custom_rules['class']
+        attribute_rules = self.__custom_rules['attribute']
+        aggregation_rules = self.__custom_rules['aggregation']
+        model_rules = self.__custom_rules['model']
+
+        classes_by_name: Dict[str, ClassDef] = {}  # Индекс классов, заодно отслеживает уникальность имён
+        root_names: List[Optional[str]] = []
+
+        with instrumentation.stage('validate.classes') as stage:
+            for class_index, xml_class in enumerate(classes):
+                position = (class_index,)
+
+                # Проверка атрибутов Class
+                is_root = xml_class.attrib.get('isRoot')
+                if is_root is None:
+                    report('class.is_root', "Отсутствует атрибут 'isRoot' в элементе Class.", 'Class', position)
+                elif is_root == 'true':
+                    root_names.append(xml_class.attrib.get('name'))
 
                 # Проверка на уникальность имен классов
                 name = xml_class.attrib.get('name')
                 if not name:
-                    raise ValueError("Отсутствует атрибут 'name' в элементе Class.")
-                if name in names:
-                    raise ValueError(f"Aтрибут 'name' должен быть уникальным. Дублируется имя: {name}.")
-                names.add(name)
+                    report('class.name', "Отсутствует атрибут 'name' в элементе Class.", 'Class', position)
+                elif name in classes_by_name:
+                    report('class.unique_name', f"Aтрибут 'name' должен быть уникальным. Дублируется имя: {name}.",
+                           'Class', position)
+                    name = None
 
                 # Проверка на наличие атрибутов Attribute и их уникальность
                 attribute_names = set()  # Для отслеживания уникальных имен атрибутов в текущем классе
-                for attribute in xml_class.findall("Attribute"):
+                attribute_defs: List[AttributeDef] = []
+                for attribute_index, attribute in enumerate(xml_class.findall("Attribute")):
+                    attribute_position = (class_index, attribute_index)
                     if 'name' not in attribute.attrib:
-                        raise ValueError(
-                            f"Отсутствует атрибут 'name' в элементе Attribute: {ET.tostring(attribute, encoding='unicode')}.")
+                        report('attribute.name',
+                               f"Отсутствует атрибут 'name' в элементе Attribute: {ET.tostring(attribute, encoding='unicode')}.",
+                               'Attribute', attribute_position)
+                        continue
                     if 'type' not in attribute.attrib:
-                        raise ValueError(
-                            f"Отсутствует атрибут 'type' в элементе Attribute: {ET.tostring(attribute, encoding='unicode')}.")
+                        report('attribute.type',
+                               f"Отсутствует атрибут 'type' в элементе Attribute: {ET.tostring(attribute, encoding='unicode')}.",
+                               'Attribute', attribute_position)
+                        continue
 
                     # Проверка на уникальность имени атрибута
                     attribute_name = attribute.attrib['name']
                     if attribute_name in attribute_names:
-                        raise ValueError(f"Атрибут 'name' в элементе Attribute должен быть уникальным. Дублируется имя: {attribute_name}.")
+                        report('attribute.unique_name',
+                               f"Атрибут 'name' в элементе Attribute должен быть уникальным. Дублируется имя: {attribute_name}.",
+                               'Attribute', attribute_position)
                     attribute_names.add(attribute_name)
+                    attribute_defs.append(AttributeDef(attribute_name, attribute.attrib['type']))
 
-            # Проверка атрибутов Aggregation
-            aggregations = root.findall(".//Aggregation")
-            for aggregation in aggregations:
-                if 'sourceMultiplicity' not in aggregation.attrib:
-                    raise ValueError("Отсутствует атрибут 'sourceMultiplicity' в элементе Aggregation.")
-                if 'source' not in aggregation.attrib:
-                    raise ValueError("Отсутствует атрибут 'source' в элементе Aggregation.")
-                if 'target' not in aggregation.attrib:
-                    raise ValueError("Отсутствует атрибут 'target' в элементе Aggregation.")
+                    for rule, check in attribute_rules:
+                        message = check(attribute)
+                        if message:
+                            report(rule, message, 'Attribute', attribute_position)
 
-                source = aggregation.attrib['source']
-                target = aggregation.attrib['target']
+                for rule, check in class_rules:
+                    message = check(xml_class)
+                    if message:
+                        report(rule, message, 'Class', position)
 
-                if source == target:
-                    raise ValueError("Атрибут 'source' равен атрибуту 'target' в элементе Aggregation. Связь не имеет смысла.")
+                if name:
+                    properties = tuple((key, value) for key, value in xml_class.attrib.items() if key != 'name')
+                    classes_by_name[name] = ClassDef(name, properties, tuple(attribute_defs))
 
-                # Проверка на циклы
-                self.__check_for_cycles(source, target, aggregations)
-            print("Все теги в XML файле корректно закрыты и проверки пройдены.")
-
-        except ET.ParseError as e:
-            print(f"Ошибка парсинга: {e}")
-        except FileNotFoundError:
-            print("Файл не найден.")
-        except ValueError as e:
-            print(f"Ошибка валидации: {e}")
-            raise  # Останавливает выполнение после вывода ошибки
-        except Exception as e:
-            print(f"Произошла ошибка: {e}")
+            # Проверка на наличие объектов Class и одного корневого класса с атрибутом isRoot='true'
+            if not classes:
+                report('class.present', "Отсутствуют элементы Class.")
+            elif len(root_names) != 1:
+                report('class.single_root', "Должен быть ровно один корневой класс с атрибутом isRoot='true'.")
+            stage.elements = len(classes)
 
-    def __check_for_cycles(self, source, target, aggregations):
-        """Проверяет наличие циклов в графе агрегаций между классами.
+        with instrumentation.stage('validate.aggregations') as stage:
+            # Проверка атрибутов Aggregation
+            aggregation_defs: List[AggregationDef] = []
+            aggregation_positions: List[int] = []  # Номер элемента Aggregation для каждой AggregationDef
+            for aggregation_index, aggregation in enumerate(aggregations):
+                position = (aggregation_index,)
+                attrib = aggregation.attrib
+
+                for rule, check in aggregation_rules:
+                    message = check(aggregation)
+                    if message:
+                        report(rule, message, 'Aggregation', position)
+
+                if 'sourceMultiplicity' not in attrib or 'source' not in attrib or 'target' not in attrib:
+                    # В режиме collect_all сообщается каждый отсутствующий атрибут
+                    for missing, rule in self.__AGGREGATION_REQUIRED.items():
+                        if missing not in attrib:
+                            report(rule, f"Отсутствует атрибут '{missing}' в элементе Aggregation.", 'Aggregation',
+                                   position)
+                    continue
+
+                # Границы мощности используются генераторами и индексом иерархии
+                try:
+                    multiplicity_bounds(attrib['sourceMultiplicity'])
+                except ValueError as e:
+                    report('aggregation.multiplicity_format', str(e), 'Aggregation', position)
+                    continue
+
+                source = attrib['source']
+                target = attrib['target']
+
+                if source == target and report(
+                        'aggregation.self_reference',
+                        "Атрибут 'source' равен атрибуту 'target' в элементе Aggregation. Связь не имеет смысла.",
+                        'Aggregation', position):
+                    continue
+
+                # Проверка ссылок на классы по индексу
+                if source not in classes_by_name:
+                    report('aggregation.known_classes',
+                           f"Атрибут 'source' в элементе Aggregation ссылается на несуществующий класс: {source}.",
+                           'Aggregation', position)
+                    continue
+                if target not in classes_by_name:
+                    report('aggregation.known_classes',
+                           f"Атрибут 'target' в элементе Aggregation ссылается на несуществующий класс: {target}.",
+                           'Aggregation', position)
+                    continue
+
+                aggregation_defs.append(AggregationDef(
+                    source, target, attrib['sourceMultiplicity'], attrib.get('targetMultiplicity')))
+                aggregation_positions.append(aggregation_index)
+            stage.elements = len(aggregations)
+
+        with instrumentation.stage('validate.cycles') as stage:
+            # Проверка на циклы
+            cycle = self.__find_cycle(aggregation_defs)
+            if cycle is not None:
+                message, index = cycle
+                report('aggregation.acyclic', message, 'Aggregation', (aggregation_positions[index],))
+            stage.elements = len(aggregation_defs)
+
+        if violations:
+            raise ValidationError(self.__locate_lines(source_path, violations))
+
+        with instrumentation.stage('model.link') as stage:
+            # Связывание классов: дочерние классы в порядке агрегаций, для source - последняя агрегация
+            children: Dict[str, List[ClassDef]] = {}
+            for aggregation_def in aggregation_defs:
+                source_def = classes_by_name[aggregation_def.source]
+                source_def.aggregation = aggregation_def
+                children.setdefault(aggregation_def.target, []).append(source_def)
+            for name, child_defs in children.items():
+                classes_by_name[name].children = tuple(child_defs)
+            stage.elements = len(aggregation_defs)
+
+        model = XMLModel(
+            classes=tuple(classes_by_name.values()),
+            classes_by_name=MappingProxyType(classes_by_name),
+            aggregations=tuple(aggregation_defs),
+            root=classes_by_name[root_names[0]],
+            hierarchy=HierarchyIndex(classes_by_name.keys(), aggregation_defs, root_names[0]),
+        )
+
+        if model_rules:
+            with instrumentation.stage('validate.model') as stage:
+                for rule, check in model_rules:
+                    for message in check(model) or ():
+                        report(rule, message)
+                stage.elements = len(model_rules)
+            if violations:
+                raise ValidationError(violations)
+
+        return model
+
+    @staticmethod
+    def __locate_lines(source_path: Union[str, bytes, None], violations: List['Violation']) -> List['Violation']:
+        """Дополняет нарушения номерами строк элементов в исходном файле.
+
+        Файл перечитывается одним проходом expat без построения дерева, элементы
+        сопоставляются по порядковым номерам: Class и Aggregation - в порядке документа,
+        Attribute - по номеру класса и номеру среди дочерних Attribute класса.
+        Вызывается только при наличии нарушений, поэтому успешная валидация не
+        платит за номера строк.
+
+        :param source_path: Union[str, bytes, None]
+            Путь к исходному файлу или его содержимое. None - номера строк не определяются.
+        :param violations: List[Violation]
+            Нарушения без номеров строк.
+
+        :return: List[Violation]
+        """
 
-        Этот метод использует алгоритм поиска в глубину (DFS), начиная с указанного
-        источника, чтобы определить, возможно ли достичь целевого класса
-        без циклических зависимостей. Если цикл обнаружен, выбрасывается исключение.
+        from xml.parsers import expat
+
+        wanted = {(violation.element, violation.position) for violation in violations if violation.element}
+        if source_path is None or not wanted:
+            return violations
+
+        lines: Dict[Tuple[str, Tuple[int, ...]], int] = {}
+        counters = {'Class': 0, 'Aggregation': 0}
+        stack: List[Tuple[str, int, List[int]]] = []  # (тег, номер класса или -1, [счётчик дочерних Attribute])
+        parser = expat.ParserCreate()
+
+        def start(tag, attributes):
+            class_index = -1
+            key = None
+            if tag in counters:
+                key = (tag, (counters[tag],))
+                if tag == 'Class':
+                    class_index = counters[tag]
+                counters[tag] += 1
+            elif tag == 'Attribute' and stack and stack[-1][0] == 'Class':
+                _, parent_index, attribute_counter = stack[-1]
+                key = ('Attribute', (parent_index, attribute_counter[0]))
+                attribute_counter[0] += 1
+            if key in wanted:
+                lines[key] = parser.CurrentLineNumber
+            stack.append((tag, class_index, [0]))
+
+        def end(tag):
+            stack.pop()
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        if isinstance(source_path, bytes):
+            parser.Parse(source_path, True)
+        else:
+            with open(source_path, 'rb') as file:
+                parser.ParseFile(file)
+
+        return [violation._replace(line=lines.get((violation.element, violation.position)))
+                for violation in violations]
+
+    @staticmethod
+    def __find_cycle(aggregations: List['AggregationDef']) -> Optional[Tuple[str, int]]:
+        """Ищет цикл в графе агрегаций между классами.
+
+        Индекс смежности (source -> [(target, номер агрегации), ...]) строится один раз,
+        после чего весь граф проверяется одним итеративным поиском в глубину с тремя
+        цветами вершин (не посещена / в текущем пути / обработана). Сложность линейна по
+        числу классов и агрегаций, а глубина иерархии не ограничена лимитом рекурсии.
 
         Параметры:
         ----------
-        source : str
-            Класс, с которого начинается проверка.
-        target : str
-            Класс, к которому проверяется наличие связи.
-        aggregations : list
+        aggregations : List[AggregationDef]
             Список агрегаций, где каждая агрегация представляет связь между
-            классами в виде атрибутов 'source' и 'target'.
+            классами source и target.
 
-        Исключения:
+        Возвращает:
         -----------
-        ValueError
-            Выбрасывается, если обнаружен цикл в структуре агрегаций между классами.
+        Optional[Tuple[str, int]]
+            None, если циклов нет. Иначе сообщение с путём цикла и номер агрегации,
+            замыкающей цикл.
         """
-        visited = set()
 
-        def __dfs(current_class):
-            if current_class in visited:
-                raise ValueError(f"Обнаружен цикл при проверке связи: {source} -> {current_class} -> {target}.")
-            visited.add(current_class)
+        adjacency: Dict[str, List[Tuple[str, int]]] = {}
+        for index, aggregation in enumerate(aggregations):
+            adjacency.setdefault(aggregation.source, []).append((aggregation.target, index))
+
+        white, gray, black = 0, 1, 2
+        colours: Dict[str, int] = {}
+
+        for start_class in adjacency:
+            if colours.get(start_class, white) != white:
+                continue
+
+            colours[start_class] = gray
+            path: List[str] = [start_class]
+            stack = [iter(adjacency[start_class])]
+
+            while stack:
+                for next_class, index in stack[-1]:
+                    colour = colours.get(next_class, white)
+                    if colour == gray:
+                        cycle = path[path.index(next_class):] + [next_class]
+                        return (f"Обнаружен цикл при проверке связи: {cycle[0]} -> {cycle[0]} -> {cycle[1]}. "
+                                f"Путь цикла: {' -> '.join(cycle)}."), index
+                    if colour == white:
+                        colours[next_class] = gray
+                        path.append(next_class)
+                        stack.append(iter(adjacency.get(next_class, ())))
+                        break
+                else:
+                    # Все исходящие связи вершины обработаны
+                    colours[path.pop()] = black
+                    stack.pop()
+
+        return None
+
+
+class AttributeDef:
+    """Элемент Attribute модели: имя и тип атрибута класса.
+
+    Строки имён и типов интернируются, поэтому одинаковые значения (например,
+    'uint32' или 'string') хранятся в памяти один раз.
+    """
 
-            # Ищем все агрегации для текущего класса
-            for agg in aggregations:
-                if agg.attrib['source'] == current_class:
-                    __dfs(agg.attrib['target'])
+    __slots__ = ('name', 'type')
 
-            visited.remove(current_class)
+    def __init__(self, name: str, type: str):
+        self.name = sys.intern(name)
+        self.type = sys.intern(type)
 
-        # Запускаем DFS от источника
-        __dfs(source)
+    def __repr__(self):
+        return f"AttributeDef(name={self.name!r}, type={self.type!r})"
 
 
-class XMLParser(XMLValidator):
-    """Класс XMLParser используется для формирования xml файла с иерархией
+class AggregationDef:
+    """Элемент Aggregation модели: связь source (вложенный класс) -> target (включающий класс)."""
 
-    Основное применение - создание файла config.xml. Данный файл представляет собой пример внутренней
-    конфигурации базовой станции, соответствующий представленной модели.
+    __slots__ = ('source', 'target', 'source_multiplicity', 'target_multiplicity')
 
-    Note:
-        Результирующий файл не содержит атрибуты xml объектов. В файле отражаются
-        только сами объекты и их дочерние элементы "Class или Attribute"
+    def __init__(self, source: str, target: str, source_multiplicity: str, target_multiplicity: Optional[str] = None):
+        self.source = sys.intern(source)
+        self.target = sys.intern(target)
+        self.source_multiplicity = sys.intern(source_multiplicity)
+        self.target_multiplicity = None if target_multiplicity is None else sys.intern(target_multiplicity)
+
+    def __repr__(self):
+        return f"AggregationDef(source={self.source!r}, target={self.target!r})"
+
+
+class ClassDef:
+    """Элемент Class модели.
+
+    Attributes
+    ----------
+    name : str
+        Интернированное имя класса.
+    is_root : bool
+        Является ли класс корневым (isRoot='true').
+    properties : Tuple[Tuple[str, str], ...]
+        Все xml атрибуты элемента Class, кроме 'name', в исходном порядке.
+    attributes : Tuple[AttributeDef, ...]
+        Вложенные элементы Attribute в исходном порядке.
+    children : Tuple[ClassDef, ...]
+        Вложенные классы, по одному на каждую агрегацию с target = name.
+    aggregation : Optional[AggregationDef]
+        Агрегация, в которой класс является source (последняя, если их несколько).
+    """
+
+    __slots__ = ('name', 'is_root', 'properties', 'attributes', 'children', 'aggregation')
+
+    def __init__(self, name: str, properties: Tuple[Tuple[str, str], ...], attributes: Tuple[AttributeDef, ...]):
+        self.name = sys.intern(name)
+        self.properties = tuple((sys.intern(key), value) for key, value in properties)
+        self.is_root = dict(self.properties).get('isRoot') == 'true'
+        self.attributes = attributes
+        self.children: Tuple[ClassDef, ...] = ()
+        self.aggregation: Optional[AggregationDef] = None
+
+    def __repr__(self):
+        return f"ClassDef(name={self.name!r})"
+
+
+def multiplicity_bounds(multiplicity: str) -> Tuple[int, Optional[int]]:
+    """Границы мощности агрегации ('1', '0..42', '1..*'): нижняя и верхняя (None - не ограничена).
+
+    Допустимые записи: 'N', 'N..M' (M не меньше N), 'N..*' и 'N..n', а также '*' (0..*).
+
+    :raises ValueError:
+        Если запись не соответствует ни одной из допустимых.
+    """
+
+    bounds = multiplicity.split('..')
+    if multiplicity == '*':
+        return 0, None
+    # isdigit() без isascii() пропустил бы другие цифры Юникода, а int() - знак и пробелы
+    if len(bounds) <= 2 and bounds[0].isascii() and bounds[0].isdigit():
+        lower = int(bounds[0])
+        if len(bounds) == 1:
+            return lower, lower
+        if bounds[1] in ('*', 'n'):
+            return lower, None
+        if bounds[1].isascii() and bounds[1].isdigit() and int(bounds[1]) >= lower:
+            return lower, int(bounds[1])
+    raise ValueError(f"Некорректная мощность агрегации: '{multiplicity}'. "
+                     f"Ожидается N, N..M (M >= N), N..* или N..n.")
+
+
+class _HierarchyTables(NamedTuple):
+    """Предвычисленные таблицы HierarchyIndex."""
+
+    order: Tuple[str, ...]
+    ranks: Dict[str, int]
+    children: Dict[str, List[str]]
+    parents: Dict[str, Optional[str]]
+    starts: Dict[str, int]
+    ends: Dict[str, int]
+    depths: Dict[str, int]
+    instances: Dict[str, Tuple[int, Optional[int]]]
+
+
+class HierarchyIndex:
+    """Индекс запросов к иерархии классов, построенный по агрегациям модели.
+
+    Таблицы строятся один раз при первом запросе за линейное время по числу классов
+    и агрегаций. Граф агрегаций не разворачивается в дерево вхождений: класс, вложенный
+    через несколько агрегаций, хранится один раз, поэтому размер индекса не растёт
+    экспоненциально на графах с общими вложенными классами.
+    - order - топологический порядок классов (включающие классы раньше вложенных);
+    - обход графа в глубину в порядке config.xml, в котором каждый класс посещается
+      один раз (при первом вхождении), задаёт остовное дерево: включающий класс
+      первого вхождения и интервал обхода [начало, конец) каждого класса. Класс b
+      лежит в поддереве остовного дерева класса a, если a.начало < b.начало < a.конец;
+      эта проверка выполняется за O(1). Если b достижим из a только через класс,
+      посещённый раньше a, проверка предка обходит часть графа от a, ограниченную
+      классами, которые в топологическом порядке раньше b;
+    - для каждого класса хранятся границы количества экземпляров его поддерева по
+      sourceMultiplicity агрегаций.
+
+    Классы, не достижимые из корневого, образуют отдельные деревья, начинающиеся
+    с классов без включающего класса; они обходятся после дерева корневого класса.
 
     Attributes
     ----------
-    __input_file_name : str
-        название исходного файла. Например: 'impulse_test_input.xml'
+    __class_names : Iterable[str]
+        Имена всех классов модели в порядке документа.
+    __aggregations : Sequence[AggregationDef]
+        Агрегации модели в порядке документа.
+    __root : str
+        Имя корневого класса.
+    __tables : Optional[_HierarchyTables]
+        Таблицы индекса, None до первого запроса.
 
     Methods
     -------
-    main()
-        Запускает парсер, который создаёт файл config.xml с иерархией. Данный файл находится
-        в директории 'out', которая находится на одном уровне с 'main.py'.
+    order
+        Топологический порядок классов.
+    depth(name)
+        Глубина класса: длина кратчайшего пути от начала его дерева.
+    path(name)
+        Путь от корневого класса до первого вхождения класса.
+    descendants(name)
+        Все классы поддерева класса.
+    is_ancestor(ancestor, descendant)
+        Входит ли класс descendant в поддерево класса ancestor.
+    instances(name)
+        Границы количества экземпляров в поддереве одного экземпляра класса.
     """
 
-    def __init__(self, input_file_name: str):
-        self.__input_file_name = input_file_name
+    def __init__(self, class_names: Iterable[str], aggregations: Sequence['AggregationDef'], root: str):
+        self.__class_names = class_names
+        self.__aggregations = aggregations
+        self.__root = root
+        self.__tables: Optional[_HierarchyTables] = None
+
+    def __build(self) -> _HierarchyTables:
+        """Строит таблицы индекса (вызывается один раз)."""
+
+        class_names = list(self.__class_names)
+        children: Dict[str, List[str]] = {}
+        bounds: Dict[str, List[Tuple[str, int, Optional[int]]]] = {}  # (source, нижняя, верхняя граница)
+        parent_counts: Dict[str, int] = dict.fromkeys(class_names, 0)
+        for aggregation in self.__aggregations:
+            lower, upper = multiplicity_bounds(aggregation.source_multiplicity)
+            children.setdefault(aggregation.target, []).append(aggregation.source)
+            bounds.setdefault(aggregation.target, []).append((aggregation.source, lower, upper))
+            parent_counts[aggregation.source] += 1
+
+        # Топологический порядок (алгоритм Кана); граф ацикличен после валидации
+        order: List[str] = [name for name in class_names if not parent_counts[name]]
+        remaining = dict(parent_counts)
+        for name in order:
+            for child in children.get(name, ()):
+                remaining[child] -= 1
+                if not remaining[child]:
+                    order.append(child)
+        ranks = {name: rank for rank, name in enumerate(order)}
+
+        # Обход в порядке config.xml, каждый класс - при первом вхождении. Поддерево
+        # повторного вхождения уже обойдено целиком, поэтому порядок первых посещений
+        # совпадает с порядком первых вхождений в развёрнутое дерево.
+        parents: Dict[str, Optional[str]] = {}
+        starts: Dict[str, int] = {}
+        ends: Dict[str, int] = {}
+        tree_roots = [self.__root] + [name for name in class_names
+                                      if not parent_counts[name] and name != self.__root]
+        for tree_root in tree_roots:
+            # Элементы стека: (класс, включающий класс, выход из поддерева)
+            stack: List[Tuple[str, Optional[str], bool]] = [(tree_root, None, False)]
+            while stack:
+                name, parent, leaving = stack.pop()
+                if leaving:
+                    ends[name] = len(starts)
+                    continue
+                if name in starts:
+                    continue
+                starts[name] = len(starts)
+                parents[name] = parent
+                stack.append((name, None, True))
+                for child in reversed(children.get(name, ())):
+                    if child not in starts:
+                        stack.append((child, name, False))
+
+        # Минимальная глубина: включающие классы обрабатываются раньше вложенных
+        depths: Dict[str, int] = dict.fromkeys(tree_roots, 0)
+        for name in order:
+            depth = depths[name] + 1
+            for child in children.get(name, ()):
+                if depths.get(child, depth) >= depth:
+                    depths[child] = depth
+
+        # Границы количества экземпляров поддерева: вложенные классы раньше включающих
+        instances: Dict[str, Tuple[int, Optional[int]]] = {}
+        for name in reversed(order):
+            total_lower, total_upper = 0, 0
+            for child, lower, upper in bounds.get(name, ()):
+                child_lower, child_upper = instances[child]
+                total_lower += lower * (1 + child_lower)
+                if upper == 0 or total_upper is None:
+                    continue
+                total_upper = None if upper is None or child_upper is None else total_upper + upper * (1 + child_upper)
+            instances[name] = (total_lower, total_upper)
+
+        return _HierarchyTables(tuple(order), ranks, children, parents, starts, ends, depths, instances)
+
+    @property
+    def __index(self) -> _HierarchyTables:
+        tables = self.__tables
+        if tables is None:
+            tables = self.__tables = self.__build()
+        return tables
+
+    def __check(self, name: str) -> _HierarchyTables:
+        """Возвращает таблицы индекса, проверив, что класс есть в модели.
+
+        :raises KeyError:
+            Если в модели нет класса с таким именем.
+        """
 
-        # validate(self.__input_file_name)
-        super().validate_and_check_tags(self.__input_file_name)
+        tables = self.__index
+        if name not in tables.starts:
+            raise KeyError(name)
+        return tables
 
-        self.__tree = ET.parse(f'./input/{self.__input_file_name}')
-        self.__root = self.__tree.getroot()
+    @property
+    def order(self) -> Tuple[str, ...]:
+        """Все классы в топологическом порядке: включающий класс раньше вложенных."""
 
+        return self.__index.order
 
+    def depth(self, name: str) -> int:
+        """Глубина класса: 0 для корневого, для вложенного - длина кратчайшего пути от корневого."""
 
+        return self.__check(name).depths[name]
 
+    def path(self, name: str) -> Tuple[str, ...]:
+        """Имена классов от корневого до первого вхождения класса name включительно."""
 
+        parents = self.__check(name).parents
+        path = []
+        while name is not None:
+            path.append(name)
+            name = parents[name]
+        return tuple(reversed(path))
 
-    def __add_child_to_parent_xml(self) -> Dict[str, Element]:
-        """Создание новых xml объектов Class на основе существующих и
-        добавление в них дочерних xml объектов, которые никаких ат-
-        рибутов не имеют.
+    def descendants(self, name: str) -> Tuple[str, ...]:
+        """Классы поддерева класса name (без него) без повторов в порядке config.xml.
 
-        Note:
-            Формирование словаря xml объектов:
-            empty_xml_objects = {'class_name': <xml class_name object>, ...}
-            Каждый объект в этом словаре хранит внутри себя дочерние xml объекты,
-            если такие имеются.
+        Обходит подграф класса, посещая каждый класс один раз.
+        """
 
-        return
-        ------
-        empty_xml_objects : Dict
-            Словарь, хранящий xml объекты Class по их названию. Внутри каждого
-            такого объекта находятся дочерние элементы.
+        children = self.__check(name).children
+        found: Dict[str, None] = {}
+        stack = list(reversed(children.get(name, ())))
+        while stack:
+            child = stack.pop()
+            if child not in found:
+                found[child] = None
+                stack.extend(reversed(children.get(child, ())))
+        return tuple(found)
+
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """Проверяет, входит ли класс descendant в поддерево класса ancestor (сам класс - нет).
+
+        O(1), если descendant лежит в поддереве остовного дерева ancestor (всегда для
+        моделей-деревьев). Иначе обходится часть графа от ancestor, ограниченная
+        классами, которые в топологическом порядке раньше descendant.
         """
-        empty_xml_objects: Dict[str, Element] = {}
 
-        # В xml объектах Aggregation получаем имена объектов source и target.
-        for xml_aggregation_object in self.__root.findall(".//Aggregation"):
-            target_name = xml_aggregation_object.attrib['target']
-            source_name = xml_aggregation_object.attrib['source']
+        tables = self.__check(ancestor)
+        self.__check(descendant)
+        starts, ends, ranks, children = tables.starts, tables.ends, tables.ranks, tables.children
+        start = starts[descendant]
+        if starts[ancestor] < start < ends[ancestor]:
+            return True
+        rank = ranks[descendant]
+        if ranks[ancestor] >= rank:
+            return False
 
-            # Создаем или получаем новые XML объекты.
-            # Если в словаре уже есть такой ключ, то возвращаем существующее значение (xml объект).
-            # Если в словаре нет такого ключа, добавляем новую пару в словарь и возвращаем новое значение (xml объект).
-            target_xml_new: Element = empty_xml_objects.setdefault(target_name, ET.Element(target_name))
-            source_xml_new: Element = empty_xml_objects.setdefault(source_name, ET.Element(source_name))
-            # Добавляем исходный элемент в целевой
-            target_xml_new.append(source_xml_new)
+        stack, seen = [ancestor], {ancestor}
+        while stack:
+            for child in children.get(stack.pop(), ()):
+                if starts[child] <= start < ends[child]:
+                    return True
+                if child not in seen and ranks[child] < rank:
+                    seen.add(child)
+                    stack.append(child)
+        return False
+
+    def instances(self, name: str) -> Tuple[int, Optional[int]]:
+        """Границы количества экземпляров классов в поддереве одного экземпляра класса name.
+
+        Каждая агрегация source -> target даёт от нижней до верхней границы
+        sourceMultiplicity экземпляров source вместе с их поддеревьями.
+
+        :return: Tuple[int, Optional[int]]
+            Минимум и максимум экземпляров (без самого класса). None - максимум не
+            ограничен ('*' в мощности одной из агрегаций поддерева).
+        """
 
-        return empty_xml_objects
+        return self.__check(name).instances[name]
 
 
-    def __add_attribute_to_xml(self, empty_xml_objects: Dict[str, Element]) -> None:
-        """Добавляет элементы Attribute из исходного XML объекта Class (xml_real_class)
-        в соответствующий пустой XML объект Class (empty_xml_class).
+class XMLModel(NamedTuple):
+    """Неизменяемая модель, построенная по одному парсингу и одной валидации исходного файла.
 
-        Эта функция проходит по всем классам в исходном XML и для каждого класса
-        ищет соответствующий пустой объект. Если такой объект существует,
-        в него добавляются дочерние элементы атрибутов.
+    Модель создаётся один раз и передаётся в XMLParser и JSONParser. Генераторы не
+    читают и не проверяют файл повторно, поэтому на каждый входной файл приходится
+    ровно один парсинг.
 
-        :param empty_xml_objects: Dict[str, Element]
-            Словарь, содержащий пустые XML объекты Class,
-            где ключом является имя класса, а значением — элемент XML.
+    Attributes
+    ----------
+    classes : Tuple[ClassDef, ...]
+        Все классы в порядке следования в документе.
+    classes_by_name : Mapping[str, ClassDef]
+        Индекс классов по имени. Строится валидатором один раз.
+    aggregations : Tuple[AggregationDef, ...]
+        Все агрегации в порядке следования в документе.
+    root : ClassDef
+        Корневой класс (с атрибутом isRoot='true').
+    hierarchy : HierarchyIndex
+        Индекс запросов к иерархии классов (потомки, пути, глубина, количество
+        экземпляров). Таблицы индекса строятся при первом запросе.
 
-        :return: None
-            Функция не возвращает значений; она модифицирует
-            существующие XML объекты, добавляя атрибуты.
+    Note:
+        Модель не хранит элементы исходного документа и не изменяется генераторами,
+        поэтому одну модель можно многократно использовать в одном процессе.
+    """
 
-        Note:
-            Например, атрибуты с именами и типами, извлечённые из
-            исходного класса, будут добавлены как дочерние элементы в
-            соответствующий пустой XML класс.
+    classes: Tuple[ClassDef, ...]
+    classes_by_name: Mapping[str, ClassDef]
+    aggregations: Tuple[AggregationDef, ...]
+    root: ClassDef
+    hierarchy: HierarchyIndex
+
+    @classmethod
+    def from_file(cls, input_file_name: str, streaming: bool = False, verbose: bool = True,
+                  instrumentation: Optional[Instrumentation] = None, collect_all: bool = False) -> 'XMLModel':
+        """Парсит и валидирует файл из директории 'input' и строит по нему модель.
+
+        :param input_file_name: str
+            Название исходного файла. Например: 'impulse_test_input.xml'.
+            Абсолютный путь используется как есть.
+        :param streaming: bool
+            Читать файл потоково (см. XMLValidator.validate_and_check_tags()).
+        :param verbose: bool
+            Выводить ли сообщения валидатора.
+        :param instrumentation: Optional[Instrumentation]
+            Замеры этапов парсинга и валидации.
+        :param collect_all: bool
+            Собрать все нарушения документа вместо остановки на первом.
+
+        :return: XMLModel
+            Готовая к генерации модель.
+
+        :raises ValidationError:
+            Если документ не прошёл проверку.
         """
 
-        # Обработка классов и добавление атрибутов
-        for xml_real_class in self.__root.findall(".//Class"):
-            name_of_xml_real_class = xml_real_class.attrib['name']
-            empty_xml_class = empty_xml_objects.get(name_of_xml_real_class)
-
-            if empty_xml_class is not None:
-                for xml_real_attribute in xml_real_class.findall('Attribute'):
-                    # Создаем элемент и присваиваем текст
-                    xml_attribute_element = ET.Element(xml_real_attribute.get('name'))
-                    xml_attribute_element.text = xml_real_attribute.get('type')
-                    empty_xml_class.insert(0, xml_attribute_element)
-
+        validator = XMLValidator(instrumentation, collect_all)
+        return validator.validate_and_check_tags(input_file_name, streaming, verbose)
 
-    def __get_root_xml(self, empty_xml_objects: Dict[str, Element]) -> Element:
-        """Находит корневой XML объект из словаря пустых XML объектов,
-        который был получен в результате работы функции
-        `add_child_to_parent_xml()`.
+    @classmethod
+    def load(cls, source: Union[str, 'os.PathLike', bytes, BinaryIO], streaming: bool = False,
+             instrumentation: Optional[Instrumentation] = None, collect_all: bool = False) -> 'XMLModel':
+        """Парсит и валидирует документ по пути, из памяти или из бинарного потока.
 
-        Эта функция ищет класс с атрибутом `isRoot`, который
-        указывает на то, что данный класс является корнем,
-        и возвращает соответствующий XML объект из словаря.
+        В отличие от from_file(), путь используется как есть (без директории 'input')
+        и сообщения не выводятся. Метод не использует общего изменяемого состояния и
+        может вызываться из нескольких потоков.
 
-        :param empty_xml_objects: Dict[str, Element]
-            Словарь, содержащий пустые XML объекты,
-            где ключом является имя класса, а значением — элемент XML.
+        :param source: Union[str, os.PathLike, bytes, BinaryIO]
+            Путь к файлу, содержимое документа или бинарный поток.
+        :param streaming: bool
+            Читать документ потоково (см. XMLValidator.validate_and_check_tags()).
+        :param instrumentation: Optional[Instrumentation]
+            Замеры этапов парсинга и валидации.
+        :param collect_all: bool
+            Собрать все нарушения документа вместо остановки на первом.
 
-        :return: Element
-            Корневой XML объект, соответствующий классу с атрибутом
-            `isRoot='true'` из словаря `empty_xml_objects`.
+        :return: XMLModel
 
-        Note:
-            Если корневой класс не найден, может возникнуть исключение
-            KeyError. Рекомендуется предварительно проверить наличие
-            класса с `isRoot='true'` в XML перед вызовом этой функции.
+        :raises ValidationError:
+            Если документ не прошёл проверку.
         """
 
-        root_xml_object = empty_xml_objects[self.__root.find(".//Class[@isRoot='true']").attrib['name']]
-        return root_xml_object
+        if isinstance(source, os.PathLike):
+            source = os.fspath(source)
+        return XMLValidator(instrumentation, collect_all).validate_source(source, streaming)
 
-    def __make_file_from_xml(self, root_xml_object: Element) -> None:
-        """Создает XML файл из переданного корневого XML объекта.
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, BinaryIO], streaming: bool = False,
+                   instrumentation: Optional[Instrumentation] = None, collect_all: bool = False) -> 'XMLModel':
+        """Парсит и валидирует документ из памяти или бинарного потока и строит по нему модель.
 
-        Функция преобразует объект типа `Element` в строку формата XML и
-        записывает его в файл с именем "output.xml" в удобочитаемом формате.
+        Файлы не читаются и не создаются, поэтому метод подходит для сервисов,
+        получающих модель в теле запроса (см. service.py).
 
-        :param root_xml_object: Element
-            Корневой объект XML, который будет преобразован в строку
-            и сохранен в файл.
+        :param data: Union[bytes, BinaryIO]
+            Содержимое документа или бинарный поток.
+        :param streaming: bool
+            Читать документ потоково (см. XMLValidator.validate_and_check_tags()).
+        :param instrumentation: Optional[Instrumentation]
+            Замеры этапов парсинга и валидации.
+        :param collect_all: bool
+            Собрать все нарушения документа вместо остановки на первом.
 
-        :return: None
-            Функция не возвращает значений; результат сохраняется напрямую
-            в файл "output.xml".
+        :return: XMLModel
 
-        Note:
-            При каждом вызове этой функции содержимое файла "output.xml"
-            будет перезаписано. Убедитесь, что данные, которые вы хотите
-            сохранить, не потеряются.
+        :raises ValidationError:
+            Если документ не прошёл проверку.
         """
 
-        xml_str = ET.tostring(root_xml_object, encoding='utf-8', xml_declaration=True)
-        pretty_xml_as_string = minidom.parseString(xml_str).toprettyxml(indent="    ")
+        return XMLValidator(instrumentation, collect_all).validate_source(data, streaming)
 
-        with open("./out/config.xml", "w") as file:
-            file.write(pretty_xml_as_string)
+    @classmethod
+    def from_element(cls, document_root: 'Element', instrumentation: Optional[Instrumentation] = None) -> 'XMLModel':
+        """Валидирует уже разобранный документ и строит по нему модель.
 
+        :param document_root: Element
+            Корневой элемент документа (XMI).
+        :param instrumentation: Optional[Instrumentation]
+            Замеры этапов валидации.
 
-    def __start_xml_parser(self):
-        empty_xml_objects = self.__add_child_to_parent_xml()
-        self.__add_attribute_to_xml(empty_xml_objects)
-        root_xml_object = self.__get_root_xml(empty_xml_objects)
-        self.__make_file_from_xml(root_xml_object)
+        :return: XMLModel
+        """
 
-    def main(self):
-        """Запуск парсера"""
+        return XMLValidator(instrumentation).validate_document(document_root)
 
-        self.__start_xml_parser()
 
+class AtomicFile:
+    """Файл, который пишется во временный файл рядом с целью и заменяет её при успешном закрытии.
 
-# ------------------------- JSON ---------------------------------
+    Временный файл получает уникальное имя, поэтому одновременные записи одного пути из
+    разных потоков и процессов не смешиваются: читатели видят прежний или новый файл
+    целиком, а при исключении временный файл удаляется и цель не изменяется. Права
+    нового файла - как у open(): 0o666 с учётом umask процесса.
 
+    Пример:
+        with AtomicFile('./out/config.xml', encoding='utf-8') as file:
+            file.write(text)
+    """
 
-class JSONParser(XMLValidator):
-    """Класс JSONParser используется для формирования json файла
+    def __init__(self, path: Union[str, 'os.PathLike'], mode: str = 'w', encoding: Optional[str] = None,
+                 errors: Optional[str] = None):
+        if mode not in ('w', 'wb'):
+            raise ValueError(f"Неподдерживаемый режим записи: {mode}.")
+        self.__path = os.fspath(path)
+        self.__mode = mode
+        self.__encoding = encoding
+        self.__errors = errors
+        self.__temp_path = ''
+        self.__file: Optional[IO] = None
+
+    def __enter__(self) -> IO:
+        directory, name = os.path.split(self.__path)
+        self.__temp_path = os.path.join(directory, f".{name}.{os.urandom(6).hex()}.tmp")
+        descriptor = os.open(self.__temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0),
+                             0o666)
+        try:
+            self.__file = os.fdopen(descriptor, self.__mode, encoding=self.__encoding, errors=self.__errors)
+        except BaseException:
+            os.close(descriptor)
+            os.remove(self.__temp_path)
+            raise
+        return self.__file
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        replaced = False
+        try:
+            self.__file.close()
+            if exc_type is None:
+                os.replace(self.__temp_path, self.__path)
+                replaced = True
+        finally:
+            if not replaced:
+                os.remove(self.__temp_path)
 
-    Основное применение - создание файла meta.json. Данный файл содержит мета-информацию
-    о классах и их атрибутах. Фронтенд использует данный файл для корректного отображения
-    дерева объектов в интерфейсе пользователя (UI).
+
+class XMLParser:
+    """Класс XMLParser используется для формирования xml файла с иерархией
+
+    Основное применение - создание файла config.xml. Данный файл представляет собой пример внутренней
+    конфигурации базовой станции, соответствующий представленной модели.
 
     Note:
-        В данном файле в json формате отображена вся информация о каждом xml объекте Class:
-        атрибуты, вложенные классы, метрики.
+        Результирующий файл не содержит атрибуты xml объектов. В файле отражаются
+        только сами объекты и их дочерние элементы "Class или Attribute"
 
     Attributes
     ----------
-    __input_file_name : str
-        название исходного файла. Например: 'impulse_test_input.xml'
+    __model : Union[XMLModel, str]
+        Модель исходного файла. Для обратной совместимости вместо модели можно передать
+        название исходного файла, например: 'impulse_test_input.xml'. Конструктор не
+        читает файл: он разбирается при первой генерации.
+    __indent : str
+        Отступ одного уровня вложенности. По умолчанию четыре пробела.
+    __encoding : Optional[str]
+        Кодировка файла. Если задана, она указывается в xml декларации.
+    __output_dir : str
+        Директория для config.xml. По умолчанию './out'.
+    __instrumentation : Instrumentation
+        Замеры этапов 'config_xml' (обход и сериализация вместе с записью) и
+        'config_xml.file_write' (только вызовы записи в файл).
+    __instances : Optional[Union[str, int]]
+        Режим экземпляров. None (по умолчанию) - схема: по одному элементу на класс,
+        вместо значений атрибутов указаны их типы. MIN, MAX или число - каждая агрегация
+        разворачивается в соответствующее её sourceMultiplicity количество экземпляров
+        со сгенерированными значениями атрибутов (см. iter_instances()).
+    __unbounded : int
+        Количество экземпляров для неограниченной мощности ('*', '0..*') в режиме MAX
+        и верхняя граница для заданного числа. По умолчанию 10.
 
     Methods
     -------
+    write(file)
+        Построчно записывает config.xml в переданный текстовый поток.
+    open_class(class_def, depth), close_class(class_def, depth)
+        Строки config.xml одного класса до и после его вложенных классов.
+    dump(target)
+        Записывает config.xml в файл по пути (атомарно) или в поток.
+    iter_instances()
+        Генератор строк config.xml в режиме экземпляров.
     main()
-        Запускает парсер, который создаёт файл meta.json. Данный файл находится
+        Запускает парсер, который создаёт файл config.xml с иерархией. Данный файл находится
         в директории 'out', которая находится на одном уровне с 'main.py'.
     """
 
-    def __init__(self, input_file):
-        self.__input_file = input_file
-
-        super().validate_and_check_tags(self.__input_file)
-
-        self.__tree = ET.parse(f'./input/{self.__input_file}')
-        self.__root = self.__tree.getroot()
-
-    def __add_to_xml_child_and_aggregation(self) -> None:
-        """Добавляет новые атрибуты в исходные XML объекты Class, включая
-        дочерние объекты и объекты связи Aggregation.
-
-        Функция находит все объекты Aggregation в исходном XML и
-        устанавливает два типа атрибутов для целевых и исходных классов:
-        1. Дочерние XML объекты Class, добавляемые к атрибутам `target`.
-        2. Объект связи Aggregation, устанавливаемый для `source`.
+    MIN = 'min'
+    MAX = 'max'
+
+    def __init__(self, model: Union[XMLModel, str], indent: str = "    ", encoding: Optional[str] = None,
+                 output_dir: str = './out', instrumentation: Optional[Instrumentation] = None,
+                 instances: Optional[Union[str, int]] = None, unbounded: int = 10):
+        if instances is not None and instances not in (self.MIN, self.MAX) and (
+                not isinstance(instances, int) or instances < 0):
+            raise ValueError(f"Неизвестный режим экземпляров: {instances}.")
+        self.__model = model
+        self.__indent = indent
+        self.__encoding = encoding
+        self.__output_dir = output_dir
+        self.__instrumentation = NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+        self.__instances = instances
+        self.__unbounded = unbounded
+
+    def __get_model(self) -> XMLModel:
+        """Возвращает модель, при первом обращении разбирая файл, если передано его название."""
+
+        if isinstance(self.__model, str):
+            self.__model = XMLModel.from_file(self.__model, instrumentation=self.__instrumentation)
+        return self.__model
+
+    @staticmethod
+    def escape_text(text: str) -> str:
+        """Экранирует текст так же, как minidom (&, <, ", >)."""
+
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace("\"", "&quot;").replace(">", "&gt;")
+
+    def write(self, file: TextIO, reuse: Optional[Callable[[ClassDef, int], bool]] = None,
+              spans: Optional[Dict[Tuple[str, int], Tuple[int, int]]] = None) -> int:
+        """Построчно записывает config.xml в открытый текстовый поток.
+
+        Иерархия обходится итеративно (без рекурсии) от корневого класса модели,
+        и каждая строка сразу пишется в поток, поэтому потребление памяти не зависит
+        от размера результата, а глубина иерархии не ограничена лимитом рекурсии.
+
+        Формат совпадает с прежним результатом minidom.toprettyxml() байт в байт:
+        - внутри класса сначала идут его атрибуты в обратном порядке, затем
+          вложенные классы в порядке агрегаций;
+        - атрибут записывается как <name>type</name>, элемент без содержимого - как <name/>.
+        Строки класса формируют open_class() и close_class(); их же использует
+        emitters.ConfigXMLEmitter, поэтому форматы не расходятся.
+
+        :param file: TextIO
+            Поток, открытый на запись в текстовом режиме.
+        :param reuse: Optional[Callable[[ClassDef, int], bool]]
+            Вызывается перед записью каждого класса с классом и глубиной. Если возвращает
+            True, поддерево класса не записывается: его уже записал вызывающий код
+            (используется для частичной перегенерации, см. incremental.py).
+        :param spans: Optional[Dict[Tuple[str, int], Tuple[int, int]]]
+            Если задан, в него записываются позиции поддеревьев записанных классов:
+            (имя, глубина) -> (смещение, длина) по file.tell().
+
+        :return: int
+            Количество записанных элементов (классов и атрибутов), в режиме
+            экземпляров - количество записанных строк.
+        """
 
-        :return: None
-            Функция не возвращает значений и модифицирует существующие
-            XML объекты напрямую.
+        write = file.write
+        open_class, close_class = self.open_class, self.close_class
+        starts: List[int] = []  # Смещения открытых тегов классов, только при spans
+
+        write(self.declaration())
+
+        if self.__instances is not None:
+            written = 0
+            for line in self.iter_instances():
+                write(line)
+                written += 1
+            return written
+
+        # Элементы стека: (глубина, класс, выход из класса)
+        stack: List[Tuple[int, ClassDef, bool]] = [(0, self.__get_model().root, False)]
+        written = 0
+        while stack:
+            depth, class_def, leaving = stack.pop()
+
+            if leaving:
+                closing = close_class(class_def, depth)
+                if closing:
+                    write(closing)
+                if spans is not None:
+                    start = starts.pop()
+                    spans[(class_def.name, depth)] = (start, file.tell() - start)
+                continue
+
+            if reuse is not None and reuse(class_def, depth):
+                continue
+            written += 1 + len(class_def.attributes)
+            if spans is not None:
+                starts.append(file.tell())
+            write(open_class(class_def, depth))
+            stack.append((depth, class_def, True))
+            for child in reversed(class_def.children):
+                stack.append((depth + 1, child, False))
+
+        return written
+
+    def declaration(self) -> str:
+        """xml декларация config.xml с кодировкой, если она задана."""
+
+        if self.__encoding is None:
+            return '<?xml version="1.0" ?>\n'
+        return f'<?xml version="1.0" encoding="{self.__encoding}"?>\n'
+
+    def open_class(self, class_def: ClassDef, depth: int) -> str:
+        """Строки config.xml от открывающего тега класса до его вложенных классов.
+
+        Класс без атрибутов и вложенных классов записывается одним элементом <name/>,
+        иначе открывающий тег сопровождается атрибутами в обратном порядке:
+        <name>type</name> или <name/> для атрибута без типа.
+
+        :param class_def: ClassDef
+            Класс модели.
+        :param depth: int
+            Глубина класса в иерархии (0 - корневой класс).
+
+        :return: str
         """
 
-        for xml_aggregation_object in self.__root.findall(".//Aggregation"):
-            target_name: str = xml_aggregation_object.attrib['target']
-            source_name: str = xml_aggregation_object.attrib['source']
+        prefix = self.__indent * depth
+        if not class_def.attributes and not class_def.children:
+            return f"{prefix}<{class_def.name}/>\n"
+
+        escape_text = self.escape_text
+        lines = [f"{prefix}<{class_def.name}>\n"]
+        prefix += self.__indent
+        for attribute in reversed(class_def.attributes):
+            if attribute.type:
+                lines.append(f"{prefix}<{attribute.name}>{escape_text(attribute.type)}</{attribute.name}>\n")
+            else:
+                lines.append(f"{prefix}<{attribute.name}/>\n")
+        return ''.join(lines)
+
+    def close_class(self, class_def: ClassDef, depth: int) -> str:
+        """Закрывающий тег класса после его вложенных классов; пустая строка для <name/>."""
+
+        if not class_def.attributes and not class_def.children:
+            return ''
+        return f"{self.__indent * depth}</{class_def.name}>\n"
+
+    @classmethod
+    def instances_mode(cls, value: str) -> Union[str, int]:
+        """Разбирает текстовое значение режима экземпляров: 'min', 'max' или неотрицательное число.
+
+        :raises ValueError:
+            Если значение не является допустимым режимом.
+        """
 
-            target_xml: Element = self.__root.find(f".//Class[@name='{target_name}']")
-            source_xml: Element = self.__root.find(f".//Class[@name='{source_name}']")
+        if value in (cls.MIN, cls.MAX):
+            return value
+        if not value.isdigit():
+            raise ValueError(f"Ожидается min, max или число: {value}.")
+        return int(value)
+
+    def __instance_count(self, multiplicity: str) -> int:
+        """Количество экземпляров для мощности агрегации ('1', '0..42', '1..*') в текущем режиме."""
+
+        lower, upper = multiplicity_bounds(multiplicity)
+        if self.__instances == self.MIN:
+            return lower
+        if self.__instances == self.MAX:
+            return self.__unbounded if upper is None else upper
+        return max(lower, min(self.__instances, self.__unbounded if upper is None else upper))
+
+    @staticmethod
+    def __attribute_value(attribute: AttributeDef, index: int) -> str:
+        """Генерирует значение атрибута index-го экземпляра класса по типу атрибута."""
+
+        type_name = attribute.type.lower()
+        if type_name in ('boolean', 'bool'):
+            return 'true' if index % 2 == 0 else 'false'
+        if type_name.startswith(('int', 'uint', 'long', 'short')):
+            return str(index)
+        if type_name in ('float', 'double'):
+            return f"{index}.0"
+        if type_name == 'string':
+            return f"{attribute.name}{index}"
+        return attribute.type
+
+    def iter_instances(self) -> Iterator[str]:
+        """Лениво генерирует строки config.xml с экземплярами классов (без xml декларации).
+
+        Каждая агрегация разворачивается в количество экземпляров вложенного класса,
+        определяемое её sourceMultiplicity и режимом (MIN - нижняя граница, MAX - верхняя,
+        число - ограниченное границами мощности). Атрибуты экземпляра записываются
+        в исходном порядке со значениями по типу: числа - номер экземпляра класса,
+        boolean - чередование true/false, string - имя атрибута с номером.
+
+        Повторяющиеся экземпляры не разворачиваются заранее: в стеке обхода хранится
+        класс и оставшееся количество экземпляров, поэтому потребление памяти зависит
+        от глубины иерархии, а не от количества узлов результата.
+
+        :return: Iterator[str]
+            Строки результата.
+        """
 
-            # Добавление дочернего xml объекта Attribute в качестве атрибута.
-            source_xml.set('aggregation', xml_aggregation_object)
+        model = self.__get_model()
+        indent = self.__indent
+        escape_text = self.escape_text
+        attribute_value = self.__attribute_value
+
+        # Вложенные классы и количество их экземпляров по включающему классу
+        children: Dict[str, List[Tuple[ClassDef, int]]] = {}
+        for aggregation in model.aggregations:
+            count = self.__instance_count(aggregation.source_multiplicity)
+            if count:
+                children.setdefault(aggregation.target, []).append(
+                    (model.classes_by_name[aggregation.source], count))
+
+        counters: Dict[str, int] = {}  # Номер следующего экземпляра по классу
+        # Элементы стека: (глубина, класс или имя закрываемого тега, оставшееся количество экземпляров)
+        stack: List[Tuple[int, Union[ClassDef, str], int]] = [(0, model.root, 1)]
+        while stack:
+            depth, item, remaining = stack.pop()
+            prefix = indent * depth
+
+            if isinstance(item, str):
+                yield f"{prefix}</{item}>\n"
+                continue
+
+            if remaining > 1:
+                stack.append((depth, item, remaining - 1))
+            index = counters.get(item.name, 0)
+            counters[item.name] = index + 1
+
+            item_children = children.get(item.name, ())
+            if not item.attributes and not item_children:
+                yield f"{prefix}<{item.name}/>\n"
+                continue
+
+            yield f"{prefix}<{item.name}>\n"
+            for attribute in item.attributes:
+                yield f"{prefix}{indent}<{attribute.name}>{escape_text(attribute_value(attribute, index))}</{attribute.name}>\n"
+            stack.append((depth, item.name, 0))
+            for child, count in reversed(item_children):
+                stack.append((depth + 1, child, count))
+
+    def dump(self, target: Union[str, 'os.PathLike', TextIO]) -> int:
+        """Записывает config.xml в файл по пути или в открытый текстовый поток.
+
+        Файл по пути заменяется атомарно (см. AtomicFile), поэтому одновременные
+        генерации в один путь не смешивают содержимое. Без явной кодировки файл пишется
+        в UTF-8; символы, которые нельзя представить в заданной кодировке, заменяются
+        ссылками на символы. Метод не использует общего изменяемого состояния и может
+        вызываться из нескольких потоков.
+
+        :param target: Union[str, os.PathLike, TextIO]
+            Путь к результату (используется как есть) или поток с методом write().
+
+        :return: int
+            Результат write().
+        """
 
-            # Добавление дочернего xml объекта Class в качестве атрибута.
-            target_xml.set(source_xml.attrib['name'], source_xml)
+        self.__get_model()  # Исходный файл разбирается до открытия результата на запись
+        instrumentation = self.__instrumentation
+        if hasattr(target, 'write'):
+            output = nullcontext(target)
+        else:
+            output = AtomicFile(target, 'w', encoding=self.__encoding or "utf-8", errors="xmlcharrefreplace")
+        with instrumentation.stage('config_xml') as stage:
+            with output as file:
+                if instrumentation.enabled:
+                    timed_file = TimedWriter(file)
+                    stage.elements = written = self.write(timed_file)
+                else:
+                    written = self.write(file)
+        if instrumentation.enabled:
+            instrumentation.record('config_xml.file_write', timed_file.seconds, timed_file.calls)
+        return written
+
+    def __make_file_from_xml(self) -> None:
+        """Создает файл config.xml в выходной директории.
 
-    def __make_class_xml_tag_array(self) -> List[str]:
-        """Ищет объекты Class в корневом элементе XML и формирует список
-        их имен.
+        Note:
+            При каждом вызове этой функции содержимое файла будет перезаписано.
+        """
 
-        Функция проходит по всем найденным объектам Class и собирает
-        их имена в список `class_xml_tag_array`, который затем возвращается.
+        self.dump(os.path.join(self.__output_dir, "config.xml"))
 
-        :return class_xml_tag_array: List[str]
-            Список строк, содержащий имена XML объектов Class, найденных в корне.
-        """
+    def __start_xml_parser(self):
+        self.__make_file_from_xml()
 
-        class_xml_tag_array: List[str] = []
-        for xml_aggregation_object in self.__root.findall(".//Class"):
-            class_xml_tag_array.append(xml_aggregation_object.attrib['name'])
+    def main(self):
+        """Запуск парсера"""
 
-        return class_xml_tag_array
+        self.__start_xml_parser()
 
-    def __make_list_with_xml_class(self) -> List[Element]:
-        """Ищет и собирает объекты Class из корневого элемента XML в список.
 
-        Функция проходит по всем найденным объектам Class и добавляет
-        их в список `temp_orig_xml_object`, который затем возвращается.
+# ------------------------- JSON ---------------------------------
 
-        :return temp_orig_xml_object: List[Element]
-            Список объектов типа Element, представляющих XML объекты Class,
-            найденные в корне.
-        """
 
-        temp_orig_xml_object: List[Element] = []
-        for item in self.__root.findall(".//Class"):
-            temp_orig_xml_object.append(item)
+class JSONParser:
+    """Класс JSONParser используется для формирования json файла
 
-        return temp_orig_xml_object
+    Основное применение - создание файла meta.json. Данный файл содержит мета-информацию
+    о классах и их атрибутах. Фронтенд использует данный файл для корректного отображения
+    дерева объектов в интерфейсе пользователя (UI).
 
-    def __add_xml_attribute_to_xml(self, temp_orig_xml_object: List[Element]) -> None:
-        """Получает вложенные XML объекты Attribute и добавляет их в родительский
-        объект Class в качестве атрибута 'attributes'.
+    Note:
+        В данном файле в json формате отображена вся информация о каждом xml объекте Class:
+        атрибуты, вложенные классы, метрики.
 
-        Функция проходит по всем переданным объектам Class и ищет их
-        вложенные объекты Attribute. Если они найдены, объекты добавляются
-        в качестве атрибута 'attributes' родительского элемента.
+    Attributes
+    ----------
+    __model : Union[XMLModel, str]
+        Модель исходного файла. Для обратной совместимости вместо модели можно передать
+        название исходного файла, например: 'impulse_test_input.xml'. Конструктор не
+        читает файл: он разбирается при первой генерации.
+    __output_format : str
+        Формат результата:
+        - PRETTY ('pretty') - json массив с отступом в 4 пробела (по умолчанию);
+        - COMPACT ('compact') - json массив без отступов и пробелов;
+        - NDJSON ('ndjson') - по одному классу в строке, файл meta.ndjson.
+    __output_dir : str
+        Директория для meta.json. По умолчанию './out'.
+    __instrumentation : Instrumentation
+        Замеры этапов 'meta_json' (кодирование вместе с записью) и
+        'meta_json.file_write' (только вызовы записи в файл).
 
-        :param temp_orig_xml_object: List[Element]
-            Список объектов XML Class, в которых нужно искать вложенные
-            объекты Attribute.
-        """
+    Methods
+    -------
+    iterencode()
+        Генератор фрагментов результата, по одному классу за раз.
+    encode_class(class_def), delimiters(), encode_end(count)
+        Запись одного класса и обрамление записей.
+    write(file)
+        Записывает результат в переданный текстовый поток.
+    dump(target)
+        Записывает результат в файл по пути (атомарно) или в поток.
+    main()
+        Запускает парсер, который создаёт файл meta.json (meta.ndjson для NDJSON). Данный
+        файл находится в директории 'out', которая находится на одном уровне с 'main.py'.
+    """
 
-        for xml_item in temp_orig_xml_object:
-            attributes = xml_item.findall("./Attribute")
-            if len(attributes) != 0:
-                xml_item.attrib['attributes'] = attributes
+    PRETTY = 'pretty'
+    COMPACT = 'compact'
+    NDJSON = 'ndjson'
+
+    # Ключи записи класса, которые задаёт генератор
+    __RESERVED_KEYS = frozenset(('class', 'max', 'min', 'parameters'))
+    # Значения xml атрибутов, которые записываются как логические, в виде JSON
+    __TYPED_VALUES = {'true': 'true', 'false': 'false'}
+
+    def __init__(self, model: Union[XMLModel, str], output_format: str = PRETTY, output_dir: str = './out',
+                 instrumentation: Optional[Instrumentation] = None):
+        if output_format not in (self.PRETTY, self.COMPACT, self.NDJSON):
+            raise ValueError(f"Неизвестный формат meta.json: {output_format}.")
+        self.__model = model
+        self.__output_format = output_format
+        self.__output_dir = output_dir
+        self.__instrumentation = NULL_INSTRUMENTATION if instrumentation is None else instrumentation
+        self.__tokens: Dict[str, str] = {}
+        # Разметка записи класса: отступ полей, отступ параметров, разделитель ключа, отступ
+        # закрывающей скобки, начало параметра до имени, переход к типу и конец параметра
+        if output_format == self.PRETTY:
+            fields_indent, parameters_indent, parameter_indent = '\n' + ' ' * 8, '\n' + ' ' * 12, '\n' + ' ' * 16
+            colon, closing = ': ', '\n    '
+        else:
+            fields_indent = parameters_indent = parameter_indent = closing = ''
+            colon = ':'
+        self.__layout = (fields_indent, parameters_indent, colon, closing,
+                         '{' + parameter_indent + '"name"' + colon, ',' + parameter_indent + '"type"' + colon,
+                         parameters_indent + '}')
+
+    def __get_model(self) -> XMLModel:
+        """Возвращает модель, при первом обращении разбирая файл, если передано его название."""
+
+        if isinstance(self.__model, str):
+            self.__model = XMLModel.from_file(self.__model, instrumentation=self.__instrumentation)
+        return self.__model
 
     def __str_to_bool(self, string):
         """Преобразует строковое представление булевого значения в тип
@@ -479,85 +1633,227 @@ class JSONParser(XMLValidator):
             return False
         return string
 
-    def __xml_to_dict(self, element: Element, class_xml_tag_array: List[str]) -> Dict:
-        """Преобразует XML объект Class в словарь.
-
-        Функция принимает элемент XML и преобразует его в словарь,
-        извлекая атрибуты и вложенные объекты.
-
-        :param element: Element
-            XML объект Class, который нужно сериализовать.
+    def __class_to_dict(self, class_def: ClassDef) -> Dict:
+        """Преобразует класс модели в словарь.
 
-        :param class_xml_tag_array: List[str]
-            Список с именами XML объектов Class, чтобы фильтровать атрибуты.
+        :param class_def: ClassDef
+            Класс модели, который нужно сериализовать.
 
         :return: Dict
-            Словарь, представляющий сериализованные XML объекты.
+            Словарь, представляющий сериализованный класс: имя, xml атрибуты,
+            метрика (min/max), атрибуты и вложенные классы.
         """
 
         obj = {}
 
         # Добавление имени элемента в словарь
-        obj[element.tag.lower()] = element.attrib['name']
+        obj['class'] = class_def.name
 
         # Добавление атрибутов в словарь
-        for attrib_item in element.attrib.items():
-            if attrib_item[0] not in class_xml_tag_array and attrib_item[0] != 'name' and type(attrib_item[1]) == str:
-                obj[attrib_item[0]] = self.__str_to_bool(attrib_item[1])
+        for key, value in class_def.properties:
+            obj[key] = self.__str_to_bool(value)
 
         # Добавление метрики
-        if element.attrib['isRoot'] != 'true':
-            min_max = element.attrib['aggregation'].attrib['sourceMultiplicity'].split('..')
+        if not class_def.is_root and class_def.aggregation is not None:
+            min_max = class_def.aggregation.source_multiplicity.split('..')
             obj["max"] = min_max[-1]
             obj["min"] = min_max[0]
 
         obj["parameters"] = []
 
-        # Обработка вложенных атрибутов XML
-        if 'attributes' in element.attrib.keys():
-            for attribute in element.attrib['attributes']:
-                temp_dict = {'name': attribute.attrib['name'], 'type': attribute.attrib['type']}
-                obj["parameters"].append(temp_dict)
-
-        # Обработка вложенных объектов Class
-        for attrib_item in element.attrib.items():
-            if attrib_item[0] in class_xml_tag_array:
-                new_dict = {
-                    'name': attrib_item[0],
-                    'type': 'class'
-                }
-                obj["parameters"].append(new_dict)
+        # Обработка вложенных атрибутов
+        for attribute in class_def.attributes:
+            obj["parameters"].append({'name': attribute.name, 'type': attribute.type})
+
+        # Обработка вложенных классов (повторяющиеся агрегации дают один параметр)
+        for child_name in dict.fromkeys(child.name for child in class_def.children):
+            obj["parameters"].append({'name': child_name, 'type': 'class'})
 
         return obj
 
-    def __make_file_from_json(self, class_xml_tag_array: List[str]):
-        """Создаёт JSON файл из объектов XML Class.
+    def delimiters(self) -> Tuple[str, str, str]:
+        """Возвращает обрамление записей классов в результате.
+
+        :return: Tuple[str, str, str]
+            Текст перед первой записью, между записями и после последней.
+            Для NDJSON все три строки пустые.
+        """
+
+        if self.__output_format == self.NDJSON:
+            return '', '', ''
+        if self.__output_format == self.COMPACT:
+            return '[', ',', ']'
+        return '[\n    ', ',\n    ', '\n]'
 
-        Функция итерирует по всем объектам Class в корневом элементе XML,
-        преобразует каждый объект в словарь с помощью метода __xml_to_dict,
-        а затем сохраняет полученные данные в файл output.json.
+    def encode_class(self, class_def: ClassDef) -> str:
+        """Кодирует один класс модели так, как его запись выглядит в результате.
 
-        :param class_xml_tag_array: List[str]
-            Список с именами XML объектов Class, используемый для фильтрации атрибутов.
+        Запись не зависит от соседних классов, поэтому результат можно собирать из
+        записей, закодированных в разное время (см. incremental.py).
+
+        :param class_def: ClassDef
+            Класс модели.
+
+        :return: str
+            Запись класса без обрамления (см. delimiters()). Текст совпадает с
+            json.dumps() словаря класса, но строится без промежуточных словарей:
+            значения 'true'/'false' сразу записываются как логические, а повторяющиеся
+            ключи и типы атрибутов кодируются один раз (см. __token()).
+        """
+
+        if not self.__RESERVED_KEYS.isdisjoint(key for key, _ in class_def.properties):
+            return self.__encode_dict(class_def)
+
+        from json.encoder import encode_basestring_ascii as encode_string
+
+        token = self.__token
+        typed_values = self.__TYPED_VALUES
+        fields_indent, parameters_indent, colon, closing, parameter_open, parameter_type, parameter_close = \
+            self.__layout
+
+        fields = ['"class"' + colon + encode_string(class_def.name)]
+        for key, value in class_def.properties:
+            fields.append(token(key) + colon + (typed_values.get(value) or encode_string(value)))
+        if not class_def.is_root and class_def.aggregation is not None:
+            bounds = class_def.aggregation.source_multiplicity.split('..')
+            fields.append('"max"' + colon + token(bounds[-1]))
+            fields.append('"min"' + colon + token(bounds[0]))
+
+        parameters = [parameter_open + encode_string(attribute.name) + parameter_type + token(attribute.type) +
+                      parameter_close for attribute in class_def.attributes]
+        # Повторяющиеся агрегации дают один параметр
+        class_type = parameter_type + '"class"' + parameter_close
+        for child_name in dict.fromkeys(child.name for child in class_def.children):
+            parameters.append(parameter_open + encode_string(child_name) + class_type)
+        if parameters:
+            separator = ',' + parameters_indent
+            fields.append('"parameters"' + colon + '[' + parameters_indent + separator.join(parameters) +
+                          fields_indent + ']')
+        else:
+            fields.append('"parameters"' + colon + '[]')
+
+        record = '{' + fields_indent + (',' + fields_indent).join(fields) + closing + '}'
+        return record + '\n' if self.__output_format == self.NDJSON else record
+
+    def __token(self, value: str) -> str:
+        """JSON-строка для повторяющегося значения: ключа, типа атрибута или границы мощности.
+
+        Таких значений в модели немного, поэтому каждое кодируется один раз на генератор.
+        """
+
+        encoded = self.__tokens.get(value)
+        if encoded is None:
+            from json.encoder import encode_basestring_ascii
+
+            encoded = self.__tokens[value] = encode_basestring_ascii(value)
+        return encoded
+
+    def __encode_dict(self, class_def: ClassDef) -> str:
+        """Кодирует класс через словарь и json.dumps().
+
+        Используется, если xml атрибут класса совпадает с ключом записи ('class', 'max',
+        'min', 'parameters'): значение такого ключа в словаре заменяется, а позиция сохраняется.
+        """
+
+        import json
+
+        if self.__output_format == self.NDJSON:
+            return json.dumps(self.__class_to_dict(class_def), separators=(',', ':')) + '\n'
+        if self.__output_format == self.COMPACT:
+            return json.dumps(self.__class_to_dict(class_def), separators=(',', ':'))
+        # Строки внутри json не содержат переводов строк (они экранируются),
+        # поэтому вложенный отступ можно добавить простой заменой.
+        return json.dumps(self.__class_to_dict(class_def), indent=4).replace('\n', '\n    ')
+
+    def iterencode(self) -> Iterator[str]:
+        """Кодирует классы модели по одному и отдаёт фрагменты результата.
+
+        Словарь очередного класса создаётся только перед его кодированием, поэтому
+        размер результата не влияет на потребление памяти. Формат PRETTY совпадает
+        байт в байт с json.dumps(<список всех классов>, indent=4).
+
+        :return: Iterator[str]
+            Фрагменты текста, которые нужно записать подряд.
+        """
+
+        classes = self.__get_model().classes
+
+        opening, separator, _ = self.delimiters()
+        encode_class = self.encode_class
+        for index, class_def in enumerate(classes):
+            yield (separator if index else opening) + encode_class(class_def)
+        ending = self.encode_end(len(classes))
+        if ending:
+            yield ending
+
+    def encode_end(self, count: int) -> str:
+        """Текст после последней записи класса: пустая модель даёт пустой массив.
+
+        :param count: int
+            Количество записанных классов.
+
+        :return: str
+        """
+
+        if not count and self.__output_format != self.NDJSON:
+            return '[]'
+        return self.delimiters()[2]
+
+    def write(self, file: TextIO) -> int:
+        """Записывает результат в открытый текстовый поток по одному классу за раз.
+
+        :param file: TextIO
+            Поток, открытый на запись в текстовом режиме.
+
+        :return: int
+            Количество записанных классов.
+        """
+
+        for chunk in self.iterencode():
+            file.write(chunk)
+        return len(self.__get_model().classes)
+
+    def __make_file_from_json(self):
+        """Создаёт JSON файл из классов модели.
+
+        Классы кодируются и записываются в файл по одному, полный список словарей
+        и полная строка результата в памяти не создаются.
 
         :return: None
         """
 
-        json_file = []
-        for xml_class in self.__root.findall(".//Class"):
-            json_file.append(self.__xml_to_dict(xml_class, class_xml_tag_array))
+        file_name = 'meta.ndjson' if self.__output_format == self.NDJSON else 'meta.json'
+        self.dump(os.path.join(self.__output_dir, file_name))
+
+    def dump(self, target: Union[str, 'os.PathLike', TextIO]) -> int:
+        """Записывает результат в файл по пути (атомарно, см. AtomicFile) или в открытый поток.
+
+        Метод не использует общего изменяемого состояния и может вызываться из
+        нескольких потоков.
 
-        data = json.dumps(json_file, indent=4)
+        :param target: Union[str, os.PathLike, TextIO]
+            Путь к результату (используется как есть) или поток с методом write().
 
-        with open('./out/meta.json', 'w') as file:
-            file.write(data)
+        :return: int
+            Количество записанных классов.
+        """
+
+        self.__get_model()  # Исходный файл разбирается до открытия результата на запись
+        instrumentation = self.__instrumentation
+        output = nullcontext(target) if hasattr(target, 'write') else AtomicFile(target, 'w', encoding='utf-8')
+        with instrumentation.stage('meta_json') as stage:
+            with output as file:
+                if instrumentation.enabled:
+                    timed_file = TimedWriter(file)
+                    stage.elements = written = self.write(timed_file)
+                else:
+                    written = self.write(file)
+        if instrumentation.enabled:
+            instrumentation.record('meta_json.file_write', timed_file.seconds, timed_file.calls)
+        return written
 
     def __start_json_parser(self):
-        self.__add_to_xml_child_and_aggregation()
-        class_xml_tag_array = self.__make_class_xml_tag_array()
-        temp_orig_xml_object = self.__make_list_with_xml_class()
-        self.__add_xml_attribute_to_xml(temp_orig_xml_object)
-        self.__make_file_from_json(class_xml_tag_array)
+        self.__make_file_from_json()
 
     def main(self):
         """Запуск парсера"""
@@ -566,8 +1862,10 @@ class JSONParser(XMLValidator):
 
 
 if __name__ == '__main__':
-    obj_xml = XMLParser('impulse_test_input.xml')
+    model = XMLModel.from_file('impulse_test_input.xml')
+
+    obj_xml = XMLParser(model)
     obj_xml.main()
 
-    obj_json = JSONParser('impulse_test_input.xml')
+    obj_json = JSONParser(model)
     obj_json.main()
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""Запросы к иерархии классов модели без повторного обхода XML.
+
+Пример запуска:
+    python query.py input/impulse_test_input.xml descendants HWE
+    python query.py input/impulse_test_input.xml path CPLANE
+    python query.py input/impulse_test_input.xml depth
+    python query.py input/impulse_test_input.xml instances BTS --json
+    python query.py input/impulse_test_input.xml ancestor BTS CPLANE
+
+Ответы строятся по индексу HierarchyIndex модели (см. main.py). С параметром
+--snapshot-dir модель загружается из бинарного снимка (см. compiled.py), поэтому
+повторные запросы к большой модели не разбирают XMI заново.
+"""
+
+from typing import List, Optional
+import argparse
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+from main import HierarchyIndex, XMLModel
+
+
+def _bound(value: Optional[int]) -> str:
+    return '*' if value is None else str(value)
+
+
+def run_query(hierarchy: HierarchyIndex, command: str, names: List[str]) -> object:
+    """Выполняет запрос и возвращает результат в виде, пригодном для json.dumps().
+
+    :param hierarchy: HierarchyIndex
+        Индекс иерархии модели.
+    :param command: str
+        Запрос: order, depth, path, descendants, instances или ancestor.
+    :param names: List[str]
+        Имена классов запроса. Для depth без имён возвращается глубина всех классов.
+
+    :return: object
+
+    :raises KeyError:
+        Если в модели нет класса с одним из имён.
+    """
+
+    if command == 'order':
+        return list(hierarchy.order)
+    if command == 'depth':
+        return {name: hierarchy.depth(name) for name in names or hierarchy.order}
+    if command == 'path':
+        return {name: list(hierarchy.path(name)) for name in names}
+    if command == 'descendants':
+        return {name: list(hierarchy.descendants(name)) for name in names}
+    if command == 'instances':
+        return {name: dict(zip(('min', 'max'), hierarchy.instances(name))) for name in names}
+    if command == 'ancestor':
+        return hierarchy.is_ancestor(names[0], names[1])
+    raise ValueError(f"Неизвестный запрос: {command}.")
+
+
+def format_result(command: str, result: object) -> str:
+    """Текстовый вывод результата run_query(): по строке на класс."""
+
+    if command == 'order':
+        return "\n".join(result)
+    if command == 'ancestor':
+        return 'true' if result else 'false'
+    lines = []
+    for name, value in result.items():
+        if command == 'path':
+            value = ' -> '.join(value)
+        elif command == 'descendants':
+            value = ' '.join(value)
+        elif command == 'instances':
+            value = f"{value['min']}..{_bound(value['max'])}"
+        lines.append(f"{name}\t{value}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки. Возвращает код завершения (1 - неизвестный класс или ошибка модели)."""
+
+    parser = argparse.ArgumentParser(description="Запросы к иерархии классов UML-модели.")
+    parser.add_argument('input', help="файл модели")
+    parser.add_argument('command', choices=('order', 'depth', 'path', 'descendants', 'instances', 'ancestor'),
+                        help="order - топологический порядок классов; depth - глубина; path - путь от корня; "
+                             "descendants - классы поддерева; instances - границы количества экземпляров "
+                             "поддерева; ancestor A B - входит ли B в поддерево A")
+    parser.add_argument('names', nargs='*', help="имена классов")
+    parser.add_argument('--json', action='store_true', help="вывести результат в JSON")
+    parser.add_argument('--snapshot-dir', default=None,
+                        help="директория бинарных снимков моделей для быстрой повторной загрузки (без снимков)")
+    parser.add_argument('--streaming', action='store_true', help="потоковое чтение большой модели")
+    args = parser.parse_args(argv)
+    if args.command == 'ancestor' and len(args.names) != 2:
+        parser.error("ancestor ожидает два имени класса")
+    if args.command in ('path', 'descendants', 'instances') and not args.names:
+        parser.error(f"{args.command} ожидает хотя бы одно имя класса")
+
+    input_path = os.path.abspath(args.input)
+    try:
+        if args.snapshot_dir is None:
+            model = XMLModel.from_file(input_path, streaming=args.streaming, verbose=False)
+        else:
+            from compiled import load_model
+            model = load_model(input_path, args.snapshot_dir, streaming=args.streaming)
+        result = run_query(model.hierarchy, args.command, args.names)
+    except KeyError as e:
+        print(f"Класс не найден: {e.args[0]}.", file=sys.stderr)
+        return 1
+    except (ValueError, ET.ParseError, OSError) as e:
+        # Ошибка чтения или валидации модели (ValidationError - подкласс ValueError)
+        print(e, file=sys.stderr)
+        return 1
+    print(json.dumps(result, ensure_ascii=False, indent=4) if args.json else format_result(args.command, result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
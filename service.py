@@ -0,0 +1,404 @@
+"""Асинхронный API генерации артефактов и локальный HTTP сервер для нагрузочных тестов.
+
+Пример использования из веб-бэкенда:
+    async with ArtifactService(workers=4) as service:
+        artifacts = await service.generate(request_body)
+        config_xml, meta_json = artifacts.config_xml, artifacts.meta_json
+
+        async for chunk in service.stream(request.content, CONFIG_XML, instances='max'):
+            await response.write(chunk)
+
+Пример запуска сервера:
+    python service.py --port 8080 --workers 4
+    curl --data-binary @input/impulse_test_input.xml 'http://127.0.0.1:8080/meta.json?format=compact'
+
+Модель принимается в виде bytes, асинхронного итератора фрагментов bytes или потока
+с методом read() (например, asyncio.StreamReader). Парсинг, валидация и генерация
+выполняются в ограниченном пуле процессов, так что цикл событий не блокируется.
+Результат возвращается в памяти; при потоковой выдаче он пишется во временный файл,
+уникальный для запроса, поэтому параллельные запросы не используют общих выходных файлов.
+
+Сервер (см. serve()) обрабатывает запросы:
+    POST /config.xml    - config.xml по модели из тела запроса;
+    POST /meta.json     - meta.json по модели из тела запроса;
+    GET  /health        - проверка доступности.
+Параметры запроса: format=pretty|compact|ndjson (meta.json), instances=min|max|N
+(config.xml, см. XMLParser), stream=1 - ответ частями (Transfer-Encoding: chunked).
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Dict, NamedTuple, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+
+from emitters import ConfigXMLEmitter, Emitter, MetaJSONEmitter, emit_to
+from main import JSONParser, XMLModel, XMLParser
+
+CONFIG_XML = 'config.xml'
+META_JSON = 'meta.json'
+
+
+class Artifacts(NamedTuple):
+    """Сгенерированные артефакты одной модели."""
+
+    config_xml: bytes
+    meta_json: bytes
+
+
+def _make_emitter(artifact: str, json_format: str, instances: Optional[Union[str, int]]) -> Emitter:
+    """Генератор артефакта с параметрами запроса."""
+
+    if artifact == CONFIG_XML:
+        return ConfigXMLEmitter(instances=instances)
+    if artifact == META_JSON:
+        return MetaJSONEmitter(json_format)
+    raise ValueError(f"Неизвестный артефакт: {artifact}.")
+
+
+def _write_artifacts(model: XMLModel, artifacts: Sequence[str], files: Sequence[BinaryIO], json_format: str,
+                     instances: Optional[Union[str, int]]) -> None:
+    """Записывает артефакты в бинарные потоки за один обход модели так же, как batch.py в файлы."""
+
+    emitters = [_make_emitter(artifact, json_format, instances) for artifact in artifacts]
+    text_files = [io.TextIOWrapper(file, encoding='utf-8', errors=emitter.errors, newline='\n')
+                  for emitter, file in zip(emitters, files)]
+    emit_to(model, emitters, text_files)
+    for text_file in text_files:
+        text_file.flush()
+        text_file.detach()
+
+
+def render_artifacts(data: bytes, json_format: str = JSONParser.PRETTY,
+                     instances: Optional[Union[str, int]] = None) -> Artifacts:
+    """Строит модель по содержимому документа и возвращает оба артефакта.
+
+    Функция выполняется в процессе пула, поэтому принимает и возвращает только bytes.
+    """
+
+    model = XMLModel.from_bytes(data)
+    buffers = [io.BytesIO(), io.BytesIO()]
+    _write_artifacts(model, (CONFIG_XML, META_JSON), buffers, json_format, instances)
+    return Artifacts(*(buffer.getvalue() for buffer in buffers))
+
+
+def render_artifact(data: bytes, artifact: str, path: Optional[str] = None, json_format: str = JSONParser.PRETTY,
+                    instances: Optional[Union[str, int]] = None) -> Optional[bytes]:
+    """Строит модель по содержимому документа и генерирует один артефакт.
+
+    :param path: Optional[str]
+        Файл для результата. Если не задан, результат возвращается в виде bytes.
+    """
+
+    model = XMLModel.from_bytes(data)
+    if path is None:
+        buffer = io.BytesIO()
+        _write_artifacts(model, (artifact,), (buffer,), json_format, instances)
+        return buffer.getvalue()
+    with open(path, 'wb') as file:
+        _write_artifacts(model, (artifact,), (file,), json_format, instances)
+    return None
+
+
+class InputTooLargeError(ValueError):
+    """Размер модели превышает допустимый."""
+
+
+class ArtifactService:
+    """Асинхронная генерация артефактов с ограниченным пулом исполнителей.
+
+    Attributes
+    ----------
+    __executor : Executor
+        Пул для парсинга и генерации. По умолчанию ProcessPoolExecutor на workers процессов;
+        переданный извне пул сервис не закрывает.
+    __slots : asyncio.Semaphore
+        Ограничивает число одновременно выполняемых и ожидающих в пуле задач (max_pending).
+        Остальные запросы ждут в цикле событий, а не накапливаются в очереди пула.
+    __json_format : str
+        Формат meta.json по умолчанию (см. JSONParser).
+    __max_input_bytes : int
+        Максимальный размер модели.
+    __chunk_size : int
+        Размер фрагментов при потоковой выдаче.
+    __temp_dir : Optional[str]
+        Директория временных файлов потоковой выдачи.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 executor: Optional[Executor] = None, json_format: str = JSONParser.PRETTY,
+                 max_input_bytes: int = 256 * 1024 * 1024, chunk_size: int = 64 * 1024,
+                 temp_dir: Optional[str] = None):
+        self.__owns_executor = executor is None
+        self.__executor = ProcessPoolExecutor(max_workers=workers) if executor is None else executor
+        if max_pending is None:
+            max_pending = 2 * (workers or os.cpu_count() or 1)
+        self.__slots = asyncio.Semaphore(max_pending)
+        self.__json_format = json_format
+        self.__max_input_bytes = max_input_bytes
+        self.__chunk_size = chunk_size
+        self.__temp_dir = temp_dir
+
+    async def __aenter__(self) -> 'ArtifactService':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Останавливает собственный пул исполнителей."""
+
+        if self.__owns_executor:
+            self.__executor.shutdown(wait=True, cancel_futures=True)
+
+    async def read_source(self, source: Union[bytes, bytearray, memoryview, AsyncIterable[bytes], object]) -> bytes:
+        """Считывает модель целиком.
+
+        :param source:
+            bytes, асинхронный итератор фрагментов или объект с асинхронным методом read(n).
+
+        :raises InputTooLargeError:
+            Если размер модели больше max_input_bytes.
+        """
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            data = bytes(source)
+            if len(data) > self.__max_input_bytes:
+                raise InputTooLargeError(f"Размер модели превышает {self.__max_input_bytes} байт.")
+            return data
+
+        buffer = bytearray()
+        if hasattr(source, 'read'):
+            async def chunks():
+                while True:
+                    chunk = await source.read(self.__chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+            source = chunks()
+
+        async for chunk in source:
+            buffer += chunk
+            if len(buffer) > self.__max_input_bytes:
+                raise InputTooLargeError(f"Размер модели превышает {self.__max_input_bytes} байт.")
+        return bytes(buffer)
+
+    async def __run(self, function, *args):
+        """Выполняет функцию в пуле, ограничивая число одновременных задач."""
+
+        async with self.__slots:
+            return await asyncio.get_running_loop().run_in_executor(self.__executor, partial(function, *args))
+
+    async def generate(self, source, json_format: Optional[str] = None,
+                       instances: Optional[Union[str, int]] = None) -> Artifacts:
+        """Генерирует config.xml и meta.json.
+
+        :raises ET.ParseError, ValidationError:
+            Если модель некорректна.
+        """
+
+        data = await self.read_source(source)
+        return await self.__run(render_artifacts, data, json_format or self.__json_format, instances)
+
+    async def render(self, source, artifact: str, json_format: Optional[str] = None,
+                     instances: Optional[Union[str, int]] = None) -> bytes:
+        """Генерирует один артефакт (CONFIG_XML или META_JSON) и возвращает его в виде bytes."""
+
+        data = await self.read_source(source)
+        return await self.__run(render_artifact, data, artifact, None, json_format or self.__json_format, instances)
+
+    async def stream(self, source, artifact: str, json_format: Optional[str] = None,
+                     instances: Optional[Union[str, int]] = None) -> AsyncIterator[bytes]:
+        """Генерирует один артефакт и отдаёт его фрагментами по chunk_size байт.
+
+        Артефакт пишется в пуле во временный файл, уникальный для запроса, и читается
+        по частям, поэтому большие результаты (например, с экземплярами) не хранятся
+        в памяти целиком. Место в пуле освобождается сразу после генерации, медленный
+        получатель не задерживает другие запросы. Файл удаляется после выдачи.
+        """
+
+        data = await self.read_source(source)
+        descriptor, path = tempfile.mkstemp(prefix='artifact-', dir=self.__temp_dir)
+        os.close(descriptor)
+        try:
+            await self.__run(render_artifact, data, artifact, path, json_format or self.__json_format, instances)
+            loop = asyncio.get_running_loop()
+            with open(path, 'rb') as file:
+                while True:
+                    chunk = await loop.run_in_executor(None, file.read, self.__chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+
+
+# ------------------------- HTTP ---------------------------------
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+_CONTENT_TYPES = {CONFIG_XML: 'application/xml', META_JSON: 'application/json'}
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _response_head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS[status]}"] + [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+
+async def _read_request(reader: asyncio.StreamReader, max_body: int) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """Читает один HTTP запрос. Возвращает None, если клиент закрыл соединение."""
+
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise _HTTPError(400, "Неполный заголовок запроса.")
+        return None
+    except asyncio.LimitOverrunError:
+        raise _HTTPError(400, "Слишком длинный заголовок запроса.")
+
+    request_line, *header_lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = request_line.split(' ', 2)
+    except ValueError:
+        raise _HTTPError(400, "Некорректная строка запроса.")
+    headers = {}
+    for line in header_lines:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    body = b''
+    if method == 'POST':
+        if 'content-length' not in headers:
+            raise _HTTPError(411, "Требуется заголовок Content-Length.")
+        # int() принял бы и '+5', ' 5', '1_000': допускаются только десятичные цифры
+        value = headers['content-length']
+        if not (value.isascii() and value.isdigit()):
+            raise _HTTPError(400, f"Некорректный заголовок Content-Length: {value!r}.")
+        length = int(value)
+        if length > max_body:
+            raise _HTTPError(413, f"Размер модели превышает {max_body} байт.")
+        try:
+            body = await reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise _HTTPError(400, "Тело запроса короче, чем указано в Content-Length.")
+    return method, target, headers, body
+
+
+async def _handle_request(service: ArtifactService, writer: asyncio.StreamWriter, method: str, target: str,
+                          body: bytes) -> None:
+    url = urlsplit(target)
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    artifact = url.path.lstrip('/')
+
+    if url.path == '/health':
+        writer.write(_response_head(200, {'Content-Type': 'text/plain', 'Content-Length': '2'}) + b'ok')
+        return
+    if artifact not in _CONTENT_TYPES:
+        raise _HTTPError(404, f"Неизвестный ресурс: {url.path}.")
+    if method != 'POST':
+        raise _HTTPError(405, "Ожидается POST с моделью в теле запроса.")
+
+    try:
+        json_format = query.get('format', JSONParser.PRETTY)
+        if json_format not in (JSONParser.PRETTY, JSONParser.COMPACT, JSONParser.NDJSON):
+            raise ValueError(f"Неизвестный формат meta.json: {json_format}.")
+        instances = XMLParser.instances_mode(query['instances']) if 'instances' in query else None
+        content_type = 'application/x-ndjson' if json_format == JSONParser.NDJSON and artifact == META_JSON \
+            else _CONTENT_TYPES[artifact]
+
+        if query.get('stream') == '1':
+            chunks = service.stream(body, artifact, json_format, instances)
+            # Первый фрагмент получаем до отправки заголовков, чтобы ошибки модели вернуть кодом 400
+            first = await chunks.__anext__()
+            writer.write(_response_head(200, {'Content-Type': content_type, 'Transfer-Encoding': 'chunked'}))
+            writer.write(b'%x\r\n%s\r\n' % (len(first), first))
+            async for chunk in chunks:
+                writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                await writer.drain()
+            writer.write(b'0\r\n\r\n')
+        else:
+            result = await service.render(body, artifact, json_format, instances)
+            writer.write(_response_head(200, {'Content-Type': content_type, 'Content-Length': str(len(result))}))
+            writer.write(result)
+    except (ValueError, ET.ParseError) as e:
+        raise _HTTPError(400, f"{type(e).__name__}: {e}")
+
+
+async def handle_connection(service: ArtifactService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            max_body: int = 256 * 1024 * 1024) -> None:
+    """Обслуживает HTTP/1.1 соединение с поддержкой keep-alive."""
+
+    try:
+        while True:
+            keep_alive = True
+            try:
+                request = await _read_request(reader, max_body)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await _handle_request(service, writer, method, target, body)
+            except _HTTPError as e:
+                message = str(e).encode('utf-8')
+                writer.write(_response_head(e.status, {'Content-Type': 'text/plain; charset=utf-8',
+                                                       'Content-Length': str(len(message))}) + message)
+                # После ошибки чтения тело запроса могло остаться в потоке
+                keep_alive = keep_alive and e.status not in (400, 411, 413)
+            except Exception as e:
+                message = f"{type(e).__name__}: {e}".encode('utf-8')
+                writer.write(_response_head(500, {'Content-Type': 'text/plain; charset=utf-8',
+                                                  'Content-Length': str(len(message))}) + message)
+                keep_alive = False
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service: ArtifactService, host: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+    """Запускает HTTP сервер поверх сервиса. Возвращает asyncio сервер."""
+
+    return await asyncio.start_server(partial(handle_connection, service), host, port, limit=1 << 16)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальный HTTP сервер генерации config.xml и meta.json.")
+    parser.add_argument('--host', default='127.0.0.1', help="адрес (127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="порт (8080)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="число процессов (по числу ядер)")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="одновременных задач в пуле (по умолчанию 2 x workers)")
+    args = parser.parse_args()
+
+    async def run():
+        async with ArtifactService(args.workers, args.max_pending) as service:
+            server = await serve(service, args.host, args.port)
+            print(f"Сервер запущен: http://{args.host}:{server.sockets[0].getsockname()[1]}", flush=True)
+            async with server:
+                await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+"""Режим наблюдения: артефакты перегенерируются при сохранении исходных моделей.
+
+Пример запуска:
+    python watch.py                       # наблюдение за ./input, результаты в ./out
+    python watch.py ./models 'vendor/**/*.xml' --output ./artifacts --collect-all
+
+Процесс запускается один раз: модули импортированы, а снимок последней корректной
+версии каждой модели (см. incremental.py) хранится в памяти, поэтому следующая правка
+сравнивается с ним без чтения снимка из файла. Входные директории и шаблоны опрашиваются каждые --interval секунд
+(размер и время изменения файлов, os.stat); модуль inotify в стандартной библиотеке
+отсутствует, а опрос нескольких десятков файлов стоит долей миллисекунды.
+
+Серия сохранений одного файла (редактор записывает файл в несколько приёмов)
+объединяется: модель обрабатывается, когда файл не менялся --debounce секунд.
+Обрабатываются только изменившиеся модели. Артефакты пишутся так же, как в batch.py
+(<output>/<имя модели>/config.xml и meta.json), инкрементально: заново кодируются
+только изменённые классы (см. incremental.py), а если модель по содержимому не
+изменилась, файлы не переписываются. Модели с одинаковым именем файла, как и в
+batch.py, не обрабатываются: для второй и следующих сообщается ошибка.
+
+От сохранения модели из 500 классов до записанных артефактов проходит около 80 мс
+(медиана), p95 - около 115 мс при параметрах по умолчанию (benchmarks/watch_latency.py).
+
+Ошибки валидации выводятся сразу, с номерами строк. Артефакты при этом остаются
+от последней корректной версии модели, чтобы потребители не теряли результат на
+время правки.
+"""
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+import os
+import sys
+import threading
+import time
+
+from batch import _instances_mode, collect_input_files, duplicate_error, find_duplicate_names, model_name
+from emitters import ConfigXMLEmitter, MetaJSONEmitter, emit
+from incremental import IncrementalGenerator
+from main import JSONParser, XMLModel
+
+# Размер и время изменения файла: по ним определяется, что файл сохранён заново
+Signature = Tuple[int, int]
+
+
+class WatchResult(NamedTuple):
+    """Результат обработки одного изменения.
+
+    Attributes
+    ----------
+    input_path : str
+        Путь к исходной модели.
+    output_dir : str
+        Директория артефактов модели.
+    error : Optional[str]
+        Описание ошибки или None, если артефакты соответствуют модели.
+    seconds : float
+        Время обработки (чтение, валидация и генерация).
+    changed : Optional[int]
+        Количество добавленных, удалённых и изменённых классов; None - полная генерация.
+        0 - модель по содержимому не изменилась, артефакты не переписывались.
+    removed : bool
+        Файл модели удалён. Артефакты не удаляются.
+    """
+
+    input_path: str
+    output_dir: str
+    error: Optional[str]
+    seconds: float
+    changed: Optional[int] = None
+    removed: bool = False
+
+    def __str__(self) -> str:
+        name = os.path.basename(self.input_path)
+        if self.removed:
+            return f"{name}: файл удалён, артефакты сохранены в {self.output_dir}"
+        if self.error is not None:
+            return f"{name}: ошибка\n  " + self.error.replace('\n', '\n  ')
+        if self.changed == 0:
+            return f"{name}: без изменений ({self.seconds * 1000:.0f} мс)"
+        changes = "полная генерация" if self.changed is None else f"изменено классов: {self.changed}"
+        return f"{name}: обновлено за {self.seconds * 1000:.0f} мс, {changes}"
+
+
+class Watcher:
+    """Наблюдает за входными моделями и перегенерирует артефакты изменившихся.
+
+    Attributes
+    ----------
+    __inputs : List[str]
+        Файлы, директории (обходятся рекурсивно) или glob-шаблоны (см. batch.collect_input_files()).
+    __output_root : str
+        Корневая директория результатов.
+    __debounce : float
+        Сколько секунд файл не должен меняться перед обработкой.
+    __json_format : str
+        Формат meta.json (см. JSONParser).
+    __instances : Optional[Union[str, int]]
+        Режим экземпляров config.xml (см. XMLParser). С экземплярами генерация полная,
+        так как инкрементальная генерация их не поддерживает.
+    __collect_all : bool
+        Сообщать все нарушения валидации модели, а не только первое.
+    __on_result : Callable[[WatchResult], None]
+        Получатель результатов; по умолчанию результаты выводятся в stdout.
+    __seen : Dict[str, Signature]
+        Последнее замеченное состояние каждого файла.
+    __pending : Dict[str, float]
+        Изменённые, но ещё не обработанные файлы: время последнего изменения (time.monotonic()).
+    __polled_at : Optional[int]
+        Время предыдущего опроса по системным часам (time.time_ns()), в тех же
+        единицах, что и время изменения файлов.
+    __duplicates : Dict[str, str]
+        Файлы, имя модели которых совпадает с более ранним файлом (см. batch.find_duplicate_names()).
+    __generators : Dict[str, IncrementalGenerator]
+        Генератор каждого файла со снимком последней корректной модели.
+
+    Methods
+    -------
+    poll()
+        Один опрос входных файлов; возвращает результаты обработанных изменений.
+    run(interval, stop)
+        Опрашивает входные файлы до остановки.
+    """
+
+    def __init__(self, inputs: List[str], output_root: str = './out', debounce: float = 0.03,
+                 json_format: str = JSONParser.PRETTY, instances: Optional[Union[str, int]] = None,
+                 collect_all: bool = False, on_result: Optional[Callable[[WatchResult], None]] = None):
+        if json_format not in (JSONParser.PRETTY, JSONParser.COMPACT, JSONParser.NDJSON):
+            raise ValueError(f"Неизвестный формат meta.json: {json_format}.")
+        self.__inputs = inputs
+        self.__output_root = os.path.abspath(output_root)
+        self.__debounce = debounce
+        self.__json_format = json_format
+        self.__instances = instances
+        self.__collect_all = collect_all
+        self.__on_result = (lambda result: print(result, flush=True)) if on_result is None else on_result
+        self.__seen: Dict[str, Signature] = {}
+        self.__pending: Dict[str, float] = {}
+        self.__polled_at: Optional[int] = None
+        self.__duplicates: Dict[str, str] = {}
+        self.__generators: Dict[str, IncrementalGenerator] = {}
+
+    def output_dir(self, input_path: str) -> str:
+        """Директория артефактов модели (как в batch.py)."""
+
+        return os.path.join(self.__output_root, model_name(input_path))
+
+    def __scan(self) -> Dict[str, Signature]:
+        signatures = {}
+        for path in collect_input_files(self.__inputs):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Файл удалён между обходом директории и stat
+            signatures[path] = (stat.st_size, stat.st_mtime_ns)
+        return signatures
+
+    def poll(self) -> List[WatchResult]:
+        """Опрашивает входные файлы и обрабатывает изменения, которые закончились.
+
+        Изменение считается законченным, если с времени изменения файла прошло не
+        меньше debounce секунд и при опросах за это время состояние файла не менялось.
+        Время изменения берётся из mtime файла; если оно в будущем или раньше
+        предыдущего опроса (часы или mtime не согласованы с опросами), изменение
+        отсчитывается от текущего опроса. Результаты передаются получателю on_result и
+        возвращаются.
+
+        :return: List[WatchResult]
+        """
+
+        now = time.monotonic()
+        wall_now = time.time_ns()
+        polled_at, self.__polled_at = self.__polled_at, wall_now
+        signatures = self.__scan()
+        results = []
+
+        for path in sorted(self.__seen.keys() - signatures.keys()):
+            del self.__seen[path]
+            self.__pending.pop(path, None)
+            self.__generators.pop(path, None)
+            results.append(WatchResult(path, self.output_dir(path), None, 0.0, removed=True))
+
+        # Модель, имя которой перестало совпадать с другой (файл удалён), обрабатывается сразу
+        duplicates = find_duplicate_names(sorted(signatures))
+        for path in self.__duplicates.keys() - duplicates.keys():
+            if path in signatures:
+                self.__pending[path] = float('-inf')
+        self.__duplicates = duplicates
+
+        for path, signature in signatures.items():
+            if self.__seen.get(path) != signature:
+                self.__seen[path] = signature
+                # Изменение отсчитывается от времени изменения файла, а не от опроса, который
+                # его заметил: иначе к задержке добавлялся бы период опроса. mtime - системные
+                # часы, поэтому используется только возраст изменения, и только если он согласуется
+                # с опросами: изменение после предыдущего опроса и не в будущем.
+                mtime = signature[1]
+                if mtime > wall_now or (polled_at is not None and mtime < polled_at):
+                    self.__pending[path] = now
+                else:
+                    self.__pending[path] = now - (wall_now - mtime) / 1e9
+
+        for path, changed_at in sorted(self.__pending.items()):
+            if now - changed_at >= self.__debounce:
+                del self.__pending[path]
+                results.append(self.__process(path))
+
+        for result in results:
+            self.__on_result(result)
+        return results
+
+    def __process(self, input_path: str) -> WatchResult:
+        """Читает, проверяет модель и приводит её артефакты в соответствие с ней."""
+
+        started = time.perf_counter()
+        output_dir = self.output_dir(input_path)
+        if input_path in self.__duplicates:
+            return WatchResult(input_path, output_dir, duplicate_error(self.__duplicates[input_path]), 0.0)
+        try:
+            # Файл читается целиком: номера строк нарушений определяются по тем же байтам
+            with open(input_path, 'rb') as file:
+                data = file.read()
+            model = XMLModel.load(data, collect_all=self.__collect_all)
+
+            if self.__instances is None:
+                generator = self.__generators.get(input_path)
+                if generator is None:
+                    generator = self.__generators[input_path] = IncrementalGenerator(output_dir, self.__json_format)
+                result = generator.generate(model)
+                changed = None if result.full else (
+                    len(result.diff.added) + len(result.diff.removed) + len(result.diff.changed))
+            else:
+                os.makedirs(output_dir, exist_ok=True)
+                emit(model, [ConfigXMLEmitter(instances=self.__instances), MetaJSONEmitter(self.__json_format)],
+                     output_dir)
+                changed = None
+            error = None
+        except Exception as e:
+            changed = None
+            error = f"{type(e).__name__}: {e}"
+        return WatchResult(input_path, output_dir, error, time.perf_counter() - started, changed)
+
+    def run(self, interval: float = 0.02, stop: Optional[threading.Event] = None) -> None:
+        """Опрашивает входные файлы каждые interval секунд, пока не установлено событие stop.
+
+        Первый опрос обрабатывает все существующие модели без ожидания debounce.
+        """
+
+        signatures = self.__scan()
+        self.__seen.update(signatures)
+        self.__pending.update(dict.fromkeys(signatures, float('-inf')))
+        stop = threading.Event() if stop is None else stop
+        while not stop.is_set():
+            self.poll()
+            stop.wait(interval)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки."""
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Перегенерация config.xml и meta.json при изменении моделей.")
+    parser.add_argument('inputs', nargs='*', default=['./input'],
+                        help="файлы, директории или glob-шаблоны с моделями (./input)")
+    parser.add_argument('-o', '--output', default='./out', help="корневая директория результатов (./out)")
+    parser.add_argument('--interval', type=float, default=0.02, help="период опроса файлов в секундах (0.02)")
+    parser.add_argument('--debounce', type=float, default=0.03,
+                        help="сколько секунд файл не должен меняться перед обработкой (0.03)")
+    parser.add_argument('--json-format', choices=(JSONParser.PRETTY, JSONParser.COMPACT, JSONParser.NDJSON),
+                        default=JSONParser.PRETTY, help="формат meta.json (pretty)")
+    parser.add_argument('--instances', type=_instances_mode, default=None,
+                        help="развернуть агрегации config.xml в экземпляры: min, max или число на агрегацию")
+    parser.add_argument('--collect-all', action='store_true',
+                        help="сообщать все ошибки валидации модели, а не только первую")
+    args = parser.parse_args(argv)
+
+    watcher = Watcher(args.inputs, args.output, args.debounce, args.json_format, args.instances, args.collect_all)
+    print(f"Наблюдение за {', '.join(args.inputs)}, результаты в {os.path.abspath(args.output)}. "
+          f"Остановка: Ctrl+C.", flush=True)
+    try:
+        watcher.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""Постоянный процесс-исполнитель: один интерпретатор обрабатывает много моделей подряд.
+
+Пример запуска:
+    find models -name '*.xml' | python worker.py --output ./artifacts
+    python worker.py --listen 127.0.0.1:8765 --output ./artifacts --snapshot-dir ./.snapshots
+    python worker.py --socket /tmp/uml-worker.sock --output ./artifacts
+
+Короткие запуски batch.py для каждого файла оплачивают старт интерпретатора и импорт
+модулей на каждом файле. Исполнитель запускается один раз и принимает запросы построчно
+из stdin, по TCP (--listen) или через unix socket (--socket); соединения обслуживаются
+по очереди, в каждом можно отправить любое количество запросов.
+
+Запрос - одна строка: путь к модели или JSON объект с полями
+    input (обязательно), output, json_format, instances, collect_all, incremental, packed;
+не заданные поля берутся из параметров командной строки. На каждый запрос
+исполнитель отвечает одной строкой JSON:
+    {"input_path": ..., "output_dir": ..., "error": null | "...", "seconds": ..., "cached": false}
+Артефакты записываются так же, как в batch.py: <output>/<имя модели>/config.xml и meta.json.
+"""
+
+from typing import IO, Dict, List, Optional
+import argparse
+import json
+import os
+import socketserver
+import sys
+
+from batch import _instances_mode, convert_file
+from main import JSONParser, XMLParser
+
+# Поля запроса, которые можно переопределить для одного файла, и их допустимые типы
+# (instances проверяется отдельно: строка режима или неотрицательное число)
+REQUEST_OPTIONS = ('output', 'json_format', 'instances', 'collect_all', 'incremental', 'packed')
+_OPTION_TYPES = {'input': str, 'output': str, 'json_format': str, 'collect_all': bool, 'incremental': bool,
+                 'packed': bool}
+
+
+def _check_request(request: object) -> Dict[str, object]:
+    """Проверяет поля и типы значений JSON запроса.
+
+    :raises ValueError:
+        Если в запросе неизвестные поля, нет поля input или недопустим режим instances.
+    :raises TypeError:
+        Если запрос не JSON объект или значение поля имеет неверный тип.
+    """
+
+    if not isinstance(request, dict):
+        raise TypeError(f"Запрос должен быть JSON объектом, получено: {type(request).__name__}.")
+    unknown = set(request) - {'input', *REQUEST_OPTIONS}
+    if unknown:
+        raise ValueError(f"Неизвестные поля запроса: {', '.join(sorted(unknown))}.")
+    if 'input' not in request:
+        raise ValueError("В запросе нет поля input.")
+    for name, expected in _OPTION_TYPES.items():
+        if name in request and not isinstance(request[name], expected):
+            raise TypeError(f"Поле {name} должно иметь тип {expected.__name__}, "
+                            f"получено: {type(request[name]).__name__}.")
+
+    instances = request.get('instances')
+    if isinstance(instances, str):
+        request['instances'] = XMLParser.instances_mode(instances)
+    elif isinstance(instances, bool) or not isinstance(instances, (int, type(None))):
+        raise TypeError(f"Поле instances должно быть строкой, числом или null, "
+                        f"получено: {type(instances).__name__}.")
+    elif instances is not None and instances < 0:
+        raise ValueError(f"Ожидается min, max или неотрицательное число: {instances}.")
+    return request
+
+
+def _error_response(input_path: str, error: Exception) -> Dict[str, object]:
+    """Ответ на запрос, который не удалось обработать."""
+
+    return {'input_path': input_path, 'output_dir': None, 'error': f"{type(error).__name__}: {error}",
+            'seconds': 0.0, 'cached': False}
+
+
+def handle_request(line: str, defaults: Dict[str, object]) -> Dict[str, object]:
+    """Обрабатывает одну строку запроса и возвращает ответ.
+
+    :param line: str
+        Путь к модели или JSON объект запроса (см. описание модуля).
+    :param defaults: Dict[str, object]
+        Параметры convert_file() по умолчанию: output, streaming, json_format, cache,
+        report, collect_all, incremental, instances, snapshot_dir, packed.
+
+    :return: Dict[str, object]
+        Ответ в виде полей FileResult: input_path, output_dir, error, seconds, cached. Ошибки разбора запроса и
+        обработки модели возвращаются в поле error, исключения не пробрасываются: одна
+        ошибка не должна останавливать исполнитель.
+    """
+
+    options = dict(defaults)
+    try:
+        if line.startswith('{'):
+            request = _check_request(json.loads(line))
+            input_path = request.pop('input')
+            options.update(request)
+        else:
+            input_path = line
+        if options['json_format'] not in (JSONParser.PRETTY, JSONParser.COMPACT, JSONParser.NDJSON):
+            raise ValueError(f"Неизвестный формат meta.json: {options['json_format']}.")
+        if options['incremental'] and options['instances'] is not None:
+            raise ValueError("incremental не поддерживается вместе с instances.")
+    except (ValueError, TypeError) as e:
+        return _error_response(line, e)
+
+    try:
+        output_root = os.path.abspath(options.pop('output'))
+        result = convert_file(os.path.abspath(input_path), output_root, **options)
+    except Exception as e:
+        # convert_file() сообщает ошибки модели в результате; сюда попадают только непредвиденные
+        return _error_response(input_path, e)
+    return result._asdict()
+
+
+def serve_stream(reader: IO[str], writer: IO[str], defaults: Dict[str, object]) -> int:
+    """Обрабатывает запросы из reader до конца потока, отвечая в writer построчно.
+
+    :return: int
+        Количество обработанных запросов.
+    """
+
+    handled = 0
+    for line in reader:
+        line = line.strip()
+        if not line:
+            continue
+        writer.write(json.dumps(handle_request(line, defaults), ensure_ascii=False) + '\n')
+        writer.flush()
+        handled += 1
+    return handled
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Обслуживает одно соединение: строки запросов в UTF-8, по строке ответа на запрос."""
+
+    def handle(self) -> None:
+        reader = (line.decode('utf-8', errors='replace') for line in self.rfile)
+        writer = _SocketWriter(self.wfile)
+        serve_stream(reader, writer, self.server.defaults)
+
+
+class _SocketWriter:
+    """Текстовая обёртка над бинарным потоком соединения для serve_stream()."""
+
+    def __init__(self, file: IO[bytes]):
+        self.__file = file
+
+    def write(self, text: str) -> None:
+        self.__file.write(text.encode('utf-8'))
+
+    def flush(self) -> None:
+        self.__file.flush()
+
+
+class _TCPServer(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+def make_server(defaults: Dict[str, object], listen: Optional[str] = None,
+                socket_path: Optional[str] = None) -> socketserver.BaseServer:
+    """Создаёт сервер исполнителя на host:port (listen) или unix socket (socket_path)."""
+
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = socketserver.UnixStreamServer(socket_path, _RequestHandler)
+    else:
+        host, port = listen.rsplit(':', 1)
+        server = _TCPServer((host, int(port)), _RequestHandler)
+    server.defaults = defaults
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа командной строки."""
+
+    parser = argparse.ArgumentParser(description="Постоянный процесс генерации config.xml и meta.json.")
+    parser.add_argument('-o', '--output', default='./out', help="корневая директория результатов (./out)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--listen', default=None, help="принимать запросы по TCP на host:port (из stdin)")
+    source.add_argument('--socket', default=None, help="принимать запросы через unix socket (из stdin)")
+    parser.add_argument('--streaming', action='store_true', help="потоковое чтение больших моделей")
+    parser.add_argument('--json-format', choices=(JSONParser.PRETTY, JSONParser.COMPACT, JSONParser.NDJSON),
+                        default=JSONParser.PRETTY, help="формат meta.json (pretty)")
+    parser.add_argument('--cache-dir', default=None, help="директория кэша артефактов (без кэша)")
+    parser.add_argument('--snapshot-dir', default=None,
+                        help="директория бинарных снимков моделей для быстрой повторной загрузки (без снимков)")
+    parser.add_argument('--packed', action='store_true',
+                        help="упаковывать модели в таблицы перед генерацией: меньше памяти на очень больших моделях")
+    parser.add_argument('--report', action='store_true',
+                        help="записывать замеры этапов в report.json рядом с артефактами")
+    parser.add_argument('--collect-all', action='store_true',
+                        help="сообщать все ошибки валидации модели, а не только первую")
+    parser.add_argument('--incremental', action='store_true',
+                        help="перегенерировать только изменившиеся части артефактов по снимку прежней модели")
+    parser.add_argument('--instances', type=_instances_mode, default=None,
+                        help="развернуть агрегации config.xml в экземпляры: min, max или число на агрегацию")
+    args = parser.parse_args(argv)
+    if args.incremental and args.instances is not None:
+        parser.error("--incremental не поддерживается вместе с --instances")
+
+    cache = None
+    if args.cache_dir is not None:
+        from cache import ArtifactCache
+        cache = ArtifactCache(args.cache_dir)
+
+    defaults = {
+        'output': args.output,
+        'streaming': args.streaming,
+        'json_format': args.json_format,
+        'cache': cache,
+        'report': args.report,
+        'collect_all': args.collect_all,
+        'incremental': args.incremental,
+        'instances': args.instances,
+        'snapshot_dir': None if args.snapshot_dir is None else os.path.abspath(args.snapshot_dir),
+        'packed': args.packed,
+    }
+
+    # Парсер XML загружается заранее, а не на первом запросе
+    import xml.etree.ElementTree  # noqa: F401
+
+    if args.listen is None and args.socket is None:
+        serve_stream(sys.stdin, sys.stdout, defaults)
+        return 0
+
+    with make_server(defaults, args.listen, args.socket) as server:
+        print(f"Исполнитель принимает запросы: {args.socket or args.listen}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())